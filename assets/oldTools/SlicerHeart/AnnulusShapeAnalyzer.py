@@ -1817,6 +1817,7 @@ class AnnulusShapeAnalyzerTest(ScriptedLoadableModuleTest):
         """
         self.setUp()
         self.test_AnnulusShapeAnalyzer()
+        self.test_AnnulusTable()
 
     def test_AnnulusShapeAnalyzer(self):
         """ Ideally you should have several levels of tests.  At the lowest level
@@ -1875,3 +1876,57 @@ class AnnulusShapeAnalyzerTest(ScriptedLoadableModuleTest):
             slicer.mrmlScene.Clear()
 
         self.delayDisplay('Test passed')
+
+    def test_AnnulusTable(self):
+        self.delayDisplay("Starting the annulus table test")
+
+        from tempfile import TemporaryDirectory
+        with TemporaryDirectory(dir=slicer.app.temporaryPath) as temp_dir:
+            csv_filename = os.path.join(temp_dir, "AnnulusContourPoints.csv")
+            with open(csv_filename, "w") as f:
+                f.write("Filename,Phase,FrameNumber,Valve,AnnulusContourX,AnnulusContourY,AnnulusContourZ,"
+                        "AnnulusContourLabel\n"
+                        # keys that are the same when their values are concatenated
+                        "case1,MS,3,MV,1.5,2,3,A\n"
+                        "case1M,S,3,MV,7,7,7,P\n"
+                        "case1,ES,1,MV,9,9,9,\n"
+                        "case1,MS,3,MV,4,5,6,\n"
+                        "case1,MS,3,MV,8,9,10,P\n")
+
+            AnnulusTable.loaded_tables.clear()
+            table = AnnulusTable.load(csv_filename)
+            self.assertIs(AnnulusTable.load(csv_filename), table)
+            self.assertEqual(table.get_unique_values('Filename'), ['case1', 'case1M'])
+            self.assertEqual(table.get_unique_values('Phase'), ['MS', 'S', 'ES'])
+
+            points, labels = table.get_annulus_contour_points('case1', 'MS', 'MV')
+            np.testing.assert_array_equal(points, [[1.5, 2, 3], [4, 5, 6], [8, 9, 10]])
+            self.assertEqual(labels, {'A': 0, 'P': 2})
+            points, labels = table.get_annulus_contour_points('case1M', 'S', 'MV')
+            np.testing.assert_array_equal(points, [[7, 7, 7]])
+            self.assertEqual(labels, {'P': 0})
+            points, labels = get_annulus_contour_points(csv_filename, 'case1', 'ES', 'MV')
+            np.testing.assert_array_equal(points, [[9, 9, 9]])
+            self.assertEqual(labels, {})
+            points, labels = table.get_annulus_contour_points('case2', 'MS', 'MV')
+            self.assertEqual(len(points), 0)
+            self.assertEqual(labels, {})
+
+            # returned points can be modified without changing the table
+            points, labels = table.get_annulus_contour_points('case1', 'MS', 'MV')
+            points *= 2
+            np.testing.assert_array_equal(table.get_annulus_contour_points('case1', 'MS', 'MV')[0][0], [1.5, 2, 3])
+
+            # the table is read from the binary cache file when it is not in memory
+            cache_filename = AnnulusTable.get_cache_filename(os.path.abspath(csv_filename))
+            self.assertTrue(os.path.exists(cache_filename))
+            AnnulusTable.loaded_tables.clear()
+            cached_table = AnnulusTable.load(csv_filename)
+            self.assertIsNot(cached_table, table)
+            self.assertEqual(cached_table.row_ranges, table.row_ranges)
+            np.testing.assert_array_equal(cached_table.coordinates, table.coordinates)
+            np.testing.assert_array_equal(cached_table.labels, table.labels)
+            AnnulusTable.loaded_tables.clear()
+            os.remove(cache_filename)
+
+        self.delayDisplay('Test passed')
@@ -1,4 +1,5 @@
 import vtk, qt, slicer
+import numpy as np
 from slicer.ScriptedLoadableModule import *
 import logging
 
@@ -83,11 +84,20 @@ class CartoExportWidget(ScriptedLoadableModuleWidget):
   def onSaveClicked(self):
     filename = qt.QFileDialog.getSaveFileName(None, "Save VTK model as ...", "{}.vtk".format(self.logic.getFileName()))
     if filename:
+      progressDialog = slicer.util.createProgressDialog(labelText="Saving {} ...".format(filename), maximum=100)
+      def updateProgress(fraction):
+        progressDialog.value = int(fraction * 100)
+        slicer.app.processEvents()
+      self.logic.progressCallback = updateProgress
       try:
         self.logic.save(filename)
+        progressDialog.close()
         slicer.util.messageBox("Saved legacy VTK file with header to {}".format(filename))
       except Exception as exc:
+        progressDialog.close()
         logging.error("Saving into VTK legacy format failed with error message: {}".format(exc))
+      finally:
+        self.logic.progressCallback = None
 
 
 #
@@ -111,6 +121,9 @@ class CartoExportLogic(ScriptedLoadableModuleLogic):
   def __init__(self):
     ScriptedLoadableModuleLogic.__init__(self)
     self.modelNode = None
+    self.progressCallback = None
+    # read the whole file back with the VTK reader after saving (slow for large models)
+    self.validate = False
 
   def getPatientDataRow(self):
     return "PatientData {}".format(self.getFileName(False))
@@ -124,17 +137,67 @@ class CartoExportLogic(ScriptedLoadableModuleLogic):
   def save(self, filepath):
     node = self.modelNode
 
-    if node.GetPolyData() is not None:
+    polyData = node.GetPolyData()
+    if polyData is not None:
       writer = vtk.vtkPolyDataWriter()
       writer.SetInputConnection(node.GetPolyDataConnection())
+      numberOfPoints = polyData.GetNumberOfPoints()
     else:
       writer = vtk.vtkUnstructuredGridWriter()
       writer.SetInputConnection(node.GetMeshConnection())
+      numberOfPoints = node.GetMesh().GetNumberOfPoints()
 
     writer.SetFileName(filepath)
     writer.SetFileType(vtk.VTK_ASCII)
     writer.SetHeader(self.getPatientDataRow())
-    writer.Write()
+    writer.AddObserver(vtk.vtkCommand.ProgressEvent, lambda caller, event: self.updateProgress(caller.GetProgress()))
+    if not writer.Write():
+      raise IOError("Failed to write {}".format(filepath))
+    self.updateProgress(1.0)
+
+    self.checkFileHeader(filepath, self.getPatientDataRow(), numberOfPoints)
+    if self.validate and polyData is not None:
+      self.validateFile(polyData, filepath, self.getPatientDataRow())
+
+  def updateProgress(self, fraction):
+    if self.progressCallback:
+      self.progressCallback(fraction)
+
+  def checkFileHeader(self, filepath, header, numberOfPoints):
+    # Quick check of the first lines of the written file (header and number of points), without parsing the data.
+    # Raises ValueError if they do not match.
+    with open(filepath, "r") as fileHandle:
+      lines = [fileHandle.readline().rstrip("\r\n") for _ in range(5)]
+    if not lines[0].startswith("# vtk DataFile Version"):
+      raise ValueError("{} is not a legacy VTK file".format(filepath))
+    if lines[1] != header:
+      raise ValueError("Header mismatch: '{}' written, '{}' read".format(header, lines[1]))
+    pointsLine = lines[4].split()
+    if len(pointsLine) < 2 or pointsLine[0] != "POINTS" or int(pointsLine[1]) != numberOfPoints:
+      raise ValueError("Point count mismatch: {} points written, '{}' read".format(numberOfPoints, lines[4]))
+
+  def validateFile(self, polyData, filepath, header):
+    # Read the written file back with the VTK legacy reader and compare header and geometry (enabled by self.validate).
+    # Raises ValueError if the file does not match polyData.
+    from vtk.util import numpy_support
+    reader = vtk.vtkPolyDataReader()
+    reader.SetFileName(filepath)
+    reader.Update()
+    if reader.GetHeader() != header:
+      raise ValueError("Header mismatch: '{}' written, '{}' read".format(header, reader.GetHeader()))
+    written = reader.GetOutput()
+    if written.GetNumberOfPoints() != polyData.GetNumberOfPoints() or written.GetNumberOfPolys() != polyData.GetNumberOfPolys():
+      raise ValueError("Geometry mismatch: {} points / {} polygons written, {} points / {} polygons read".format(
+        polyData.GetNumberOfPoints(), polyData.GetNumberOfPolys(), written.GetNumberOfPoints(), written.GetNumberOfPolys()))
+    # vtkPolyDataWriter keeps 6 significant digits of float coordinates
+    if not np.allclose(numpy_support.vtk_to_numpy(written.GetPoints().GetData()),
+                       numpy_support.vtk_to_numpy(polyData.GetPoints().GetData()), rtol=1e-5, atol=1e-5):
+      raise ValueError("Point coordinates read back differ from the model")
+    if not np.array_equal(numpy_support.vtk_to_numpy(written.GetPolys().GetConnectivityArray()),
+                          numpy_support.vtk_to_numpy(polyData.GetPolys().GetConnectivityArray())):
+      raise ValueError("Polygons read back differ from the model")
+    if written.GetPointData().GetNumberOfArrays() != polyData.GetPointData().GetNumberOfArrays():
+      raise ValueError("Point data arrays read back differ from the model")
 
 
 class CartoExportTest(ScriptedLoadableModuleTest):
@@ -169,6 +232,40 @@ class CartoExportTest(ScriptedLoadableModuleTest):
 
     self.delayDisplay("Starting the test")
 
-    # TODO: implement test here
+    import os, time
+    from vtk.util import numpy_support
+
+    sphere = vtk.vtkSphereSource()
+    sphere.SetThetaResolution(400)
+    sphere.SetPhiResolution(400)
+    sphere.Update()
+    polyData = sphere.GetOutput()
+    scalars = numpy_support.numpy_to_vtk(np.arange(polyData.GetNumberOfPoints(), dtype=np.float32), deep=True)
+    scalars.SetName("Distance to valve")
+    polyData.GetPointData().SetScalars(scalars)
+    modelNode = slicer.modules.models.logic().AddModel(polyData)
+
+    logic = CartoExportLogic()
+    logic.modelNode = modelNode
+    filepath = os.path.join(slicer.app.temporaryPath, "CartoExportTest.vtk")
+
+    progress = []
+    logic.progressCallback = progress.append
+    logic.validate = True
+    startTime = time.time()
+    logic.save(filepath)
+    logging.info("Saved {0} triangles in {1:.3f} s (including validation)".format(polyData.GetNumberOfPolys(), time.time() - startTime))
+    self.assertEqual(progress[-1], 1.0)
+
+    reader = vtk.vtkPolyDataReader()
+    reader.SetFileName(filepath)
+    reader.Update()
+    self.assertEqual(reader.GetHeader(), logic.getPatientDataRow())
+    self.assertIsNotNone(reader.GetOutput().GetPointData().GetNormals())
+    self.assertEqual(reader.GetOutput().GetPointData().GetScalars().GetName(), "Distance to valve")
+
+    with self.assertRaises(ValueError):
+      logic.checkFileHeader(filepath, logic.getPatientDataRow(), polyData.GetNumberOfPoints() + 1)
+    os.remove(filepath)
 
     self.delayDisplay('Test passed!')
@@ -1,4 +1,5 @@
 import os
+import json
 import string
 import vtk, qt, ctk, slicer
 import logging
@@ -19,10 +20,87 @@ from DICOMLib import DICOMLoadable
 # plugin architecture.
 #
 
+class DicomUltrasoundExamineIndex(object):
+  """Persistent index of examine results.
+  Maps (path, size, modification time) of each examined file to the loadables found in it
+  (empty list if none), so re-examining a database only parses new or modified files.
+  """
+
+  # Increase when the examiners change what they detect, this invalidates all entries.
+  indexVersion = "2"
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.modified = False
+    directory = os.path.dirname(filename)
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    self.entries = {}
+    try:
+      with open(filename, "r") as indexFile:
+        index = json.load(indexFile)
+      if index.get("version") == self.indexVersion:
+        self.entries = index["entries"]
+    except (IOError, ValueError, KeyError, AttributeError):
+      pass
+
+  def key(self, filePath):
+    try:
+      fileStat = os.stat(filePath)
+    except OSError:
+      return None
+    return os.path.abspath(filePath)+"|"+str(fileStat.st_size)+"|"+str(fileStat.st_mtime_ns)
+
+  def get(self, key):
+    return self.entries.get(key)
+
+  def set(self, key, loadableDicts):
+    self.entries[key] = loadableDicts
+    self.modified = True
+
+  def save(self):
+    if not self.modified:
+      return
+    # Write to a temporary file first so that an interrupted write does not corrupt the index
+    temporaryFilename = self.filename+".tmp"
+    with open(temporaryFilename, "w") as indexFile:
+      json.dump({"version": self.indexVersion, "entries": self.entries}, indexFile)
+    os.replace(temporaryFilename, self.filename)
+    self.modified = False
+
+# Loadable attributes stored in the examine index (files is always the examined file)
+LOADABLE_ATTRIBUTES = ["name", "tooltip", "warning", "selected", "confidence", "spacing", "origin", "frames", "lazyFrames"]
+
+def loadableToDict(loadable):
+  return {name: getattr(loadable, name) for name in LOADABLE_ATTRIBUTES if hasattr(loadable, name)}
+
+def loadableFromDict(loadableDict, filePath):
+  loadable = DICOMLoadable()
+  loadable.files = [filePath]
+  for name, value in loadableDict.items():
+    setattr(loadable, name, value)
+  return loadable
+
 class DicomUltrasoundPluginClass(DICOMPlugin):
   """ Ultrasound specific interpretation code
   """
 
+  # SOP classes of all supported formats, files of other classes are not parsed
+  supportedSOPClassUIDs = [
+    '1.2.840.113543.6.6.1.3.10002', # Philips 4D US (bogus, non-standard)
+    '1.2.840.10008.5.1.4.1.1.3.1', # UltrasoundMultiframeImageStorage
+    '1.2.840.10008.5.1.4.1.1.6.1', # UltrasoundImageStorage
+    ]
+
+  # Examine results are stored in a persistent index (see DicomUltrasoundExamineIndex)
+  useExamineIndex = True
+  examineIndex = None
+
+  # Philips 4D US sequences with at least this many frames are loaded without copying the frames
+  # (see loadPhilips4DUSAsSequence), 0 disables it. Can be changed in the application settings.
+  lazyFramesMinimumFramesSettingsKey = "DicomUltrasoundPlugin/LazyFramesMinimumFrames"
+  lazyFramesMinimumFramesDefault = 200
+
   def __init__(self):
     super(DicomUltrasoundPluginClass,self).__init__()
     self.loadType = "Ultrasound"
@@ -49,42 +127,130 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
     files parameter.
     """
     self.detailedLogging = self.isDetailedLogging()
+    examineIndex = self.getExamineIndex()
     loadables = []
 
     for filePath in files:
       # there should only be one instance per 4D volume, but on some Voluson systems
       # all sequences get the same series ID, so try to load each file separately
+      loadables.extend(self.examineFile(filePath, examineIndex))
 
-      loadables.extend(self.examinePhilips4DUS(filePath))
-      loadables.extend(self.examinePhilipsAffinity3DUS(filePath))
-      loadables.extend(self.examineGeKretzUS(filePath))
-      loadables.extend(self.examineGeUSMovie(filePath))
-      loadables.extend(self.examineGeImage3dApi(filePath))
-      loadables.extend(self.examineEigenArtemis3DUS(filePath))
+    if examineIndex:
+      try:
+        examineIndex.save()
+      except (OSError, TypeError) as e:
+        # e.g., disk full or no write access to the cache folder, examine results are still valid
+        logging.warning("DICOM ultrasound examine index could not be saved, disabling it: {0}".format(str(e)))
+        DicomUltrasoundPluginClass.useExamineIndex = False
+        DicomUltrasoundPluginClass.examineIndex = None
 
     return loadables
 
-  def examinePhilips4DUS(self, filePath):
-    # currently only this one (bogus, non-standard) Philips 4D US format is supported
-    supportedSOPClassUID = '1.2.840.113543.6.6.1.3.10002'
+  def getExamineIndex(self):
+    """Index shared by all plugin instances, the DICOM module creates a new instance for each examine"""
+    if not self.useExamineIndex:
+      return None
+    if DicomUltrasoundPluginClass.examineIndex is None:
+      try:
+        DicomUltrasoundPluginClass.examineIndex = DicomUltrasoundExamineIndex(
+          os.path.join(slicer.app.cachePath, "DicomUltrasoundPlugin", "examineindex.json"))
+      except Exception as e:
+        logging.warning("DICOM ultrasound examine index is not available: {0}".format(str(e)))
+        self.useExamineIndex = False
+        return None
+    return DicomUltrasoundPluginClass.examineIndex
+
+  def isLazyFramesLoadable(self, frames):
+    """Returns True if a Philips 4D US sequence of this many frames should be loaded with lazy frames"""
+    settings = qt.QSettings()
+    try:
+      minimumFrames = int(settings.value(self.lazyFramesMinimumFramesSettingsKey, self.lazyFramesMinimumFramesDefault))
+    except (TypeError, ValueError):
+      minimumFrames = self.lazyFramesMinimumFramesDefault
+    return minimumFrames > 0 and frames >= minimumFrames
+
+  def examineFile(self, filePath, examineIndex=None):
+    """Returns loadables of a single file. The header is parsed once and shared by all examiners,
+    and the result is looked up in / added to examineIndex, so unchanged files are not parsed again.
+    """
+    entry = None
+    indexKey = examineIndex.key(filePath) if examineIndex else None
+    if indexKey:
+      entry = examineIndex.get(indexKey)
+
+    if entry is None:
+      candidates = []
+      ds = self.readHeader(filePath)
+      if ds is not None:
+        for examiner in [self.examinePhilips4DUS, self.examinePhilipsAffinity3DUS, self.examineGeKretzUS,
+          self.examineGeUSMovie, self.examineGeImage3dApi, self.examineEigenArtemis3DUS]:
+          candidates.extend(examiner(filePath, ds))
+      entry = [loadableToDict(loadable) for loadable in candidates]
+      if indexKey:
+        examineIndex.set(indexKey, entry)
 
+    loadables = []
+    for loadableDict in entry:
+      loadable = loadableFromDict(loadableDict, filePath)
+      if "Image3dAPI" in loadable.tooltip and not self.isImage3dApiLoadable(filePath):
+        continue
+      if hasattr(loadable, "frames"):
+        # not taken from the index, so that changing the setting applies to already examined files
+        loadable.lazyFrames = self.isLazyFramesLoadable(loadable.frames)
+      loadables.append(loadable)
+    return loadables
+
+  def readHeader(self, filePath):
+    """Parse the DICOM header of filePath, returns None if it cannot be any of the supported formats.
+    stop_before_pixels cannot be used, as GE and Kretz private elements (7fe1,xxxx) follow the pixel data,
+    but with defer_size large values (such as the pixel data) are skipped, not read.
+    """
     # Quick check of SOP class UID without parsing the file...
     try:
       sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if sopClassUID and (sopClassUID != supportedSOPClassUID):
+      if sopClassUID and (sopClassUID not in self.supportedSOPClassUIDs):
         # Unsupported class
-        return []
+        if self.detailedLogging:
+          logging.debug("Not ultrasound: unsupported SOP Class UID {0} ({1})".format(sopClassUID, filePath))
+        return None
     except Exception as e:
       # Quick check could not be completed (probably Slicer DICOM database is not initialized).
       # No problem, we'll try to parse the file and check the SOP class UID then.
       pass
 
     try:
-      ds = dicom.read_file(filePath, stop_before_pixels=True)
+      ds = dicom.read_file(filePath, defer_size=30) # use defer_size to not load large fields
     except Exception as e:
       if self.detailedLogging:
         logging.debug("Failed to parse DICOM file: {0}".format(str(e)))
-      return []
+      return None
+
+    if ds.get("SOPClassUID") not in self.supportedSOPClassUIDs:
+      return None
+    return ds
+
+  def isImage3dApiLoadable(self, filePath):
+    if not hasattr(slicer.modules, 'ultrasoundimage3dreader'):
+      return False
+    import UltrasoundImage3dReader
+    reader = UltrasoundImage3dReader.UltrasoundImage3dReaderFileReader(None)
+    try:
+      reader.getLoader(filePath)
+    except Exception as e:
+      if self.detailedLogging:
+        logging.debug(f"GeImage3dApi file: 3D ultrasound loader not found error - {str(e)}")
+      logging.info(f"File {filePath} looks like a GE 3D ultrasound file. Installing Image3dAPI reader may make the file loadable (https://github.com/MedicalUltrasound/Image3dAPI).")
+      return False
+    return True
+
+  def examinePhilips4DUS(self, filePath, ds=None):
+    # currently only this one (bogus, non-standard) Philips 4D US format is supported
+    supportedSOPClassUID = '1.2.840.113543.6.6.1.3.10002'
+
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
+        return []
 
     if ds.SOPClassUID != supportedSOPClassUID:
       # Unsupported class
@@ -124,31 +290,19 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
     loadable.tooltip = "Philips 4D Ultrasound"
     loadable.selected = True
     loadable.confidence = confidence
+    # long cine loops are loaded without copying the frames
+    loadable.frames = int(ds.NumberOfFrames) if hasattr(ds, 'NumberOfFrames') and ds.NumberOfFrames else 1
+    loadable.lazyFrames = self.isLazyFramesLoadable(loadable.frames)
 
     return [loadable]
 
-  def examinePhilipsAffinity3DUS(self, filePath):
+  def examinePhilipsAffinity3DUS(self, filePath, ds=None):
     supportedSOPClassUID = '1.2.840.10008.5.1.4.1.1.3.1' # UltrasoundMultiframeImageStorage
 
-    # Quick check of SOP class UID without parsing the file...
-    try:
-      sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if sopClassUID and (sopClassUID != supportedSOPClassUID):
-        # Unsupported class
-        if self.detailedLogging:
-          logging.debug("Not PhilipsAffinity3DUS: sopClassUID "+sopClassUID+" != supportedSOPClassUID "+supportedSOPClassUID)
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
         return []
-    except Exception as e:
-      # Quick check could not be completed (probably Slicer DICOM database is not initialized).
-      # No problem, we'll try to parse the file and check the SOP class UID then.
-      pass
-
-    try:
-      ds = dicom.read_file(filePath, stop_before_pixels=True)
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug("Failed to parse DICOM file: {0}".format(str(e)))
-      return []
 
     if ds.SOPClassUID != supportedSOPClassUID:
       # Unsupported class
@@ -196,27 +350,14 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
 
     return [loadable]
 
-  def examineGeKretzUS(self, filePath):
+  def examineGeKretzUS(self, filePath, ds=None):
     # E Kretz uses 'Ultrasound Image Storage' SOP class UID
     supportedSOPClassUID = '1.2.840.10008.5.1.4.1.1.6.1'
 
-    # Quick check of SOP class UID without parsing the file...
-    try:
-      sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if sopClassUID and (sopClassUID != supportedSOPClassUID):
-        # Unsupported class
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
         return []
-    except Exception as e:
-      # Quick check could not be completed (probably Slicer DICOM database is not initialized).
-      # No problem, we'll try to parse the file and check the SOP class UID then.
-      pass
-
-    try:
-      ds = dicom.read_file(filePath, defer_size=50) # use defer_size to not load large fields
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug("Failed to parse DICOM file: {0}".format(str(e)))
-      return []
 
     if ds.SOPClassUID != supportedSOPClassUID:
       # Unsupported class
@@ -280,28 +421,15 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
 
     return [loadable, loadableHighRes1, loadableHighRes2]
 
-  def examineGeUSMovie(self, filePath):
+  def examineGeUSMovie(self, filePath, ds=None):
     supportedSOPClassUIDs = [
       '1.2.840.10008.5.1.4.1.1.6.1' # UltrasoundImageStorage
       ]
 
-    # Quick check of SOP class UID without parsing the file...
-    try:
-      sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if not sopClassUID in supportedSOPClassUIDs:
-        # Unsupported class
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
         return []
-    except Exception as e:
-      # Quick check could not be completed (probably Slicer DICOM database is not initialized).
-      # No problem, we'll try to parse the file and check the SOP class UID then.
-      pass
-
-    try:
-      ds = dicom.read_file(filePath, defer_size=30) # use defer_size to not load large fields
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug("Failed to parse DICOM file: {0}".format(str(e)))
-      return []
 
     if not ds.SOPClassUID in supportedSOPClassUIDs:
       # Unsupported class
@@ -339,34 +467,17 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
 
     return [loadable]
 
-  def examineGeImage3dApi(self, filePath):
-    if not hasattr(slicer.modules, 'ultrasoundimage3dreader'):
-      return []
-
+  def examineGeImage3dApi(self, filePath, ds=None):
+    # Only checks the header, isImage3dApiLoadable tells if the Image3dAPI reader can load the file
     supportedSOPClassUIDs = [
       '1.2.840.10008.5.1.4.1.1.3.1',  # Ultrasound Multi-frame Image IOD
       '1.2.840.10008.5.1.4.1.1.6.1',  # Ultrasound Image IOD
       ]
 
-    # Quick check of SOP class UID without parsing the file...
-    try:
-      sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if not sopClassUID in supportedSOPClassUIDs:
-        # Unsupported class
-        if self.detailedLogging:
-          logging.debug(f"Not GeImage3dApi file: unsupported SOP Class UID {sopClassUID} ({filePath})")
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
         return []
-    except Exception as e:
-      # Quick check could not be completed (probably Slicer DICOM database is not initialized).
-      # No problem, we'll try to parse the file and check the SOP class UID then.
-      pass
-
-    try:
-      ds = dicom.read_file(filePath, defer_size=30) # use defer_size to not load large fields
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug(f"Not GeImage3dApi file: failed to parse DICOM file {str(e)} ({filePath})")
-      return []
 
     if not ds.SOPClassUID in supportedSOPClassUIDs:
       # Unsupported class
@@ -405,16 +516,6 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
       return []
 
     # It looks like a GE 3D ultrasound file
-    import UltrasoundImage3dReader
-    reader = UltrasoundImage3dReader.UltrasoundImage3dReaderFileReader(None)
-    try:
-      reader.getLoader(filePath)
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug(f"GeImage3dApi file: 3D ultrasound loader not found error - {str(e)}")
-      logging.info(f"File {filePath} looks like a GE 3D ultrasound file. Installing Image3dAPI reader may make the file loadable (https://github.com/MedicalUltrasound/Image3dAPI).")
-      return []
-
     # GE generic moviegroup reader has confidence=0.8
     # this one is much better than that, so use much higher value
     confidence = 0.90
@@ -438,28 +539,13 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
 
     return [loadable]
 
-  def examineEigenArtemis3DUS(self, filePath):
+  def examineEigenArtemis3DUS(self, filePath, ds=None):
     supportedSOPClassUID = '1.2.840.10008.5.1.4.1.1.3.1' # UltrasoundMultiframeImageStorage
 
-    # Quick check of SOP class UID without parsing the file...
-    try:
-      sopClassUID = slicer.dicomDatabase.fileValue(filePath, self.tags['sopClassUID'])
-      if sopClassUID and (sopClassUID != supportedSOPClassUID):
-        # Unsupported class
-        if self.detailedLogging:
-          logging.debug("Not EigenArtemis3DUS: sopClassUID "+sopClassUID+" != supportedSOPClassUID "+supportedSOPClassUID)
+    if ds is None:
+      ds = self.readHeader(filePath)
+      if ds is None:
         return []
-    except Exception as e:
-      # Quick check could not be completed (probably Slicer DICOM database is not initialized).
-      # No problem, we'll try to parse the file and check the SOP class UID then.
-      pass
-
-    try:
-      ds = dicom.read_file(filePath, stop_before_pixels=True)
-    except Exception as e:
-      if self.detailedLogging:
-        logging.debug("Failed to parse DICOM file: {0}".format(str(e)))
-      return []
 
     if ds.SOPClassUID != supportedSOPClassUID:
       # Unsupported class
@@ -630,49 +716,27 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
     return outputVolume
 
   def loadPhilips4DUSAsSequence(self,loadable):
-    """Load the selection as an Ultrasound, store in a Sequence node
+    """Load the selection as an Ultrasound, store in a Sequence node.
+    The pixel data is memory-mapped once and each frame is created from a view of the mapping.
+    If loadable.lazyFrames is True then frames are not copied: the sequence refers to the mapped file
+    and voxels are only read from disk when a frame is accessed (useful for very long cine loops).
+    examinePhilips4DUS sets it for sequences with many frames (see isLazyFramesLoadable).
     """
 
-    # get the key info from the "fake" dicom file
-    filePath = loadable.files[0]
-    ds = dicom.read_file(filePath, stop_before_pixels=True)
-    columns = ds.Columns
-    rows = ds.Rows
-    slices = ds[(0x3001,0x1001)].value # private tag!
-    spacing = (
-            ds.PhysicalDeltaX * 10,
-            ds.PhysicalDeltaY * 10,
-            ds[(0x3001,0x1003)].value * 10 # private tag!
-            )
-    frames  = int(ds.NumberOfFrames)
-    imageComponents = frames
-    frameTimeMsec = ds.FrameTime
-
-    pixelShape = (frames, slices, rows, columns)
-    pixelSize = pixelShape[0] * pixelShape[1] * pixelShape[2] * pixelShape[3]
-    totalFileSize = os.path.getsize(filePath)
-    headerSize = totalFileSize-pixelSize
+    image = Philips4DUSImage(loadable.files[0])
+    lazyFrames = hasattr(loadable, 'lazyFrames') and loadable.lazyFrames
 
     outputSequenceNode = slicer.vtkMRMLSequenceNode()
 
-    for frame in range(frames):
-
-      imgReader = vtk.vtkImageReader()
-      imgReader.SetFileDimensionality(3)
-      imgReader.SetFileName(filePath)
-      imgReader.SetNumberOfScalarComponents(1)
-      imgReader.SetDataScalarTypeToUnsignedChar()
-      imgReader.SetDataExtent(0,columns-1, 0,rows-1, 0,slices-1)
-      imgReader.SetHeaderSize(headerSize+frame*slices*rows*columns)
-      imgReader.FileLowerLeftOn()
-      imgReader.Update()
-
-      outputNode = slicer.vtkMRMLScalarVolumeNode()
-      outputNode.SetAndObserveImageData(imgReader.GetOutput())
-      outputNode.SetSpacing(spacing)
-
-      timeStampSec = "{:.3f}".format(frame * frameTimeMsec * 0.001)
-      outputSequenceNode.SetDataNodeAtValue(outputNode, timeStampSec)
+    # The sequence node stores a copy of the added node, so the frame node is added without image data
+    # and the image data of the stored copy is set afterwards, to avoid copying voxels
+    frameNode = slicer.vtkMRMLScalarVolumeNode()
+    frameNode.SetSpacing(image.spacing)
+    for frame in range(image.frames):
+      timeStampSec = "{:.3f}".format(frame * image.frameTimeMsec * 0.001)
+      outputSequenceNode.SetDataNodeAtValue(frameNode, timeStampSec)
+      outputNode = outputSequenceNode.GetDataNodeAtValue(timeStampSec)
+      outputNode.SetAndObserveImageData(image.frameImageData(frame, copy=not lazyFrames))
 
     outputSequenceNode.SetName(slicer.mrmlScene.GenerateUniqueName(loadable.name))
     slicer.mrmlScene.AddNode(outputSequenceNode)
@@ -707,43 +771,20 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
     """Load the selection as an Ultrasound, store in MultiVolume
     """
 
-    # get the key info from the "fake" dicom file
-    filePath = loadable.files[0]
-    ds = dicom.read_file(filePath, stop_before_pixels=True)
-    columns = ds.Columns
-    rows = ds.Rows
-    slices = ds[(0x3001,0x1001)].value # private tag!
-    spacing = (
-            ds.PhysicalDeltaX * 10,
-            ds.PhysicalDeltaY * 10,
-            ds[(0x3001,0x1003)].value * 10 # private tag!
-            )
-    frames  = int(ds.NumberOfFrames)
+    image = Philips4DUSImage(loadable.files[0])
+    frames = image.frames
     imageComponents = frames
 
     # create the correct size and shape vtkImageData
-    image = vtk.vtkImageData()
-    imageShape = (slices, rows, columns, frames)
-    image.SetDimensions(columns, rows, slices)
-    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, imageComponents)
+    vtkImage = vtk.vtkImageData()
+    imageShape = (image.slices, image.rows, image.columns, frames)
+    vtkImage.SetDimensions(image.columns, image.rows, image.slices)
+    vtkImage.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, imageComponents)
     from vtk.util.numpy_support import vtk_to_numpy
-    imageArray = vtk_to_numpy(image.GetPointData().GetScalars()).reshape(imageShape)
-
-    # put the data in a numpy array
-    # -- we need to read the file as raw bytes
-    pixelShape = (frames, slices, rows, columns)
-    pixels = numpy.fromfile(filePath, dtype=numpy.uint8)
-    pixelSize = pixelShape[0] * pixelShape[1] * pixelShape[2] * pixelShape[3]
-    headerSize = len(pixels)-pixelSize
-    pixels = pixels[headerSize:]
-    pixels = pixels.reshape(pixelShape)
-
-    slicer.modules.imageArray = imageArray
-    slicer.modules.pixels = pixels
+    imageArray = vtk_to_numpy(vtkImage.GetPointData().GetScalars()).reshape(imageShape)
 
-    # copy the data from numpy to vtk (need to shuffle frames to components)
-    for frame in range(frames):
-      imageArray[:,:,:,frame] = pixels[frame]
+    # copy the data from the mapped file to vtk (need to shuffle frames to components)
+    imageArray[:] = numpy.moveaxis(image.pixels, 0, -1)
 
     # create the multivolume node and display it
     multiVolumeNode = slicer.vtkMRMLMultiVolumeNode()
@@ -757,7 +798,7 @@ class DicomUltrasoundPluginClass(DICOMPlugin):
     slicer.mrmlScene.AddNode(multiVolumeDisplayNode)
 
     multiVolumeNode.SetAndObserveDisplayNodeID(multiVolumeDisplayNode.GetID())
-    multiVolumeNode.SetAndObserveImageData(image)
+    multiVolumeNode.SetAndObserveImageData(vtkImage)
     multiVolumeNode.SetNumberOfFrames(frames)
     multiVolumeNode.SetName(loadable.name)
     slicer.mrmlScene.AddNode(multiVolumeNode)
@@ -873,6 +914,51 @@ class DicomUltrasoundPlugin:
       slicer.modules.dicomPlugins = {}
     slicer.modules.dicomPlugins['DicomUltrasoundPlugin'] = DicomUltrasoundPluginClass
 
+class Philips4DUSImage(object):
+  """Philips 4D ultrasound file (bogus, non-standard DICOM).
+  The file contains the DICOM header followed by the voxels (unsigned char) of all frames.
+  The voxels are memory-mapped once as a (frames, slices, rows, columns) array, frames are views of it.
+  """
+
+  def __init__(self, filePath):
+    # get the key info from the "fake" dicom file
+    ds = dicom.read_file(filePath, stop_before_pixels=True)
+    self.columns = int(ds.Columns)
+    self.rows = int(ds.Rows)
+    self.slices = int(ds[(0x3001,0x1001)].value) # private tag!
+    self.spacing = (
+            ds.PhysicalDeltaX * 10,
+            ds.PhysicalDeltaY * 10,
+            ds[(0x3001,0x1003)].value * 10 # private tag!
+            )
+    self.frames = int(ds.NumberOfFrames)
+    self.frameTimeMsec = ds.FrameTime
+
+    pixelShape = (self.frames, self.slices, self.rows, self.columns)
+    pixelSize = self.frames * self.slices * self.rows * self.columns
+    headerSize = os.path.getsize(filePath) - pixelSize
+    if headerSize < 0:
+      raise ValueError("Philips 4D ultrasound file is too short for {0} frames of {1}x{2}x{3} voxels: {4}".format(
+        self.frames, self.columns, self.rows, self.slices, filePath))
+    # Copy-on-write mapping: voxels are read from disk when they are accessed and the file is never modified
+    self.pixels = numpy.memmap(filePath, dtype=numpy.uint8, mode='c', offset=headerSize, shape=pixelShape)
+
+  def frameArray(self, frame):
+    """Voxels of a frame as a (slices, rows, columns) view of the mapped file"""
+    return self.pixels[frame]
+
+  def frameImageData(self, frame, copy=True):
+    """vtkImageData of a frame. If copy is False then the image refers to the mapped file."""
+    from vtk.util import numpy_support
+    voxels = self.frameArray(frame)
+    if copy:
+      voxels = numpy.array(voxels)
+    imageData = vtk.vtkImageData()
+    imageData.SetDimensions(self.columns, self.rows, self.slices)
+    # numpy_to_vtk keeps a reference to the array (and so to the mapping) in the vtk array
+    imageData.GetPointData().SetScalars(numpy_support.numpy_to_vtk(voxels.reshape(-1), deep=False, array_type=vtk.VTK_UNSIGNED_CHAR))
+    return imageData
+
 def findPrivateTag(ds, group, element, privateCreator):
   """Helper function to get private tag from private creator name"""
   for tag, data_element in ds.items():
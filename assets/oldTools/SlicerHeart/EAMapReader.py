@@ -9,9 +9,16 @@ import xml.etree.ElementTree as ET
 import re
 import zipfile
 import shutil
-import struct
 import numpy as np
-import math
+import mmap
+import bisect
+import hashlib
+import json
+import sys
+import concurrent.futures
+import concurrent.futures.process
+
+from EAMapReaderLib import CartoParser
 
 ################################################################################
 # EAMapReader
@@ -70,6 +77,11 @@ class EAMapReaderWidget(ScriptedLoadableModuleWidget):
     self.buttonRhythmia.enabled = True
     self.layout.addWidget(self.buttonRhythmia)
 
+    self.useCacheCheckBox = qt.QCheckBox("Use import cache")
+    self.useCacheCheckBox.toolTip = "Re-open previously imported files from the import cache instead of importing them again."
+    self.useCacheCheckBox.checked = True
+    self.layout.addWidget(self.useCacheCheckBox)
+
     self.statusLabel = qt.QPlainTextEdit()
     self.statusLabel.setTextInteractionFlags(qt.Qt.TextSelectableByMouse)
     self.statusLabel.setCenterOnScroll(True)
@@ -84,10 +96,14 @@ class EAMapReaderWidget(ScriptedLoadableModuleWidget):
     self.buttonEnsite.connect('clicked(bool)', self.onButtonEnsite)
     self.buttonCarto.connect('clicked(bool)', self.onButtonCarto)
     self.buttonRhythmia.connect('clicked(bool)', self.onButtonRhythmia)
+    self.useCacheCheckBox.connect('toggled(bool)', self.onUseCacheToggled)
 
   def cleanup(self):
     pass
 
+  def onUseCacheToggled(self, checked):
+    self.logic.useCache = checked
+
   def reenableButtons(self):
     self.buttonEnsite.text = "Ensite"
     self.buttonEnsite.enabled = True
@@ -166,6 +182,312 @@ class EAMapReaderWidget(ScriptedLoadableModuleWidget):
     self.progressBar.setValue(percent)
     slicer.app.processEvents()  # force update
 
+################################################################################
+# RhythmiaArchive
+#
+
+class RhythmiaArchive(object):
+  """Read-only view of a RHYTHMIA archive split into parts (.000, .001, ...) as one byte sequence.
+  Every part is memory-mapped in place, nothing is copied or concatenated on disk.
+  Positions are absolute offsets in the virtually concatenated archive.
+  """
+
+  def __init__(self, partFilenames):
+    self.partFilenames = []
+    self.files = []
+    self.maps = []
+    self.starts = []
+    self.size = 0
+    for partFilename in partFilenames:
+      partSize = os.stat(partFilename).st_size
+      if partSize == 0: # empty part cannot be mapped and holds nothing
+        continue
+      fileHandle = open(partFilename, "rb")
+      self.partFilenames.append(partFilename)
+      self.files.append(fileHandle)
+      self.maps.append(mmap.mmap(fileHandle.fileno(), 0, access=mmap.ACCESS_READ))
+      self.starts.append(self.size)
+      self.size += partSize
+
+  def close(self):
+    for partMap in self.maps:
+      partMap.close()
+    for fileHandle in self.files:
+      fileHandle.close()
+    self.maps = []
+    self.files = []
+
+  def partIndex(self, position):
+    return bisect.bisect_right(self.starts, position) - 1
+
+  def partSegments(self, start, stop):
+    # List of (part index, offset in part, length) covering [start, stop)
+    segments = []
+    position = start
+    while position < stop:
+      i = self.partIndex(position)
+      local = position - self.starts[i]
+      length = min(stop - position, len(self.maps[i]) - local)
+      segments.append((i, local, length))
+      position += length
+    return segments
+
+  def segments(self, start, stop):
+    # List of (part filename, offset in part, length) covering [start, stop)
+    return [(self.partFilenames[i], offset, length) for i, offset, length in self.partSegments(start, stop)]
+
+  def read(self, start, stop):
+    # Copy of the bytes [start, stop), may span parts. Only meant for short ranges (tags).
+    stop = min(stop, self.size)
+    chunks = []
+    for i, offset, length in self.partSegments(start, stop):
+      chunks.append(self.maps[i][offset:offset+length])
+    return b"".join(chunks)
+
+  def search(self, pattern, start, maxMatchLength=4096):
+    # Find the first match of the compiled bytes pattern at or after start.
+    # Matches spanning two parts are found by searching a small window around each part boundary.
+    # Returns (absolute start, absolute end, match) or None.
+    if start >= self.size:
+      return None
+    i = self.partIndex(start)
+    local = start - self.starts[i]
+    while i < len(self.maps):
+      partMap = self.maps[i]
+      match = pattern.search(partMap, local)
+      if match:
+        return self.starts[i]+match.start(), self.starts[i]+match.end(), match
+      if i+1 < len(self.maps):
+        windowStart = max(local, len(partMap) - maxMatchLength)
+        window = partMap[windowStart:] + self.read(self.starts[i+1], self.starts[i+1]+maxMatchLength)
+        match = pattern.search(window)
+        if match:
+          base = self.starts[i] + windowStart
+          return base+match.start(), base+match.end(), match
+      i += 1
+      local = 0
+    return None
+
+  def write(self, fileHandle, start, stop, chunkSize=64*1024*1024):
+    # Write bytes [start, stop) to fileHandle in chunks of at most chunkSize
+    for i, offset, length in self.partSegments(start, stop):
+      partMap = self.maps[i]
+      for chunkStart in range(offset, offset+length, chunkSize):
+        fileHandle.write(partMap[chunkStart:min(chunkStart+chunkSize, offset+length)])
+
+################################################################################
+# Markups helper
+#
+
+def setMarkupsControlPoints(markupsNode, positions, labels, measurements=None):
+  # Replace the control points of markupsNode in one batch (one modified event instead of several per point).
+  # positions : n x 3 array of coordinates
+  # labels : list of n control point labels, all control points are locked
+  # measurements : list of (name, units, array of n values), added as per-point measurement arrays
+  from vtk.util import numpy_support
+  wasModifying = markupsNode.StartModify()
+  slicer.util.updateMarkupsControlPointsFromArray(markupsNode, np.asarray(positions, dtype=float).reshape(-1, 3))
+  for i in range(len(labels)):
+    markupsNode.SetNthControlPointLabel(i, labels[i])
+    markupsNode.SetNthControlPointLocked(i, True)
+  for name, units, values in (measurements or []):
+    valuesArray = numpy_support.numpy_to_vtk(np.ascontiguousarray(values, dtype=np.float64), deep=True)
+    valuesArray.SetName(name)
+    measurement = slicer.vtkMRMLStaticMeasurement()
+    measurement.SetName(name)
+    measurement.SetUnits(units)
+    measurement.SetControlPointValues(valuesArray)
+    markupsNode.AddMeasurement(measurement)
+  markupsNode.EndModify(wasModifying)
+
+################################################################################
+# EAMapCache
+#
+
+class EAMapCache(object):
+  """Content-addressed cache of imported maps.
+  The models and markups created by an import are stored in one uncompressed npz file per study,
+  named by the SHA-256 of the source file contents and the reader version. Coordinates are stored
+  after the import transforms have been hardened, so nodes can be re-created directly from the arrays.
+  """
+
+  # Increase when the importers change what they create, this invalidates all cached studies.
+  readerVersion = "2"
+
+  def __init__(self, directory):
+    self.directory = directory
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    # (path, size, modification time) -> content hash, so unchanged files are not hashed again
+    self.hashIndexFilename = os.path.join(directory, "hashindex.json")
+    try:
+      with open(self.hashIndexFilename, "r") as indexFile:
+        self.hashIndex = json.load(indexFile)
+    except (IOError, ValueError):
+      self.hashIndex = {}
+
+  def fileHash(self, filename, abortCallback=None, chunkSize=16*1024*1024):
+    # SHA-256 of a file, None if aborted
+    fileStat = os.stat(filename)
+    indexKey = os.path.abspath(filename)+"|"+str(fileStat.st_size)+"|"+str(fileStat.st_mtime_ns)
+    if indexKey in self.hashIndex:
+      return self.hashIndex[indexKey]
+    fileHash = hashlib.sha256()
+    with open(filename, "rb") as fileHandle:
+      while True:
+        chunk = fileHandle.read(chunkSize)
+        if len(chunk) == 0:
+          break
+        fileHash.update(chunk)
+        if abortCallback and abortCallback():
+          return None
+    self.hashIndex[indexKey] = fileHash.hexdigest()
+    with open(self.hashIndexFilename, "w") as indexFile:
+      json.dump(self.hashIndex, indexFile)
+    return self.hashIndex[indexKey]
+
+  def key(self, reader, filenames, abortCallback=None):
+    # Cache key of a study read by reader ("Ensite", "CARTO", "RHYTHMIA") from the source files filenames
+    studyHash = hashlib.sha256((reader+"|"+self.readerVersion).encode())
+    for filename in filenames:
+      fileHash = self.fileHash(filename, abortCallback)
+      if fileHash is None:
+        return None
+      studyHash.update(fileHash.encode())
+    return studyHash.hexdigest()
+
+  def filename(self, key):
+    return os.path.join(self.directory, key+".npz")
+
+  def contains(self, key):
+    return os.path.isfile(self.filename(key))
+
+  def save(self, key, nodes):
+    # Store the model and markups fiducial nodes
+    from vtk.util import numpy_support
+    manifest = []
+    arrays = {}
+    for nodeIndex, node in enumerate(nodes):
+      prefix = "node"+str(nodeIndex)+"_"
+      entry = {"name": node.GetName(), "hierarchy": self.subjectHierarchyPath(node)}
+      if node.IsA("vtkMRMLModelNode"):
+        entry["class"] = "model"
+        mesh = node.GetPolyData()
+        arrays[prefix+"points"] = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData())
+        polys = mesh.GetPolys()
+        arrays[prefix+"offsets"] = numpy_support.vtk_to_numpy(polys.GetOffsetsArray())
+        arrays[prefix+"connectivity"] = numpy_support.vtk_to_numpy(polys.GetConnectivityArray())
+        pointData = mesh.GetPointData()
+        entry["normals"] = pointData.GetNormals().GetName() if pointData.GetNormals() else None
+        entry["pointArrays"] = []
+        for arrayIndex in range(pointData.GetNumberOfArrays()):
+          array = pointData.GetArray(arrayIndex)
+          entry["pointArrays"].append(array.GetName())
+          arrays[prefix+"pointArray"+str(arrayIndex)] = numpy_support.vtk_to_numpy(array)
+      else:
+        entry["class"] = "markups"
+        arrays[prefix+"positions"] = slicer.util.arrayFromMarkupsControlPoints(node)
+        numberOfPoints = node.GetNumberOfControlPoints()
+        entry["labels"] = [node.GetNthControlPointLabel(i) for i in range(numberOfPoints)]
+        entry["measurements"] = []
+        for measurementIndex in range(node.GetNumberOfMeasurements()):
+          measurement = node.GetNthMeasurement(measurementIndex)
+          if measurement.GetControlPointValues() is None:
+            continue
+          arrays[prefix+"measurement"+str(len(entry["measurements"]))] = numpy_support.vtk_to_numpy(measurement.GetControlPointValues())
+          entry["measurements"].append([measurement.GetName(), measurement.GetUnits()])
+        displayNode = node.GetDisplayNode()
+        entry["display"] = {
+          "textScale": displayNode.GetTextScale(),
+          "useGlyphScale": displayNode.GetUseGlyphScale(),
+          "glyphSize": displayNode.GetGlyphSize(),
+          "glyphScale": displayNode.GetGlyphScale(),
+          "selectedColor": list(displayNode.GetSelectedColor()),
+          "visibility": displayNode.GetVisibility(),
+          }
+      manifest.append(entry)
+    arrays["manifest"] = np.frombuffer(json.dumps(manifest).encode(), dtype=np.uint8)
+    # write to a temporary file first so that an interrupted save never leaves a truncated cache entry
+    temporaryFilename = self.filename(key)+".tmp.npz"
+    np.savez(temporaryFilename, **arrays)
+    os.replace(temporaryFilename, self.filename(key))
+
+  def load(self, key):
+    # Re-create the nodes stored under key, returns the list of nodes
+    from vtk.util import numpy_support
+    nodes = []
+    with np.load(self.filename(key), allow_pickle=False) as arrays:
+      manifest = json.loads(arrays["manifest"].tobytes().decode())
+      for nodeIndex, entry in enumerate(manifest):
+        prefix = "node"+str(nodeIndex)+"_"
+        if entry["class"] == "model":
+          mesh = vtk.vtkPolyData()
+          points = vtk.vtkPoints()
+          points.SetData(numpy_support.numpy_to_vtk(arrays[prefix+"points"], deep=True))
+          mesh.SetPoints(points)
+          polys = vtk.vtkCellArray()
+          polys.SetData(numpy_support.numpy_to_vtkIdTypeArray(arrays[prefix+"offsets"].astype(numpy_support.ID_TYPE_CODE), deep=True),
+            numpy_support.numpy_to_vtkIdTypeArray(arrays[prefix+"connectivity"].astype(numpy_support.ID_TYPE_CODE), deep=True))
+          mesh.SetPolys(polys)
+          for arrayIndex, arrayName in enumerate(entry["pointArrays"]):
+            array = numpy_support.numpy_to_vtk(arrays[prefix+"pointArray"+str(arrayIndex)], deep=True)
+            array.SetName(arrayName)
+            if arrayName == entry["normals"]:
+              mesh.GetPointData().SetNormals(array)
+            else:
+              mesh.GetPointData().AddArray(array)
+          node = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
+          node.SetAndObservePolyData(mesh)
+          node.SetName(entry["name"])
+          node.CreateDefaultDisplayNodes()
+        else:
+          node = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLMarkupsFiducialNode')
+          node.SetName(entry["name"])
+          node.CreateDefaultDisplayNodes()
+          measurements = [(name, units, arrays[prefix+"measurement"+str(measurementIndex)])
+            for measurementIndex, (name, units) in enumerate(entry["measurements"])]
+          setMarkupsControlPoints(node, arrays[prefix+"positions"], entry["labels"], measurements)
+          display = entry["display"]
+          displayNode = node.GetDisplayNode()
+          displayNode.SetTextScale(display["textScale"])
+          displayNode.SetUseGlyphScale(display["useGlyphScale"])
+          displayNode.SetGlyphSize(display["glyphSize"])
+          displayNode.SetGlyphScale(display["glyphScale"])
+          displayNode.SetSelectedColor(display["selectedColor"])
+          displayNode.SetVisibility(display["visibility"])
+        self.setSubjectHierarchyPath(node, entry["hierarchy"])
+        nodes.append(node)
+    return nodes
+
+  def subjectHierarchyPath(self, node):
+    # [[name, level], ...] of the subject hierarchy items above node, from the top
+    shNode = slicer.vtkMRMLSubjectHierarchyNode.GetSubjectHierarchyNode(slicer.mrmlScene)
+    sceneItemID = shNode.GetSceneItemID()
+    path = []
+    itemID = shNode.GetItemParent(shNode.GetItemByDataNode(node))
+    while itemID and itemID != sceneItemID:
+      path.insert(0, [shNode.GetItemName(itemID), shNode.GetItemLevel(itemID)])
+      itemID = shNode.GetItemParent(itemID)
+    return path
+
+  def setSubjectHierarchyPath(self, node, path):
+    # Put node below the subject hierarchy items path, creating missing items
+    if len(path) == 0:
+      return
+    shNode = slicer.vtkMRMLSubjectHierarchyNode.GetSubjectHierarchyNode(slicer.mrmlScene)
+    parentItemID = shNode.GetSceneItemID()
+    for name, level in path:
+      itemID = shNode.GetItemChildWithName(parentItemID, name)
+      if not itemID:
+        if level == "Patient":
+          itemID = shNode.CreateSubjectItem(parentItemID, name)
+        elif level == "Study":
+          itemID = shNode.CreateStudyItem(parentItemID, name)
+        else:
+          itemID = shNode.CreateFolderItem(parentItemID, name)
+      parentItemID = itemID
+    shNode.SetItemParent(shNode.GetItemByDataNode(node), parentItemID)
+
 ################################################################################
 # EAMapReaderLogic
 #
@@ -180,6 +502,10 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     self.progressCallback = None
     self.abortRequested = False
     self.progress = 0
+    self.rhythmiaPayloads = {}
+    self.useCache = True
+    self.cache = None
+    self.maxWorkers = None  # number of processes for parsing CARTO files, None: number of CPUs
 
   def addLog(self, text):
     logging.info(text)
@@ -205,6 +531,55 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     qt.QDir().mkpath(dirPath)
     return dirPath
 
+  ################################################################################
+  # Import cache
+  #
+
+  def getCache(self):
+    if self.cache is None:
+      self.cache = EAMapCache(os.path.join(slicer.app.cachePath, "EAMapReader"))
+    return self.cache
+
+  def importedNodes(self):
+    # Nodes the importers create: models and markups fiducials
+    nodes = []
+    for className in ["vtkMRMLModelNode", "vtkMRMLMarkupsFiducialNode"]:
+      nodes.extend(slicer.util.getNodesByClass(className))
+    return nodes
+
+  def readCached(self, reader, sourceFilenames, importFunction, filename):
+    # Load the study from the cache if the source files were imported before,
+    # otherwise import it with importFunction(filename) and add the created nodes to the cache.
+    if not self.useCache or len(sourceFilenames) == 0:
+      return importFunction(filename)
+
+    cache = self.getCache()
+    self.addLog("Checking import cache ...")
+    key = cache.key(reader, sourceFilenames, lambda: self.abortRequested)
+    if key is None:
+      return False
+
+    if cache.contains(key):
+      try:
+        nodes = cache.load(key)
+        self.addLog("Loaded "+str(len(nodes))+" node(s) from import cache.")
+        self.progress = 100
+        self.updateProgress()
+        self.addLog("Done.")
+        return True
+      except Exception as e:
+        self.addLog("Import cache entry could not be read ("+str(e)+"), importing file.")
+
+    nodesBefore = set(node.GetID() for node in self.importedNodes())
+    if not importFunction(filename):
+      return False
+    nodes = [node for node in self.importedNodes() if node.GetID() not in nodesBefore]
+    try:
+      cache.save(key, nodes)
+    except Exception as e:
+      self.addLog("Import could not be stored in the import cache ("+str(e)+").")
+    return True
+
   ################################################################################
   # Model creation
   #
@@ -215,72 +590,85 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
       vil.InsertNextId(int(i))
     return vil
 
+  # Number of rows converted per step when building meshes from Python lists.
+  # Abort requests are checked after each chunk.
+  meshChunkSize = 100000
+
+  def arrayFromSequence(self, sequence, dtype, columns):
+    # Convert a list of n tuples (or an array) to a contiguous (n, columns) numpy array.
+    # Lists are converted chunk by chunk so that cancelling is possible on large meshes.
+    # Returns None if abort was requested.
+    if isinstance(sequence, np.ndarray):
+      array = np.asarray(sequence, dtype=dtype)
+      if array.ndim == 1:
+        array = array.reshape(-1, columns)
+      return np.ascontiguousarray(array[:, :columns])
+    array = np.empty((len(sequence), columns), dtype=dtype)
+    for start in range(0, len(sequence), self.meshChunkSize):
+      stop = start + self.meshChunkSize
+      array[start:stop] = [row[:columns] for row in sequence[start:stop]]
+      if self.abortRequested:
+        return None
+    return array
+
   def CreateMesh(self, modelNode, arrayVertices, arrayVertexNormals, arrayTriangles, labelsScalars, arrayScalars):
-    # based on https://vtk.org/Wiki/VTK/Examples/Python/DataManipulation/Cube.py
     # modelNode : a vtkMRMLModelNode in the Slicer scene which will hold the mesh
-    # arrayVertices : list of triples [[x1,y1,z2], [x2,y2,z2], ... ,[xn,yn,zn]] of vertex coordinates
-    # arrayVertexNormals : list of triples [[nx1,ny1,nz2], [nx2,ny2,nz2], ... ] of vertex normals
-    # arrayTriangles : list of triples of 0-based indices defining triangles
+    # arrayVertices : n x 3 array (or list of triples [[x1,y1,z2], [x2,y2,z2], ... ,[xn,yn,zn]]) of vertex coordinates
+    # arrayVertexNormals : n x 3 array (or list of triples [[nx1,ny1,nz2], [nx2,ny2,nz2], ... ]) of vertex normals
+    # arrayTriangles : t x 3 array (or list of triples) of 0-based indices defining triangles
     # labelsScalars : list of strings such as ["bipolar", "unipolar"] to label the individual scalars data sets
-    # arrayScalars : list of n m-tuples for n vertices and m individual scalar sets
-
-    # create the building blocks of polydata including data attributes.
-    mesh    = vtk.vtkPolyData()
-    points  = vtk.vtkPoints()
-    normals = vtk.vtkFloatArray()
-    polys   = vtk.vtkCellArray()
-
-    # load the array data into the respective VTK data structures
-    #self.addLog("  Initializing vertices.")
-    for i in range(len(arrayVertices)):
-      points.InsertPoint(i, arrayVertices[i])
-
-    if self.abortRequested:
+    # arrayScalars : n x m array (or list of n m-tuples) for n vertices and m individual scalar sets
+    #
+    # All data is converted to contiguous numpy arrays once and handed over to VTK without copying
+    # (numpy_to_vtk keeps a reference to the numpy array), instead of inserting points, cells and
+    # tuples one by one.
+    from vtk.util import numpy_support
+
+    vertices = self.arrayFromSequence(arrayVertices, np.float64, 3)
+    if vertices is None:
       return False
+    normals = self.arrayFromSequence(arrayVertexNormals, np.float32, 3)
+    if normals is None:
+      return False
+    triangles = self.arrayFromSequence(arrayTriangles, numpy_support.ID_TYPE_CODE, 3)
+    if triangles is None:
+      return False
+    scalars = None
+    if len(labelsScalars) > 0:
+      scalars = self.arrayFromSequence(arrayScalars, np.float32, len(labelsScalars))
+      if scalars is None:
+        return False
 
-    #self.addLog("  Initializing triangles.")
-    for i in range(len(arrayTriangles)):
-      polys.InsertNextCell(self.mkVtkIdList(arrayTriangles[i]))
-
-    if self.abortRequested:
+    if len(triangles) > 0 and (triangles.min() < 0 or triangles.max() >= len(vertices)):
+      self.addLog("  ERROR: Triangle vertex index out of range.")
       return False
 
-    # Normals: http://vtk.1045678.n5.nabble.com/Set-vertex-normals-td5734525.html
-    # First pre-allocating memory for the vtkDataArray using vtkDataArray::SetNumberOfComponents() and vtkDataArray::SetNumberOfTuples()
-    # and then setting the actual values through SetTuple() is orders of magnitude faster than inserting them one-by-one (and allocating memory dynamically)
-    # with InsertTuple()
-    normals.SetNumberOfComponents(3)
-    normals.SetNumberOfTuples(len(arrayVertexNormals))
-    #self.addLog("  Initializing normals.")
-    for i in range(len(arrayVertexNormals)):
-      normals.SetTuple3(i, arrayVertexNormals[i][0], arrayVertexNormals[i][1], arrayVertexNormals[i][2])
-      if self.abortRequested:
-        return False
+    mesh = vtk.vtkPolyData()
 
-    # put together the mesh object
-    # self.addLog("  Building mesh.")
+    points = vtk.vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(vertices))
     mesh.SetPoints(points)
+
+    # VTK 9 cell array layout: offsets (t+1 values) into a flat connectivity array
+    offsets = np.arange(0, 3 * len(triangles) + 1, 3, dtype=numpy_support.ID_TYPE_CODE)
+    connectivity = triangles.ravel()
+    polys = vtk.vtkCellArray()
+    polys.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets), numpy_support.numpy_to_vtkIdTypeArray(connectivity))
     mesh.SetPolys(polys)
-    if(len(arrayVertexNormals) == len(arrayVertices)):
-      mesh.GetPointData().SetNormals(normals)
 
     if self.abortRequested:
       return False
 
-    # self.addLog("  Adding scalar data.")
+    if len(normals) == len(vertices):
+      vtkNormals = numpy_support.numpy_to_vtk(normals)
+      vtkNormals.SetName("Normals")
+      mesh.GetPointData().SetNormals(vtkNormals)
 
     # Add scalars
-    scalars = []
     for j in range(len(labelsScalars)):
-      scalars.append(vtk.vtkFloatArray())
-      scalars[j].SetNumberOfComponents(1)
-      scalars[j].SetNumberOfTuples(len(arrayScalars))
-      for i in range(len(arrayScalars)):
-        scalars[j].SetTuple1(i,arrayScalars[i][j])
-        if self.abortRequested:
-          return False
-      scalars[j].SetName(labelsScalars[j])
-      mesh.GetPointData().AddArray(scalars[j])
+      scalarArray = numpy_support.numpy_to_vtk(np.ascontiguousarray(scalars[:, j]))
+      scalarArray.SetName(labelsScalars[j])
+      mesh.GetPointData().AddArray(scalarArray)
 
     if self.abortRequested:
       return False
@@ -320,30 +708,32 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
         yield item
 
   def TextToFloat(self, text):
-    # First remove any leading and trailing spaces and newlines
-    leadingNonDigits = r"^[^0-9.-]*"
-    trailingNonDigits = r"[^0-9.-]*$"
-    text = re.sub(leadingNonDigits, "",text)
-    text = re.sub(trailingNonDigits, "",text)
-    lines = re.split(r"\n",text)
-    numbers = []
-    for i in range(len(lines)):
-      lines[i] = re.sub(leadingNonDigits, "",lines[i])
-      lines[i] = re.sub(trailingNonDigits, "",lines[i])
-      lineSplit = re.split(r"\s+", lines[i])
-      #print(lines[i])
-      #print(lineSplit)
-      thisNumbers = []
-      for j in range(len(lineSplit)):
-        thisNumbers.append(float(lineSplit[j]))
-      numbers.append(thisNumbers)
-    return numbers
+    # Kept for compatibility: list of lists of floats, one list per non-empty line
+    return self.TextToArray(text).tolist()
+
+  ################################################################################
+  # Numeric text parsing helper functions
+  #
+
+  def LinesToArray(self, lines, dtype=float):
+    # Convert lines of whitespace separated numbers into a (number of lines, values per line) array
+    return CartoParser.linesToArray(lines, dtype)
+
+  def TextToArray(self, text, dtype=float):
+    # Whitespace separated numbers, one row per non-empty line (e.g. Ensite XML element text) -> 2D array
+    return self.LinesToArray([line for line in text.splitlines() if line.strip()], dtype)
 
   ################################################################################
   # Ensite import
   #
 
+  # Elements of an Ensite <Volume> that are read into arrays
+  ensiteVolumeElements = ["Vertices", "Map_data", "Normals", "Polygons", "Surface_of_origin"]
+
   def readEnsite(self, filename):
+    return self.readCached("Ensite", [filename], self.importEnsite, filename)
+
+  def importEnsite(self, filename):
     self.progress = 0
     self.updateProgress()
     if self.abortRequested:
@@ -351,145 +741,131 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
 
     self.addLog("Importing Ensite map:")
     self.addLog("  Parsing file "+filename)
-    tree = ET.parse(filename)
-    root = tree.getroot()
-
-    self.progress = 5
-    self.updateProgress()
-    if self.abortRequested:
-      return False
 
-    volumes = list(self.findallRecursive(root, "Volume"))
-
-    self.addLog("  Found "+str(len(volumes))+" volumes(s) in file.")
-    self.progress = 10
-    self.updateProgress()
-    if self.abortRequested:
-      return False
-
-    progressSteps = 6
+    # The file is parsed incrementally: the text of each volume element is converted to an array as soon as
+    # the element is complete and the element is cleared, so only one volume's arrays are kept in memory.
+    fileSize = max(os.stat(filename).st_size, 1)
+    progressStart = 5
     progressEnd = 100
-    progressIncrement = ((progressEnd - self.progress)/progressSteps)/len(volumes)
+    self.progress = progressStart
+    self.updateProgress()
 
     volumeCounter = 0
-    for volume in volumes:
-      try:
-        plaintext = volume.find("Vertices").text
-        vertices = self.TextToFloat(plaintext)
-        self.addLog("  Reading volume "+str(volumeCounter)+".")
-        self.addLog("  Read "+str(len(vertices))+" vertices.")
-        self.progress = self.progress + progressIncrement
-        self.updateProgress()
-      except AttributeError:
-        self.addLog("  ERROR: No vertices found in volume "+str(volumeCounter)+".")
-        return False
+    volumeData = None
+    with open(filename, "rb") as fileHandle:
+      root = None
+      for event, element in ET.iterparse(fileHandle, events=("start", "end")):
+        if root is None:
+          root = element
+        if event == "start":
+          if element.tag == "Volume":
+            volumeData = {}
+          continue
 
-      if self.abortRequested:
-        return False
+        if volumeData is not None and element.tag in self.ensiteVolumeElements:
+          if element.text is not None and element.text.strip():
+            volumeData[element.tag] = self.TextToArray(element.text)
+          element.clear()
+        elif element.tag == "Volume":
+          if not self.readEnsiteVolume(volumeCounter, volumeData):
+            return False
+          volumeCounter += 1
+          volumeData = None
+          # drop everything parsed so far
+          root.clear()
 
-      try:
-        plaintext = volume.find("Map_data").text
-        map_data = self.TextToFloat(plaintext)
+          self.progress = progressStart + (progressEnd - progressStart) * fileHandle.tell() / fileSize
+          self.updateProgress()
 
-        self.addLog("  Read "+str(len(map_data))+" map data points.")
-        no_scalars = False
-        self.progress = self.progress + progressIncrement
-        self.updateProgress()
-      except AttributeError:
-        self.addLog("  No map data points (scalars) found in volume "+str(volumeCounter)+".")
-        no_scalars = True
+        if self.abortRequested:
+          return False
 
-      if self.abortRequested:
-        return False
+    self.addLog("  Read "+str(volumeCounter)+" volume(s) from file.")
+    self.addLog("Done.")
+    self.progress = 100
+    self.updateProgress()
 
-      try:
-        plaintext = volume.find("Normals").text
-        vertexnormals = self.TextToFloat(plaintext)
+    return True
 
-        self.addLog("  Read "+str(len(vertexnormals))+" vertex normals.")
-        self.progress = self.progress + progressIncrement
-        self.updateProgress()
-      except AttributeError:
-        self.addLog("  ERROR: No vertex normals found in volume "+str(volumeCounter)+".")
-        return False
+  def readEnsiteVolume(self, volumeCounter, volumeData):
+    # Create the models of one Ensite volume.
+    # volumeData maps the element names in ensiteVolumeElements to 2D arrays (one row per line of the element text).
+    self.addLog("  Reading volume "+str(volumeCounter)+".")
 
-      if self.abortRequested:
-        return False
+    if "Vertices" not in volumeData:
+      self.addLog("  ERROR: No vertices found in volume "+str(volumeCounter)+".")
+      return False
+    vertices = volumeData["Vertices"]
+    self.addLog("  Read "+str(len(vertices))+" vertices.")
 
-      try:
-        plaintext = volume.find("Polygons").text
-        triangles_all = self.TextToFloat(plaintext)
-        # Change base from 1 to 0
-        for i in range(len(triangles_all)):
-          for j in range(3):
-            triangles_all[i][j] = int(triangles_all[i][j]-1)
-      except AttributeError:
-        self.addLog("  ERROR: No polygon information found in volume "+str(volumeCounter)+".")
-        return False
+    if "Map_data" in volumeData:
+      map_data = volumeData["Map_data"]
+      self.addLog("  Read "+str(len(map_data))+" map data points.")
+      no_scalars = False
+    else:
+      self.addLog("  No map data points (scalars) found in volume "+str(volumeCounter)+".")
+      no_scalars = True
 
-      # Triangles are binned into different "Surfaces of origin" (i.e. models in the file),
-      # according to the separate table Surface_of_origin
+    if "Normals" not in volumeData:
+      self.addLog("  ERROR: No vertex normals found in volume "+str(volumeCounter)+".")
+      return False
+    vertexnormals = volumeData["Normals"]
+    self.addLog("  Read "+str(len(vertexnormals))+" vertex normals.")
 
-      try:
-        plaintext = volume.find("Surface_of_origin").text
-        surface_of_origin_1tuple = self.TextToFloat(plaintext) # TextToFloat returns a list of "1-tuples" (lists of length 1): [[1.0], [2.0], [1.0], [0.0], ...]
-        surface_of_origin = []
-        for i in range(len(surface_of_origin_1tuple)):         # Convert this into a list of lists into a list of integers: [1, 2, 1, 0, ...]
-          surface_of_origin.append(surface_of_origin_1tuple[i][0])
+    if "Polygons" not in volumeData:
+      self.addLog("  ERROR: No polygon information found in volume "+str(volumeCounter)+".")
+      return False
+    # Change base from 1 to 0
+    triangles_all = volumeData["Polygons"][:, 0:3].astype(int) - 1
+
+    # Triangles are binned into different "Surfaces of origin" (i.e. models in the file),
+    # according to the separate table Surface_of_origin (one surface number per triangle: [1, 2, 1, 0, ...])
+    surface_of_origin = None
+    if "Surface_of_origin" in volumeData:
+      surface_of_origin = volumeData["Surface_of_origin"][:, 0].astype(int)
+    if surface_of_origin is not None and len(surface_of_origin) == len(triangles_all) and len(surface_of_origin) > 0 and surface_of_origin.min() >= 0:
+      # Sort triangles by surface once and split them into one array per surface number 0 ... maximum surface number
+      order = np.argsort(surface_of_origin, kind="stable")
+      sortedSurfaces = surface_of_origin[order]
+      splitIndices = np.searchsorted(sortedSurfaces, np.arange(1, sortedSurfaces[-1]+1))
+      triangles = np.split(triangles_all[order], splitIndices)
+      self.addLog("  Read "+str(len(triangles_all))+" triangles in "+str(len(triangles))+" separate meshes.")
+    else:
+      self.addLog("  NOTE: No \"Surface of Origin\" information in file.")
+      triangles = [triangles_all]
 
-        # Initialize triangles as list of n empty lists, with n being the maximum surface number in surface_of_origin
-        triangles = [ [] for _ in range(int(max(surface_of_origin)+1))]
+    if self.abortRequested:
+      return False
 
-        for i in range(len(surface_of_origin)):
-          triangles[int(surface_of_origin[i])].append(triangles_all[i])
+    for i in range(len(triangles)):
+      meshName = "Ensite_"+str(volumeCounter)+"-"+str(i)
+      self.addLog("Creating model "+meshName+":")
 
-        self.addLog("  Read "+str(len(triangles_all))+" triangles in "+str(len(triangles))+" separate meshes.")
-      except:
-        self.addLog("  NOTE: No \"Surface of Origin\" information in file.")
-        triangles = [[]]
-        triangles[0]=triangles_all
+      modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
 
+      if not no_scalars:
+        names = ["Map data"]
+        scalars = map_data
+      else:
+        names = []
+        scalars = []
 
-      self.progress = self.progress + progressIncrement
-      self.updateProgress()
-      if self.abortRequested:
+      if not self.CreateMesh(modelNode, vertices, vertexnormals, triangles[i], names, scalars):
+        slicer.mrmlScene.RemoveNode(modelNode)
         return False
 
-      for i in range(len(triangles)):
-        meshName = "Ensite_"+str(volumeCounter)+"-"+str(i)
-        self.addLog("Creating model "+meshName+":")
-
-        modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
-
-        if not no_scalars:
-          names = ["Map data"]
-          scalars = map_data
-        else:
-          names = []
-          scalars = []
-
-        if not self.CreateMesh(modelNode, vertices, vertexnormals, triangles[i], names, scalars):
-          slicer.mrmlScene.RemoveNode(modelNode)
-          return False
-
-        self.progress = self.progress + (2*progressIncrement)/len(triangles)
-        self.updateProgress()
-        if self.abortRequested:
-          return False
-
-        # Ensite mesh coordinates are LPS, Slicer is RAS
-        matrixLPStoRAS = [[-1, 0, 0, 0],
-                          [ 0,-1, 0, 0],
-                          [ 0, 0, 1, 0],
-                          [ 0, 0, 0, 1]]
-        self.transformNode(modelNode, matrixLPStoRAS)
+      if self.abortRequested:
+        return False
 
-        modelNode.SetName(meshName)
-        modelNode.CreateDefaultDisplayNodes()
+      # Ensite mesh coordinates are LPS, Slicer is RAS
+      matrixLPStoRAS = [[-1, 0, 0, 0],
+                        [ 0,-1, 0, 0],
+                        [ 0, 0, 1, 0],
+                        [ 0, 0, 0, 1]]
+      self.transformNode(modelNode, matrixLPStoRAS)
 
-    self.addLog("Done.")
-    self.progress = 100
-    self.updateProgress()
+      modelNode.SetName(meshName)
+      modelNode.CreateDefaultDisplayNodes()
 
     return True
 
@@ -498,6 +874,12 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
   #
 
   def readCarto(self, filename):
+    if not zipfile.is_zipfile(filename):
+      self.addLog("File is not a valid zip archive: "+filename)
+      return False
+    return self.readCached("CARTO", [filename], self.importCarto, filename)
+
+  def importCarto(self, filename):
     self.progress = 0
     self.updateProgress()
     if not zipfile.is_zipfile(filename):
@@ -522,28 +904,38 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     self.progress = 10
     self.updateProgress()
 
-    progressSteps = len(os.listdir(tempDir))
-    progressEnd = 100
-    progressIncrement = ((progressEnd - self.progress)/progressSteps)
+    filenames = [os.path.join(tempDir, filename) for filename in sorted(os.listdir(tempDir))
+      if filename.endswith(".mesh") or filename.endswith("_car.txt")]
+    if os.path.exists(os.path.join(tempDir, "VisiTagExport/Sites.txt")):
+      filenames.append(os.path.join(tempDir, "VisiTagExport/Sites.txt"))
+
+    # Parsing is done in parallel, up to 80% of progress
+    payloads = self.parseCartoFiles(filenames, 80)
+    if payloads is None:
+      shutil.rmtree(tempDir)
+      return False
 
-    for filename in os.listdir(tempDir):
-      if filename.endswith(".mesh"):
-        if not self.readCartoMesh(os.path.join(tempDir, filename)):
+    # All nodes are created on the main thread in one batch
+    progressIncrement = (100 - self.progress) / max(len(payloads), 1)
+    slicer.mrmlScene.StartState(slicer.vtkMRMLScene.BatchProcessState)
+    try:
+      for payload in payloads:
+        if payload["type"] == "mesh":
+          success = self.createCartoMesh(payload)
+        elif payload["type"] == "points":
+          success = self.createCartoPoints(payload)
+        else:
+          success = self.createCartoAblationSites(payload)
+        if not success:
           shutil.rmtree(tempDir)
           return False
-      if filename.endswith("_car.txt"):
-        if not self.readCartoPoints(os.path.join(tempDir, filename)):
+        self.progress = self.progress + progressIncrement
+        self.updateProgress()
+        if self.abortRequested:
           shutil.rmtree(tempDir)
           return False
-      self.progress = self.progress + progressIncrement
-      self.updateProgress()
-      if self.abortRequested:
-        shutil.rmtree(tempDir)
-        return False
-
-    if os.path.exists(os.path.join(tempDir, "VisiTagExport/Sites.txt")):
-      if not self.readCartoAblationSites(os.path.join(tempDir, "VisiTagExport/Sites.txt")):
-        shutil.rmtree(tempDir)
+    finally:
+      slicer.mrmlScene.EndState(slicer.vtkMRMLScene.BatchProcessState)
 
     #Delete temp dir
     self.addLog("Cleaning up temporary files.")
@@ -555,95 +947,100 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
 
     return True
 
-  def readCartoMesh(self, filename):
-    meshName = ntpath.basename(filename)
-    self.addLog("Reading "+meshName+":")
-    section = "none"
-    verticesText = ""
-    trianglesText = ""
-    scalarsText = ""
-    attributesText = ""
-    scalarLabels = ""
-
-    with open(filename, "r", encoding="latin-1") as filehandle:
-      for line in filehandle:
-        if self.abortRequested:
-          return False
-        # Remove trailing newline and trailing and leading spaces
-        line = re.sub(r"[\n]$", "", line)
-        line = re.sub(r"[ ]*$", "", line)
-        line = re.sub(r"^[ ]*", "", line)
-
-        if len(line) == 0: # empty line
-          continue
-        if line[0] == ";": # comment line
-          continue
-        if line.find("[GeneralAttributes]") > -1:
-          section = "general"
-          continue
-        if line.find("[VerticesSection]") > -1:
-          section = "vertices"
-          continue
-        if line.find("[TrianglesSection]") > -1:
-          section = "triangles"
-          continue
-        if line.find("[VerticesColorsSection]") > -1:
-          section = "scalars"
-          continue
-        if line.find("[VerticesAttributesSection]") > -1:
-          section = "attributes"
-          continue
-
-        if section == "general":
-          # Look for scalar labels
-          if line.find("ColorsNames") > -1:
-            line = re.sub(r"^ColorsNames[ ]*=[ ]*", "", line)
-            scalarLabels = re.split(r"\s+",line)
-        if section == "vertices":
-          # remove line number ("0 =")
-          line = re.sub(r"[0-9]*[ ]*=[ ]*", "", line)
-          # add "clean" line to string
-          verticesText = verticesText+line+'\n'
-        if section == "triangles":
-          line = re.sub(r"[0-9]*[ ]*=[ ]*", "", line)
-          trianglesText = trianglesText+line+'\n'
-        if section == "scalars":
-          line = re.sub(r"[0-9]*[ ]*=[ ]*", "", line)
-          scalarsText = scalarsText+line+'\n'
-        if section == "attributes":
-          line = re.sub(r"[0-9]*[ ]*=[ ]*", "", line)
-          attributesText = attributesText+line+'\n'
-
-    verticesLong = self.TextToFloat(verticesText)
-    vertices = []
-    vertexnormals = []
-    for i in range(len(verticesLong)):
-      vertices.append([verticesLong[i][0], verticesLong[i][1], verticesLong[i][2]])
-      vertexnormals.append([verticesLong[i][3], verticesLong[i][4], verticesLong[i][5]])
-      if self.abortRequested:
-        return False
+  def getProcessPoolContext(self):
+    # Worker processes are started with the Python executable bundled with Slicer
+    # (sys.executable is the Slicer application itself).
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    pythonSlicer = os.path.join(os.path.dirname(sys.executable), "PythonSlicer"+(".exe" if os.name == "nt" else ""))
+    if os.path.isfile(pythonSlicer):
+      context.set_executable(pythonSlicer)
+    return context
+
+  def parseCartoFiles(self, filenames, progressEnd):
+    # Parse CARTO export files in a process pool (one task per file).
+    # Returns the list of payloads in the order of filenames, or None if cancelled or a file could not be read.
+    # If worker processes cannot be used, the files are parsed one after the other in this process.
+    payloads = [None] * len(filenames)
+    if len(filenames) == 0:
+      return payloads
+    progressStart = self.progress
+    progressIncrement = (progressEnd - progressStart) / len(filenames)
 
-    trianglesLong = self.TextToFloat(trianglesText)
-    triangles = []
-    for i in range(len(trianglesLong)):
-      triangles.append([trianglesLong[i][0], trianglesLong[i][1], trianglesLong[i][2]])
+    workers = min(len(filenames), self.maxWorkers or os.cpu_count() or 1)
+    if workers > 1:
+      self.addLog("  Reading "+str(len(filenames))+" files using "+str(workers)+" processes.")
+      executor = None
+      try:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=self.getProcessPoolContext())
+        futures = {executor.submit(CartoParser.parseCartoFile, filename): index for index, filename in enumerate(filenames)}
+        pending = set(futures)
+        while pending:
+          done, pending = concurrent.futures.wait(pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+          for future in done:
+            index = futures[future]
+            try:
+              payloads[index] = future.result()
+            except concurrent.futures.process.BrokenProcessPool:
+              raise
+            except Exception as e:
+              # error raised by the parser in the worker process, not a problem of the pool
+              self.addLog("  Failed to read "+ntpath.basename(filenames[index])+" ("+str(e)+").")
+              return None
+            self.addLog("  Read "+ntpath.basename(filenames[index])+".")
+            self.progress = self.progress + progressIncrement
+          self.updateProgress()
+          if self.abortRequested:
+            return None
+        return payloads
+      except (OSError, concurrent.futures.process.BrokenProcessPool) as e:
+        self.addLog("  Parallel reading is not available ("+str(e)+"), reading files one by one.")
+        self.progress = progressStart
+        payloads = [None] * len(filenames)
+      finally:
+        # Not waiting for the files that are still being parsed, so that cancelling returns immediately
+        if executor:
+          executor.shutdown(wait=False, cancel_futures=True)
+
+    for index, filename in enumerate(filenames):
+      self.addLog("  Reading "+ntpath.basename(filename)+".")
+      payloads[index] = self.parseCartoFile(filename)
+      if payloads[index] is None:
+        return None
+      self.progress = self.progress + progressIncrement
+      self.updateProgress()
       if self.abortRequested:
-        return False
+        return None
+    return payloads
+
+  def parseCartoFile(self, filename):
+    # Payload of a CARTO export file parsed in this process, None if aborted
+    abortCallback = lambda: self.abortRequested
+    if filename.endswith(".mesh"):
+      return CartoParser.parseCartoMeshPayload(filename, abortCallback)
+    if filename.endswith("_car.txt"):
+      return CartoParser.parseCartoPointsPayload(filename, abortCallback)
+    return CartoParser.parseCartoAblationSitesPayload(filename, abortCallback)
 
-    if len(scalarsText) > 0:
-      scalars = self.TextToFloat(scalarsText)
-    else:
-      scalars = []
+  def readCartoMesh(self, filename):
+    meshName = ntpath.basename(filename)
+    self.addLog("Reading "+meshName+":")
+    payload = CartoParser.parseCartoMeshPayload(filename, lambda: self.abortRequested)
+    if payload is None:
+      return False
+    return self.createCartoMesh(payload)
 
-    if len(attributesText) > 0:
-      attributes = self.TextToFloat(attributesText)   # currently not used
-    else:
-      attributes = []
+  def createCartoMesh(self, payload):
+    vertices = payload["vertices"]
+    vertexnormals = payload["vertexNormals"]
+    triangles = payload["triangles"]
+    scalarLabels = payload["scalarLabels"]
+    scalars = payload["scalars"]
 
     self.addLog("  Read "+str(len(vertices))+" vertices, "+str(len(vertexnormals))+" vertex normals, and "+str(len(triangles))+" triangles.")
     self.addLog("  Read "+str(len(scalarLabels))+" sets of scalars: "+str(scalarLabels)+".")
 
-    meshName = "CARTOmesh_"+re.sub(r".mesh$", "", meshName)
+    meshName = "CARTOmesh_"+payload["name"]
     self.addLog("Creating model "+meshName+":")
 
     modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
@@ -659,37 +1056,25 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     return True
 
   def readCartoPoints(self, filename):
-    pointsName = ntpath.basename(filename)
-    self.addLog("Reading "+pointsName+":")
+    self.addLog("Reading "+ntpath.basename(filename)+":")
+    payload = CartoParser.parseCartoPointsPayload(filename, lambda: self.abortRequested)
+    if payload is None:
+      return False
+    return self.createCartoPoints(payload)
+
+  def createCartoPoints(self, payload):
+    pointsName = payload["name"]
 
     fiducialsNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLMarkupsFiducialNode')
     fiducialsNode.GetMarkupsDisplayNode().SetVisibility(0)
 
-    with open(filename, "r") as filehandle:
-      for line in filehandle:
-        if self.abortRequested:
-          return False
-        # Remove trailing newline and trailing and leading spaces
-        line = re.sub(r"[\n]$", "", line)
-        line = re.sub(r"[ ]*$", "", line)
-        line = re.sub(r"^[ ]*", "", line)
-        if len(line) == 0: # empty line
-          continue
-        lineElements = re.split(r"[ \t]*", line)
-        if lineElements[0] == "VERSION_5_0" or lineElements[0] == "VERSION_4_0":
-          pointsName = lineElements[1]
-        if lineElements[0] == "P":
-            pointNr = int(lineElements[2])
-            pointX = float(lineElements[4])
-            pointY = float(lineElements[5])
-            pointZ = float(lineElements[6])
-            unipolar = float(lineElements[10])
-            bipolar = float(lineElements[11])
-            lat = float(lineElements[12])
-            n = fiducialsNode.AddFiducial(pointX, pointY, pointZ)
-            fiducialsNode.SetNthControlPointLabel(n, "Point # "+str(pointNr)+" in "+pointsName)
-            fiducialsNode.SetNthControlPointDescription(n, "Bipolar "+str(bipolar)+" / Unipolar "+str(unipolar)+" / LAT "+str(lat))
-            fiducialsNode.SetNthControlPointLocked(n, 1)
+    labels = ["Point # "+str(pointNr)+" in "+pointsName for pointNr in payload["pointNumbers"]]
+    measurements = [
+      ("Bipolar", "mV", payload["bipolar"]),
+      ("Unipolar", "mV", payload["unipolar"]),
+      ("LAT", "ms", payload["lat"]),
+      ]
+    setMarkupsControlPoints(fiducialsNode, payload["positions"], labels, measurements)
 
     self.transformCarto(fiducialsNode)
 
@@ -704,37 +1089,24 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     return True
 
   def readCartoAblationSites(self, filename):
-    pointsName = ntpath.basename(filename)
-    self.addLog("Reading "+pointsName+":")
+    self.addLog("Reading "+ntpath.basename(filename)+":")
+    payload = CartoParser.parseCartoAblationSitesPayload(filename, lambda: self.abortRequested)
+    if payload is None:
+      return False
+    return self.createCartoAblationSites(payload)
 
+  def createCartoAblationSites(self, payload):
     fiducialsNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLMarkupsFiducialNode')
     fiducialsNode.GetMarkupsDisplayNode().SetVisibility(0)
 
-    with open(filename, "r") as filehandle:
-      for line in filehandle:
-        if self.abortRequested:
-          return False
-        # Remove trailing newline and trailing and leading spaces
-        line = re.sub(r"[\n]$", "", line)
-        line = re.sub(r"[ ]*$", "", line)
-        line = re.sub(r"^[ ]*", "", line)
-        if len(line) == 0: # empty line
-          continue
-        lineElements = re.split(r"\s+", line)
-        if lineElements[0] == "Session" or lineElements[0] == "VERSION_4_0":
-          continue
-        pointNr = int(lineElements[2])
-        pointX = float(lineElements[3])
-        pointY = float(lineElements[4])
-        pointZ = float(lineElements[5])
-        duration = float(lineElements[6])
-        avgForce = float(lineElements[7])
-        power = float(lineElements[8])
-        fti = float(lineElements[9])
-        n = fiducialsNode.AddFiducial(pointX, pointY, pointZ)
-        fiducialsNode.SetNthControlPointLabel(n, "Ablation site # "+str(pointNr))
-        fiducialsNode.SetNthControlPointDescription(n, "FTI "+str(fti)+" ("+str(duration)+" sec, "+str(power)+" W, "+str(avgForce)+" g")
-        fiducialsNode.SetNthControlPointLocked(n, 1)
+    labels = ["Ablation site # "+str(pointNr) for pointNr in payload["pointNumbers"]]
+    measurements = [
+      ("FTI", "", payload["fti"]),
+      ("Duration", "s", payload["duration"]),
+      ("Power", "W", payload["power"]),
+      ("Average force", "g", payload["avgForce"]),
+      ]
+    setMarkupsControlPoints(fiducialsNode, payload["positions"], labels, measurements)
 
     self.transformCarto(fiducialsNode)
 
@@ -771,19 +1143,17 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
   # RHYTHMIA import
   #
   def readRhythmia(self, filename):
+    return self.readCached("RHYTHMIA", self.listRhythmiaArchiveParts(filename), self.importRhythmia, filename)
+
+  def importRhythmia(self, filename):
 
     self.progress = 0
     self.updateProgress()
 
     tempDir = self.createTempDirectory()
-    filenameStem = os.path.splitext(os.path.basename(filename))[0]
-    archiveConcatenated = os.path.join(tempDir, filenameStem+".ALL")
-    print(archiveConcatenated)
-    if not self.concatenateRhythmiaFiles(filename, archiveConcatenated):
-      shutil.rmtree(tempDir)
-      return False
+    archiveParts = self.listRhythmiaArchiveParts(filename)
 
-    if not self.expandBinaryPayloadFromRhythmiaArchive(archiveConcatenated , os.path.join(tempDir, "archive.xml"), tempDir):
+    if not self.expandBinaryPayloadFromRhythmiaArchive(archiveParts, os.path.join(tempDir, "archive.xml")):
       shutil.rmtree(tempDir)
       return False
 
@@ -797,6 +1167,7 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
     # Delete temp dir
     self.addLog("Cleaning up temporary files.")
     shutil.rmtree(tempDir)
+    self.rhythmiaPayloads = {}
 
     self.progress = 100
     self.updateProgress()
@@ -804,145 +1175,114 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
 
     return True
 
-  def concatenateRhythmiaFiles(self, startfilename, targetfilename):
+  def listRhythmiaArchiveParts(self, startfilename):
     # Get all files startfilename.000 , .001, .002, ...
     filePathStem = os.path.splitext(startfilename)[0]
-    filesToAdd = []
+    parts = []
     i=0
     while(os.path.isfile(filePathStem+"."+str(i).zfill(3))):
-      filesToAdd.append(filePathStem+"."+str(i).zfill(3))
+      parts.append(filePathStem+"."+str(i).zfill(3))
       i += 1
-    progressIncrement = (20-self.progress) / len(filesToAdd)
-    # Merge all these files into one (in the temp dir)
-    with open(targetfilename, "wb", 0) as targetfile:
-      for fileToAdd in filesToAdd:
-        with open(fileToAdd, "rb") as fid:
-          self.addLog("Reading file "+fileToAdd+" ...")
-          targetfile.write(fid.read())
-        self.progress += progressIncrement
-        self.updateProgress()
-        if self.abortRequested:
-          return False
-      targetfile.flush()
-      os.fsync(targetfile.fileno())
-    self.progress = 20
-    self.updateProgress()
-    return True
-
-
-  def expandBinaryPayloadFromRhythmiaArchive(self, archiveFilename, xmlFilename, folder):
-    # Parse the (completed, concatenated) Rhythmia archive archiveFilename and extract the binary chunks
-    # into separate files in the directory folder
-    # Also, write the remaining XML (stripped from binary data) into xmlFilename
+    return parts
 
+  def expandBinaryPayloadFromRhythmiaArchive(self, archiveFilenames, xmlFilename):
+    # Parse the Rhythmia archive split into the files archiveFilenames (.000, .001, ...) and locate the binary chunks.
+    # The parts are memory-mapped and scanned in place, tags and payloads may span part boundaries.
+    # Binary payloads are not extracted: self.rhythmiaPayloads maps the name written into the XML instead of the
+    # payload (e.g. binary00000000.dat) to a list of (part filename, offset, length) segments, see readRhythmiaPayload.
+    # The remaining XML (stripped from binary data) is written into xmlFilename.
 
-    tagBinaryStart = re.compile(b"<inlinedbin .* BIN=[0-9]*>")
+    tagBinaryStart = re.compile(b"<inlinedbin [^\\n>]*BIN=([0-9]*)>")
     tagBinaryEnd = re.compile(b"</inlinedbin>")
-
-    pointer = 0
-    xmlBuffer = ""
     binaryFilenamePattern =  "binary"
 
-    # We are using a rather rough method here by loading the entire (multi-GB) archive into
-    # (virtual) memory as one chunk. If this should cause problems with even larger archives in
-    # the future, chunk-wise processing might be an option (caution: expressions spanning chunk boundaries)
-    # See e.g. https://stackoverflow.com/questions/29052510/search-string-with-regex-in-large-binary-file-2-gb-or-more
-    # and https://stackoverflow.com/questions/14289421/how-to-use-mmap-in-python-when-the-whole-file-is-too-big
-
-    readChunkSize = 500 * 1024 * 1024 # 500 MB, arbitrary
-    archiveBuffer = bytes("", 'ASCII') # explicite bytes() type cast necessary for Python3 compatability, see https://stackoverflow.com/questions/21689365/python-3-typeerror-must-be-str-not-bytes-with-sys-stdout-write/21689447
-    readChunk = ""
-    archiveFileSize = os.stat(archiveFilename).st_size
-    progressStart = self.progress
-    progressEnd = 50
-
-    self.addLog("Unpacking archive ... (This can take several minutes and Slicer might appear unresponsive)")
-    with open(archiveFilename, "rb") as archiveFile:
-      while True:
-        readChunk = archiveFile.read(readChunkSize)   # Read in chunks of 500 MB to allow processing of cancel requests between chunks
-        if len(readChunk) == 0: # End of file
-          break
-        archiveBuffer += readChunk
-        self.progress = progressStart + ((progressEnd-progressStart)*(len(archiveBuffer)/archiveFileSize))
-        self.updateProgress()
-        if self.abortRequested:
-          return False
-
-    self.progress = progressEnd
-    self.updateProgress()
+    self.rhythmiaPayloads = {}
+    if len(archiveFilenames) == 0:
+      self.addLog("No archive files found.")
+      return False
+    for archiveFilename in archiveFilenames:
+      self.addLog("Reading file "+archiveFilename+" ...")
 
     progressStart = self.progress
     progressEnd = 80
 
-    binaryFileCounter = 0
-
-    while pointer < len(archiveBuffer):
-      # locate beginning and end of next opening <inlinedbin> tag
-      nextInlinedbinOpening = tagBinaryStart.search(archiveBuffer, pointer)
-
-      # next <inlinedbin> tag found
-      if nextInlinedbinOpening:
-        openingTagStart = nextInlinedbinOpening.start()
-        openingTagEnd = nextInlinedbinOpening.end()
-
-        # copy everything from current seek pointer till the end of the opening tag
-        # to the "clean" XML
-        # Note: In Python3, the archiveBuffer is (binary) bytes, but the xmlBuffer is a string --> explicite decoding necessary
-        xmlBuffer += archiveBuffer[pointer:openingTagEnd].decode('ASCII')
-
-        # locate beginning and end of next closing <inlinedbin> tag, start search at
-        # end of opening tag
-        nextInlinedbinClosing = tagBinaryEnd.search(archiveBuffer, openingTagEnd)
-        if nextInlinedbinClosing:
-          closingTagStart = nextInlinedbinClosing.start()
-          closingTagEnd = nextInlinedbinClosing.end()
-
-          # write out binary payload
+    archive = RhythmiaArchive(archiveFilenames)
+    try:
+      with open(xmlFilename, "wb") as xmlFile:   # buffered writer
+        pointer = 0
+        binaryFileCounter = 0
+        while pointer < archive.size:
+          # locate next opening <inlinedbin> tag
+          nextInlinedbinOpening = archive.search(tagBinaryStart, pointer)
+
+          if not nextInlinedbinOpening: # no opening <inlinedbin> found
+            # copy everything from current pointer location till end of archive into clean XML
+            archive.write(xmlFile, pointer, archive.size)
+            pointer = archive.size
+            break
+
+          openingTagStart, openingTagEnd, match = nextInlinedbinOpening
+
+          # copy everything from current pointer till the end of the opening tag to the "clean" XML
+          # The <inlinedbin> tags contain an attribute declaration like BIN=580 (the number of bytes)
+          # However, this should read BIN="580" in order to be standard-conformant
+          archive.write(xmlFile, pointer, openingTagStart)
+          xmlFile.write(re.sub(b'BIN=([0-9]*)', b'BIN="\\1"', match.group(0)))
+
+          # The payload length is given by the BIN attribute, so the (large) binary data does not need to be
+          # searched for the closing tag. Only if the closing tag is not where expected it is searched for.
+          closingTagStart = None
+          if len(match.group(1)) > 0:
+            payloadEnd = openingTagEnd + int(match.group(1))
+            if archive.read(payloadEnd, payloadEnd+len(tagBinaryEnd.pattern)) == tagBinaryEnd.pattern:
+              closingTagStart = payloadEnd
+          if closingTagStart is None:
+            nextInlinedbinClosing = archive.search(tagBinaryEnd, openingTagEnd)
+            if not nextInlinedbinClosing:
+              self.addLog("Premature end of archive file (closing </inlinedbin> tag not found)")
+              return False
+            closingTagStart = nextInlinedbinClosing[0]
+
+          # register binary payload and write its name into clean XML
           binaryFileName = binaryFilenamePattern+str(binaryFileCounter).zfill(8)+".dat"
           binaryFileCounter += 1
-          with open(os.path.join(folder, binaryFileName), "wb", 0) as binaryFile:
-            binaryFile.write(archiveBuffer[openingTagEnd:closingTagStart])
-            binaryFile.flush()
-            os.fsync(binaryFile.fileno())
-
-          # write filename into clean XML
-          xmlBuffer += binaryFileName
+          self.rhythmiaPayloads[binaryFileName] = archive.segments(openingTagEnd, closingTagStart)
+          xmlFile.write(binaryFileName.encode('ASCII'))
 
           # set pointer to beginning of closing tag (next search from here)
           pointer = closingTagStart
-        else:
-          self.addLog("Premature end of archive file (closing </inlinedbin> tag not found)")
-          xmlBuffer += archiveBuffer[pointer:].decode('ASCII')
-          pointer = pointer = len(archiveBuffer)
-          return False
-
-      else: # no opening <inlinedbin> found
-        # copy everything from current pointer location till end of buffer into clean XML
-        xmlBuffer += archiveBuffer[pointer:].decode('ASCII')
-        pointer = len(archiveBuffer)
-
-      self.progress = progressStart+((progressEnd-progressStart)*(pointer/len(archiveBuffer)))
-      self.updateProgress()
-      if self.abortRequested:
-        return False
 
-    # Correct one remaining non-XML-conformant statement:
-    # the <inlinedbin> tags contain an attribute declaration like BIN=580 (the number of bytes)
-    # However, this should read BIN="580" in order to be standard-conformant
-
-    xmlBuffer = re.sub(r'BIN=([0-9]*)', r'BIN="\1"', xmlBuffer)
-
-    with open(xmlFilename, "w") as xmlFile:
-      xmlFile.write(xmlBuffer)
+          self.progress = progressStart+((progressEnd-progressStart)*(pointer/archive.size))
+          self.updateProgress()
+          if self.abortRequested:
+            return False
+    finally:
+      archive.close()
 
+    self.progress = progressEnd
+    self.updateProgress()
+    self.addLog("Found "+str(len(self.rhythmiaPayloads))+" binary data blocks in "+str(len(archiveFilenames))+" archive file(s).")
     return True
 
-   # convert voltage values from log(uV) to mV
+  def readRhythmiaPayload(self, payloadFilename, folder):
+    # Bytes of a binary payload referenced in the stripped XML.
+    # Payloads located by expandBinaryPayloadFromRhythmiaArchive are read from the archive parts,
+    # otherwise the payload is expected as a file in folder.
+    if payloadFilename not in self.rhythmiaPayloads:
+      with open(os.path.join(folder, payloadFilename), "rb") as payloadFile:
+        return payloadFile.read()
+    chunks = []
+    for partFilename, offset, length in self.rhythmiaPayloads[payloadFilename]:
+      with open(partFilename, "rb") as partFile:
+        partFile.seek(offset)
+        chunks.append(partFile.read(length))
+    return b"".join(chunks)
+
+   # convert voltage values from log(uV) to mV, x can be a number or a numpy array
   def calculateRhythmiaVoltage(self, x):
-    return math.exp(x) / 1000
+    return np.exp(x) / 1000
 
   def processRhythmiaXML(self, xmlFilename, folder):
-    calculateRhythmiaVoltageVectorized = np.vectorize(self.calculateRhythmiaVoltage)
     matrixRhythmiaToSlicer = [[ 1, 0, 0, 0],
                               [ 0, 0,-1, 0],
                               [ 0, 1, 0, 0],
@@ -994,7 +1334,7 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
                 anatomyTransformMatrix[col][row] = float(anatomyTransformNumbers[i])
                 i += 1
           scalarLabels = []
-          scalarValues = []
+          scalarColumns = []
 
           meshes = list(self.findallRecursive(anatomy, "Mesh"))
           for mesh in meshes:
@@ -1009,23 +1349,19 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
               triangleFlagsFilename = mesh.find("triangle_flags").find("inlinedbin").text
               triangleFlagsLengthBytes = int(mesh.find("triangle_flags").find("inlinedbin").attrib["BIN"])
 
-              with open(os.path.join(folder, verticesFilename), "rb") as verticesFile:
-                rawBytes = verticesFile.read()
-                if len(rawBytes) != verticesLengthBytes:
-                  self.addLog("ERROR: Binary data size for vertices does not match. ("+verticesFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
-                  return False
-                vertices = np.array(struct.unpack('<{0}f'.format(int(len(rawBytes)/4)), rawBytes))    # Float32
-                vertices = np.reshape(vertices, (-1,6))
-                anatomyVertices = np.array(vertices[:, 0:3])
-                anatomyVertexnormals = np.array(vertices[:, 3:6])
-
-              with open(os.path.join(folder, trianglesFilename), "rb") as trianglesFile:
-                rawBytes = trianglesFile.read()
-                if len(rawBytes) != trianglesLengthBytes:
-                  self.addLog("ERROR: Binary data size for triangles does not match. ("+trianglesFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
-                  return False
-                anatomyTriangles = np.array(struct.unpack('<{0}i'.format(int(len(rawBytes)/4)), rawBytes))  # SignedInt32
-                anatomyTriangles = np.reshape(anatomyTriangles, (-1,3))
+              rawBytes = self.readRhythmiaPayload(verticesFilename, folder)
+              if len(rawBytes) != verticesLengthBytes:
+                self.addLog("ERROR: Binary data size for vertices does not match. ("+verticesFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
+                return False
+              vertices = np.frombuffer(rawBytes, dtype='<f4').reshape(-1,6)    # Float32: x y z nx ny nz
+              anatomyVertices = vertices[:, 0:3]
+              anatomyVertexnormals = vertices[:, 3:6]
+
+              rawBytes = self.readRhythmiaPayload(trianglesFilename, folder)
+              if len(rawBytes) != trianglesLengthBytes:
+                self.addLog("ERROR: Binary data size for triangles does not match. ("+trianglesFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
+                return False
+              anatomyTriangles = np.frombuffer(rawBytes, dtype='<i4').reshape(-1,3)  # SignedInt32
 
           engineOutputs =  list(self.findallRecursive(anatomy, "EngineOutput"))
           for engineOutput in engineOutputs:
@@ -1037,43 +1373,27 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
                 scalarFilename = voltage.find("values").find("inlinedbin").text
                 scalarLengthBytes = int(voltage.find("values").find("inlinedbin").attrib["BIN"])
 
-                with open(os.path.join(folder, scalarFilename), "rb") as scalarFile:
-                  rawBytes = scalarFile.read()
-                  if len(rawBytes) != scalarLengthBytes:
-                    self.addLog("ERROR: Binary data size for electrogram data does not match. ("+scalarFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
-                    return False
-                  scalarLabels.append("Voltage_"+voltage.find("Properties").find("SrcEgmType").text)
-
-                  scalars = np.array(struct.unpack('<{0}f'.format(int(len(rawBytes)/4)), rawBytes))
+                rawBytes = self.readRhythmiaPayload(scalarFilename, folder)
+                if len(rawBytes) != scalarLengthBytes:
+                  self.addLog("ERROR: Binary data size for electrogram data does not match. ("+scalarFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
+                  return False
+                scalarLabels.append("Voltage_"+voltage.find("Properties").find("SrcEgmType").text)
 
-                  # convert values from log(uV) to mV, using a vectorized function to conveniently iterate over the entire array
-                  scalars = calculateRhythmiaVoltageVectorized(scalars)
-                  if scalarValues == []:
-                    for i in range(len(scalars.tolist())):
-                      scalarValues.append([scalars.tolist()[i]])  # Make it a list of lists of length one
-                  else:
-                    for i in range(len(scalars.tolist())):
-                      scalarValues[i].append(scalars.tolist()[i])  # append to the existing lists
+                # convert values from log(uV) to mV
+                scalarColumns.append(self.calculateRhythmiaVoltage(np.frombuffer(rawBytes, dtype='<f4')))
 
             for activation in activations:
               if activation.find("values").find("inlinedbin") is not None:
                 scalarFilename = activation.find("values").find("inlinedbin").text
                 scalarLengthBytes = int(activation.find("values").find("inlinedbin").attrib["BIN"])
 
-                with open(os.path.join(folder, scalarFilename), "rb") as scalarFile:
-                  rawBytes = scalarFile.read()
-                  if len(rawBytes) != scalarLengthBytes:
-                    self.addLog("ERROR: Binary data size for electrogram data does not match. ("+scalarFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
-                    return False
-                  scalarLabels.append("LAT_"+activation.find("Properties").find("SrcEgmType").text)
-
-                  scalars = np.array(struct.unpack('<{0}f'.format(int(len(rawBytes)/4)), rawBytes))
-                  if scalarValues == []:
-                    for i in range(len(scalars.tolist())):
-                      scalarValues.append([scalars.tolist()[i]])  # Make it a list of lists of length one
-                  else:
-                    for i in range(len(scalars.tolist())):
-                      scalarValues[i].append(scalars.tolist()[i])  # append to the existing lists
+                rawBytes = self.readRhythmiaPayload(scalarFilename, folder)
+                if len(rawBytes) != scalarLengthBytes:
+                  self.addLog("ERROR: Binary data size for electrogram data does not match. ("+scalarFilename+" : "+str(len(rawBytes))+" read / "+str(verticesLengthBytes)+" Bytes expected)")
+                  return False
+                scalarLabels.append("LAT_"+activation.find("Properties").find("SrcEgmType").text)
+
+                scalarColumns.append(np.frombuffer(rawBytes, dtype='<f4'))
 
           # Create mesh for this anatomy
           meshName = "RHYTHMIAmesh_"+anatomyName
@@ -1082,7 +1402,17 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
           # Insert below correct study in subject hierarchy
           subjectHierarchyNode.CreateItem(currentSubjectHierarchyStudyID, modelNode)
 
-          if not self.CreateMesh(modelNode, anatomyVertices.tolist(), anatomyVertexnormals.tolist(), anatomyTriangles.tolist(), scalarLabels, scalarValues):
+          # one column per scalar set: (number of vertices, number of scalar sets)
+          if len(scalarColumns) > 0:
+            if any(len(column) != len(anatomyVertices) for column in scalarColumns):
+              self.addLog("ERROR: Number of electrogram values does not match the number of vertices of "+anatomyName+".")
+              slicer.mrmlScene.RemoveNode(modelNode)
+              return False
+            scalarValues = np.column_stack(scalarColumns).astype(np.float32, copy=False)
+          else:
+            scalarValues = np.empty((len(anatomyVertices), 0), dtype=np.float32)
+
+          if not self.CreateMesh(modelNode, anatomyVertices, anatomyVertexnormals, anatomyTriangles, scalarLabels, scalarValues):
             slicer.mrmlScene.RemoveNode(modelNode)
             return False
 
@@ -1123,12 +1453,123 @@ class EAMapReaderLogic(ScriptedLoadableModuleLogic):
             fiducialNode.SetName(pointSetName)
 
             # Insert points
-            for fiducial in pointsList:
-              fidNumber = fiducialNode.AddFiducial(fiducial[1], fiducial[2], fiducial[3])
-              fiducialNode.SetNthControlPointLabel(fidNumber, fiducial[0])
-              fiducialNode.SetNthControlPointLocked(fidNumber, True)
+            setMarkupsControlPoints(fiducialNode, [fiducial[1:4] for fiducial in pointsList], [fiducial[0] for fiducial in pointsList])
 
             # match coordinate systems RHYTHMIA -> Slicer
             self.transformNode(fiducialNode, matrixRhythmiaToSlicer)
 
     return True
+
+################################################################################
+# EAMapReaderTest
+#
+
+class EAMapReaderTest(ScriptedLoadableModuleTest):
+  """
+  Uses ScriptedLoadableModuleTest base class, available at:
+  https://github.com/Slicer/Slicer/blob/master/Base/Python/slicer/ScriptedLoadableModule.py
+  """
+
+  def setUp(self):
+    slicer.mrmlScene.Clear(0)
+
+  def runTest(self):
+    self.setUp()
+    self.test_CreateMeshPerformance()
+    self.setUp()
+    self.test_CartoPointsPerformance()
+
+  def syntheticMesh(self, gridSize):
+    # Triangulated gridSize x gridSize grid: 2*(gridSize-1)^2 triangles
+    u, v = np.meshgrid(np.arange(gridSize, dtype=float), np.arange(gridSize, dtype=float), indexing="ij")
+    vertices = np.column_stack([u.ravel(), v.ravel(), np.sin(u.ravel() / 10.0)])
+    normals = np.tile([0.0, 0.0, 1.0], (len(vertices), 1))
+    corner = (np.arange(gridSize-1)[:, None] * gridSize + np.arange(gridSize-1)[None, :]).ravel()
+    triangles = np.vstack([np.column_stack([corner, corner+gridSize, corner+1]),
+                           np.column_stack([corner+1, corner+gridSize, corner+gridSize+1])])
+    scalars = np.column_stack([vertices[:, 0], vertices[:, 1]])
+    return vertices, normals, triangles, scalars
+
+  def test_CreateMeshPerformance(self):
+    import time
+    self.delayDisplay("Starting CreateMesh benchmark")
+    logic = EAMapReaderLogic()
+    vertices, normals, triangles, scalars = self.syntheticMesh(501)  # 500k triangles
+    labels = ["bipolar", "unipolar"]
+
+    # numpy input (RHYTHMIA path)
+    modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
+    startTime = time.time()
+    self.assertTrue(logic.CreateMesh(modelNode, vertices, normals, triangles, labels, scalars))
+    arrayTime = time.time() - startTime
+
+    mesh = modelNode.GetPolyData()
+    self.assertEqual(mesh.GetNumberOfPoints(), len(vertices))
+    self.assertEqual(mesh.GetNumberOfCells(), len(triangles))
+    cellPoints = vtk.vtkIdList()
+    mesh.GetCellPoints(len(triangles)-1, cellPoints)
+    self.assertEqual([cellPoints.GetId(i) for i in range(3)], triangles[-1].tolist())
+    self.assertAlmostEqual(mesh.GetPointData().GetArray("unipolar").GetValue(12345), scalars[12345, 1], places=3)
+    self.assertIsNotNone(mesh.GetPointData().GetNormals())
+
+    # list input (CARTO / Ensite path)
+    modelNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
+    startTime = time.time()
+    self.assertTrue(logic.CreateMesh(modelNode, vertices.tolist(), normals.tolist(), triangles.tolist(), labels, scalars.tolist()))
+    listTime = time.time() - startTime
+    self.assertEqual(modelNode.GetPolyData().GetNumberOfCells(), len(triangles))
+
+    # abort is honored
+    logic.abortRequested = True
+    self.assertFalse(logic.CreateMesh(slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode'),
+      vertices.tolist(), normals.tolist(), triangles.tolist(), labels, scalars.tolist()))
+
+    logging.info("CreateMesh {0} vertices, {1} triangles: numpy input {2:.3f} s, list input {3:.3f} s".format(
+      len(vertices), len(triangles), arrayTime, listTime))
+    self.delayDisplay('Test passed!')
+
+  def test_CartoPointsPerformance(self):
+    import time
+    self.delayDisplay("Starting CARTO points benchmark")
+    logic = EAMapReaderLogic()
+    numberOfPoints = 50000
+
+    # synthetic _car.txt: "P" lines with point number, x, y, z in columns 2, 4-6 and unipolar, bipolar, LAT in 10-12
+    filename = os.path.join(logic.createTempDirectory(), "1-Map_car.txt")
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-50, 50, (numberOfPoints, 3))
+    values = rng.uniform(0, 10, (numberOfPoints, 3))
+    with open(filename, "w") as pointsFile:
+      pointsFile.write("VERSION_5_0 1-Map\n")
+      for i in range(numberOfPoints):
+        pointsFile.write("P\t0\t{0}\t0\t{1:.3f}\t{2:.3f}\t{3:.3f}\t0\t0\t0\t{4:.3f}\t{5:.3f}\t{6:.0f}\t0\n".format(
+          i, positions[i, 0], positions[i, 1], positions[i, 2], values[i, 0], values[i, 1], values[i, 2]))
+
+    startTime = time.time()
+    self.assertTrue(logic.readCartoPoints(filename))
+    bulkTime = time.time() - startTime
+
+    markupsNode = slicer.util.getNode("CARTOpoints_1-Map")
+    self.assertEqual(markupsNode.GetNumberOfControlPoints(), numberOfPoints)
+    self.assertEqual(markupsNode.GetNthControlPointLabel(123), "Point # 123 in 1-Map")
+    bipolar = None
+    for measurementIndex in range(markupsNode.GetNumberOfMeasurements()):
+      if markupsNode.GetNthMeasurement(measurementIndex).GetName() == "Bipolar":
+        bipolar = markupsNode.GetNthMeasurement(measurementIndex).GetControlPointValues()
+    self.assertIsNotNone(bipolar)
+    self.assertAlmostEqual(bipolar.GetValue(123), values[123, 1], places=3)
+
+    # reference: one AddFiducial call per point, on a tenth of the points
+    referenceCount = numberOfPoints // 10
+    referenceNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLMarkupsFiducialNode')
+    startTime = time.time()
+    for i in range(referenceCount):
+      n = referenceNode.AddFiducial(positions[i, 0], positions[i, 1], positions[i, 2])
+      referenceNode.SetNthControlPointLabel(n, "Point # "+str(i))
+      referenceNode.SetNthControlPointLocked(n, 1)
+    referenceTime = time.time() - startTime
+
+    shutil.rmtree(os.path.dirname(filename))
+    logging.info("CARTO points: {0} points read and created in {1:.3f} s, per point AddFiducial {2:.3f} s for {3} points".format(
+      numberOfPoints, bulkTime, referenceTime, referenceCount))
+    self.delayDisplay('Test passed!')
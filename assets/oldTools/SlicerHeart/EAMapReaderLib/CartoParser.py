@@ -0,0 +1,175 @@
+#
+#   CartoParser.py: Parses CARTO 3 export files into numpy arrays
+#
+#   Only depends on numpy, so that the functions can run in worker processes
+#   (see EAMapReaderLogic.importCarto) where Slicer modules are not available.
+#
+
+import os
+import re
+import numpy as np
+
+# Section headers of CARTO .mesh files and the name used for their data
+CARTO_MESH_SECTIONS = {
+  "[GeneralAttributes]": "general",
+  "[VerticesSection]": "vertices",
+  "[TrianglesSection]": "triangles",
+  "[VerticesColorsSection]": "scalars",
+  "[VerticesAttributesSection]": "attributes",
+  }
+
+# Number of lines read between two checks of abortCallback
+CHUNK_SIZE = 100000
+
+def linesToArray(lines, dtype=float):
+  # Convert lines of whitespace separated numbers into a (number of lines, values per line) array.
+  # All lines are joined and converted in a single call instead of parsing line by line.
+  if len(lines) == 0:
+    return np.empty((0, 0), dtype=dtype)
+  values = np.array(" ".join(lines).split(), dtype=dtype)
+  if values.size % len(lines) != 0:
+    raise ValueError("Lines contain different numbers of values ("+str(values.size)+" values in "+str(len(lines))+" lines)")
+  return values.reshape(len(lines), -1)
+
+def parseCartoMesh(filename, abortCallback=None):
+  # Read a CARTO .mesh file in a single pass.
+  # Returns (generalAttributes, sections) where generalAttributes is a dict of the "Name = Value" entries
+  # of [GeneralAttributes] and sections maps "vertices", "triangles", "scalars" and "attributes" to 2D float arrays.
+  # Returns None if abortCallback() returned True.
+  generalAttributes = {}
+  sectionLines = {"vertices": [], "triangles": [], "scalars": [], "attributes": []}
+  section = "none"
+  with open(filename, "r", encoding="latin-1") as filehandle:
+    for lineNumber, line in enumerate(filehandle):
+      if lineNumber % CHUNK_SIZE == 0 and abortCallback and abortCallback():
+        return None
+      line = line.strip()
+      if len(line) == 0 or line[0] == ";": # empty line or comment line
+        continue
+      if line[0] == "[":
+        section = "none"
+        for header, name in CARTO_MESH_SECTIONS.items():
+          if line.find(header) > -1:
+            section = name
+        continue
+      if section == "general":
+        key, _, value = line.partition("=")
+        generalAttributes[key.strip()] = value.strip()
+      elif section != "none":
+        # remove line number ("0 =")
+        sectionLines[section].append(line.partition("=")[2])
+
+  sections = {}
+  for name, lines in sectionLines.items():
+    sections[name] = linesToArray(lines)
+    if abortCallback and abortCallback():
+      return None
+  return generalAttributes, sections
+
+def parseColumns(filename, columns, skipLine, encoding=None, abortCallback=None):
+  # Read selected columns of a whitespace separated text file (CARTO _car.txt, VisiTag Sites.txt)
+  # into a (number of rows, len(columns)) float array. Lines for which skipLine(lineElements)
+  # returns True are not converted. Returns (array, list of skipped lines' elements) or None if aborted.
+  rows = []
+  skipped = []
+  with open(filename, "r", encoding=encoding) as filehandle:
+    for lineNumber, line in enumerate(filehandle):
+      if lineNumber % CHUNK_SIZE == 0 and abortCallback and abortCallback():
+        return None
+      lineElements = line.split()
+      if len(lineElements) == 0: # empty line
+        continue
+      if skipLine(lineElements):
+        skipped.append(lineElements)
+        continue
+      rows.append(" ".join([lineElements[column] for column in columns]))
+  array = linesToArray(rows)
+  if len(rows) == 0:
+    array = array.reshape(0, len(columns))
+  return array, skipped
+
+################################################################################
+# Payloads
+#
+# Each parse function returns a dict of plain numpy arrays and strings ("payload"),
+# which EAMapReaderLogic turns into MRML nodes.
+
+def parseCartoMeshPayload(filename, abortCallback=None):
+  parsed = parseCartoMesh(filename, abortCallback)
+  if parsed is None:
+    return None
+  generalAttributes, sections = parsed
+
+  # Look for scalar labels
+  scalarLabels = []
+  if "ColorsNames" in generalAttributes:
+    scalarLabels = generalAttributes["ColorsNames"].split()
+
+  # vertex rows are x y z nx ny nz group, triangle rows are v0 v1 v2 nx ny nz group
+  return {
+    "type": "mesh",
+    "filename": filename,
+    "name": re.sub(r".mesh$", "", os.path.basename(filename)),
+    "vertices": sections["vertices"][:, 0:3],
+    "vertexNormals": sections["vertices"][:, 3:6],
+    "triangles": sections["triangles"][:, 0:3].astype(int),
+    "scalarLabels": scalarLabels,
+    "scalars": sections["scalars"],
+    "attributes": sections["attributes"],   # currently not used
+    }
+
+def isNotCartoPointLine(lineElements):
+  return lineElements[0] != "P"
+
+def parseCartoPointsPayload(filename, abortCallback=None):
+  # columns of "P" lines: point number, x, y, z, unipolar, bipolar, LAT
+  parsed = parseColumns(filename, [2, 4, 5, 6, 10, 11, 12], isNotCartoPointLine, abortCallback=abortCallback)
+  if parsed is None:
+    return None
+  points, otherLines = parsed
+  pointsName = os.path.basename(filename)
+  for lineElements in otherLines:
+    if (lineElements[0] == "VERSION_5_0" or lineElements[0] == "VERSION_4_0") and len(lineElements) > 1:
+      pointsName = lineElements[1]
+  return {
+    "type": "points",
+    "filename": filename,
+    "name": pointsName,
+    "pointNumbers": points[:, 0].astype(int),
+    "positions": points[:, 1:4],
+    "unipolar": points[:, 4],
+    "bipolar": points[:, 5],
+    "lat": points[:, 6],
+    }
+
+def isNotAblationSiteLine(lineElements):
+  return lineElements[0] == "Session" or lineElements[0] == "VERSION_4_0"
+
+def parseCartoAblationSitesPayload(filename, abortCallback=None):
+  # columns: site number, x, y, z, duration, average force, power, FTI
+  parsed = parseColumns(filename, [2, 3, 4, 5, 6, 7, 8, 9], isNotAblationSiteLine, abortCallback=abortCallback)
+  if parsed is None:
+    return None
+  sites, _ = parsed
+  return {
+    "type": "ablationSites",
+    "filename": filename,
+    "name": os.path.basename(filename),
+    "pointNumbers": sites[:, 0].astype(int),
+    "positions": sites[:, 1:4],
+    "duration": sites[:, 4],
+    "avgForce": sites[:, 5],
+    "power": sites[:, 6],
+    "fti": sites[:, 7],
+    }
+
+def parseCartoFile(filename):
+  # Payload of any supported CARTO export file, None for other files.
+  # Used as worker function of the import process pool.
+  if filename.endswith(".mesh"):
+    return parseCartoMeshPayload(filename)
+  if filename.endswith("_car.txt"):
+    return parseCartoPointsPayload(filename)
+  if filename.endswith("Sites.txt"):
+    return parseCartoAblationSitesPayload(filename)
+  return None
@@ -0,0 +1 @@
+from .CartoParser import *
@@ -1,5 +1,6 @@
 """
 Read a csv file containing exported annulus contours and compute mean annulus contour of all cases in each phase.
+The .parquet file that ValveBatchExport writes if 'Columnar tables' is enabled can be used instead of the csv file.
 
 For users
 ---------
@@ -103,44 +104,170 @@ import vtk, qt, ctk, slicer
 # Contour processing
 ###############################
 
+def read_table_columns(table_filename, column_names):
+    """Read selected columns of a table exported by ValveBatchExport, either a CSV file or a Parquet (.parquet) file.
+    Only the selected columns are loaded. Returns a dictionary that contains a list of values for each selected
+    column, or None if the column is not in the table. Empty cells are returned as empty strings."""
+    if os.path.splitext(table_filename)[1].lower() == '.parquet':
+        import pyarrow.parquet
+        available_column_names = pyarrow.parquet.read_schema(table_filename).names
+        table = pyarrow.parquet.read_table(table_filename,
+                                           columns=[name for name in column_names if name in available_column_names])
+        columns = {name: ['' if value is None else value for value in table.column(name).to_pylist()]
+                   for name in table.column_names}
+    else:
+        import csv
+        with open(table_filename, 'r') as csv_file:
+            table_reader = csv.reader(csv_file)
+            file_header = next(table_reader)
+            column_indices = {name: file_header.index(name) for name in column_names if name in file_header}
+            columns = {name: [] for name in column_indices}
+            for row in table_reader:
+                for name, column_index in column_indices.items():
+                    columns[name].append(row[column_index])
+    return {name: columns.get(name) for name in column_names}
+
+
 def get_unique_column_values(csv_filename, columnName):
     """Get all values of a selected column. Values are unique (if the same value occurs multiple times in the column,
     it is only included in the returned values once)."""
 
-    import csv
-    with open(csv_filename, 'r') as csv_file:
-        table_reader = csv.reader(csv_file)
-        file_header = next(table_reader)
-        if columnName not in file_header:
-            return None
-        column_index = file_header.index(columnName)
-        used = set()  # stores which values have been already encountered
-        unique_values = [row[column_index] for row in table_reader if
-                         row[column_index] not in used and (used.add(row[column_index]) or True)]
+    values = read_table_columns(csv_filename, [columnName])[columnName]
+    if values is None:
+        return None
+    used = set()  # stores which values have been already encountered
+    unique_values = [value for value in values if value not in used and (used.add(value) or True)]
     return unique_values
 
 
+class AnnulusTable(object):
+    """Annulus contour points table loaded into memory, with an index of the points of each
+    (Filename, Phase, Valve) combination.
+
+    The table is parsed once into typed numpy arrays, ordered so that the points of each combination are in a
+    contiguous row range (keeping their order in the file). Loaded tables are kept in memory while the file is
+    unchanged and parsed tables are stored in a binary cache file in the Slicer cache directory, so that each file
+    is parsed only once, even across Slicer sessions.
+    """
+
+    KEY_COLUMN_NAMES = ['Filename', 'Phase', 'Valve']
+    COORDINATE_COLUMN_NAMES = ['AnnulusContourX', 'AnnulusContourY', 'AnnulusContourZ']
+    LABEL_COLUMN_NAME = 'AnnulusContourLabel'
+    CACHE_VERSION = 1
+
+    # key: absolute file path, value: ((file size, modification time), AnnulusTable)
+    loaded_tables = {}
+
+    def __init__(self, key_columns, coordinates, labels):
+        """
+        :param key_columns: dictionary of key column name: numpy string array
+        :param coordinates: numpy array of point coordinates, one row for each point
+        :param labels: numpy string array of point labels, empty string for unlabeled points
+        """
+        key_values = [key_columns[name] for name in self.KEY_COLUMN_NAMES]
+        # values of the key columns in order of first occurrence
+        self.unique_values = {}
+        for name, values in zip(self.KEY_COLUMN_NAMES, key_values):
+            unique_values, first_indices = np.unique(values, return_index=True)
+            self.unique_values[name] = [str(value) for value in unique_values[np.argsort(first_indices)]]
+        # group rows by key (rows of the key columns), keeping the order of rows within each group
+        keys = np.stack([np.asarray(values, dtype=str) for values in key_values], axis=1)
+        _, first_indices, group_indices, group_sizes = np.unique(
+            keys, axis=0, return_index=True, return_inverse=True, return_counts=True)
+        order = np.argsort(group_indices.ravel(), kind='stable')
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)[order]
+        self.labels = np.asarray(labels)[order]
+        group_ends = np.cumsum(group_sizes)
+        self.row_ranges = {}  # key: (filename, phase, valve), value: (start row, end row)
+        for first_index, group_start, group_end in zip(first_indices, group_ends - group_sizes, group_ends):
+            key = tuple(str(values[first_index]) for values in key_values)
+            self.row_ranges[key] = (int(group_start), int(group_end))
+        self.label_indices = {}  # label dictionary of each key, computed when first requested
+
+    @classmethod
+    def load(cls, table_filename, use_cache=True):
+        """Get the table of a CSV or Parquet file exported by ValveBatchExport.
+        :param use_cache: if True then the table is taken from memory or the binary cache file if the file is unchanged
+        """
+        table_filename = os.path.abspath(table_filename)
+        file_stat = os.stat(table_filename)
+        file_version = (file_stat.st_size, file_stat.st_mtime_ns)
+        if use_cache and table_filename in cls.loaded_tables:
+            loaded_file_version, table = cls.loaded_tables[table_filename]
+            if loaded_file_version == file_version:
+                return table
+        cache_filename = cls.get_cache_filename(table_filename)
+        arrays = cls.read_cache(cache_filename, file_version) if use_cache else None
+        if arrays is None:
+            arrays = cls.read_table(table_filename)
+            cls.write_cache(cache_filename, file_version, arrays)
+        table = cls({name: arrays[name] for name in cls.KEY_COLUMN_NAMES}, arrays['coordinates'], arrays['labels'])
+        cls.loaded_tables[table_filename] = (file_version, table)
+        return table
+
+    @classmethod
+    def read_table(cls, table_filename):
+        """Parse the columns of the table into numpy arrays"""
+        column_names = cls.KEY_COLUMN_NAMES + cls.COORDINATE_COLUMN_NAMES + [cls.LABEL_COLUMN_NAME]
+        columns = read_table_columns(table_filename, column_names)
+        missing_column_names = [name for name in column_names if columns[name] is None]
+        if missing_column_names:
+            raise ValueError("Table {0} does not contain columns {1}".format(table_filename, missing_column_names))
+        arrays = {name: np.array(columns[name], dtype=str) for name in cls.KEY_COLUMN_NAMES}
+        arrays['coordinates'] = np.array([columns[name] for name in cls.COORDINATE_COLUMN_NAMES],
+                                         dtype=np.float64).reshape(3, -1).T.copy()
+        arrays['labels'] = np.array(columns[cls.LABEL_COLUMN_NAME], dtype=str)
+        return arrays
+
+    @staticmethod
+    def get_cache_filename(table_filename):
+        import hashlib
+        cache_dir = os.path.join(slicer.app.cachePath, 'HeartValveBatchAnalysis')
+        return os.path.join(cache_dir, hashlib.sha1(table_filename.encode()).hexdigest() + '.npz')
+
+    @classmethod
+    def read_cache(cls, cache_filename, file_version):
+        """Arrays stored in the cache file, None if there is no valid cache for this version of the file"""
+        try:
+            with np.load(cache_filename, allow_pickle=False) as cache:
+                if (int(cache['cache_version']) != cls.CACHE_VERSION
+                        or tuple(int(value) for value in cache['file_version']) != file_version):
+                    return None
+                return {name: cache[name] for name in cls.KEY_COLUMN_NAMES + ['coordinates', 'labels']}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def write_cache(cls, cache_filename, file_version, arrays):
+        try:
+            os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+            # write to a temporary file first so that a partially written cache file is never used
+            temp_filename = cache_filename + '.tmp.npz'
+            np.savez(temp_filename, cache_version=cls.CACHE_VERSION,
+                     file_version=np.array(file_version, dtype=np.int64), **arrays)
+            os.replace(temp_filename, cache_filename)
+        except OSError as e:
+            logging.warning("Failed to write annulus table cache {0}: {1}".format(cache_filename, e))
+
+    def get_unique_values(self, column_name):
+        """Values of the Filename, Phase, or Valve column in order of first occurrence"""
+        return list(self.unique_values[column_name])
+
+    def get_annulus_contour_points(self, annulus_filename, annulus_phase, valve_type):
+        """Get point coordinates and dictionary of label: point index for the selected filename, phase and valve.
+        The returned coordinates array is a copy, it can be modified."""
+        key = (annulus_filename, annulus_phase, valve_type)
+        if key not in self.row_ranges:
+            return [np.array([]), {}]
+        start, end = self.row_ranges[key]
+        if key not in self.label_indices:
+            self.label_indices[key] = {str(label): i for i, label in enumerate(self.labels[start:end]) if label != ''}
+        return [self.coordinates[start:end].copy(), dict(self.label_indices[key])]
+
+
 def get_annulus_contour_points(csv_filename, annulus_filename, annulus_phase, valve_type):
     """Get point coordinates for the selected filename and phase."""
-    import csv
-    with open(csv_filename, 'r') as csv_file:
-        table_reader = csv.reader(csv_file)
-        file_header = next(table_reader)
-        filename_column_index = file_header.index('Filename')
-        phase_column_index = file_header.index('Phase')
-        valve_column_index = file_header.index('Valve')
-        x_column_index = file_header.index('AnnulusContourX')
-        y_column_index = file_header.index('AnnulusContourY')
-        z_column_index = file_header.index('AnnulusContourZ')
-        label_column_index = file_header.index('AnnulusContourLabel')
-        rows_for_annulus_filename_phase = list(filter(
-            lambda p: p[filename_column_index] == annulus_filename and p[phase_column_index] == annulus_phase and p[valve_column_index] == valve_type,
-            table_reader))
-        coordinates = [[float(row[x_column_index]), float(row[y_column_index]), float(row[z_column_index])] for row in
-                       rows_for_annulus_filename_phase]
-        labels = {row[label_column_index]: i for i, row in enumerate(rows_for_annulus_filename_phase) if
-                  row[label_column_index] != ''}
-    return [np.array(coordinates), labels]
+    return AnnulusTable.load(csv_filename).get_annulus_contour_points(annulus_filename, annulus_phase, valve_type)
 
 
 def order_annulus_contour_points(annulus_point_coordinates, labels, label_order):
@@ -270,24 +397,22 @@ def compute_scale_factors(csv_filename, valve_type=None, annulus_phases=None, pr
     :param progress_function: a callback function f(current_step, total_steps) for indicating current computation progress.
     """
 
-    annulus_filenames = get_unique_column_values(csv_filename, 'Filename')
+    annulus_table = AnnulusTable.load(csv_filename)
+    annulus_filenames = annulus_table.get_unique_values('Filename')
     number_of_filenames = len(annulus_filenames)
     if progress_function is not None:
         progress_function(0, number_of_filenames)
 
     if annulus_phases is None:
         # if user does not provide phases then process all phases
-        annulus_phases = get_unique_column_values(csv_filename, 'Phase')
+        annulus_phases = annulus_table.get_unique_values('Phase')
     elif type(annulus_phases) == str:
         # if user provides a simple string then convert it to a single-element list
         annulus_phases = [annulus_phases]
 
     if valve_type is None:
         # if user does not provide phases then process first valve type
-        valve_types = get_unique_column_values(csv_filename, 'Valve')
-        if valve_types is None:
-            raise ValueError("CSV file {0} does not contain 'Valve' column".format(csv_filename))
-        valve_type = valve_types[0]
+        valve_type = annulus_table.get_unique_values('Valve')[0]
 
     mean_sizes = []  # mean size for each annulus_filename
     mean_sizes_filenames = []
@@ -300,8 +425,8 @@ def compute_scale_factors(csv_filename, valve_type=None, annulus_phases=None, pr
         mean_sizes_for_filename = []
         for annulus_phase in annulus_phases:
             try:
-                [annulus_point_coordinates, labels] = get_annulus_contour_points(csv_filename, annulus_filename,
-                                                                                 annulus_phase, valve_type)
+                [annulus_point_coordinates, labels] = annulus_table.get_annulus_contour_points(annulus_filename,
+                                                                                          annulus_phase, valve_type)
                 relative_point_coords = annulus_point_coordinates - annulus_point_coordinates.mean(0)
                 distances = np.linalg.norm(relative_point_coords, axis=1)
                 mean_sizes_for_filename.append(distances.mean())
@@ -442,11 +567,12 @@ def get_normalized_annulus_to_valve1_first_phase(csv_filename, principal_labels_
     if len(principal_labels_2) != len(set(principal_labels_2)):
         raise ValueError("Duplicate elements found in label order 2: {0}".format(principal_labels_2))
 
-    annulus_filenames = get_unique_column_values(csv_filename, 'Filename')
+    annulus_table = AnnulusTable.load(csv_filename)
+    annulus_filenames = annulus_table.get_unique_values('Filename')
 
     if annulus_phases is None:
         # if user does not provide phases then process all phases
-        annulus_phases = get_unique_column_values(csv_filename, 'Phase')
+        annulus_phases = annulus_table.get_unique_values('Phase')
     elif type(annulus_phases) == str:
         # if user provides a simple string then convert it to a single-element list
         annulus_phases = [annulus_phases]
@@ -469,8 +595,8 @@ def get_normalized_annulus_to_valve1_first_phase(csv_filename, principal_labels_
             try:
                 if progress_function is not None:
                     progress_function(annulus_phase_index * number_of_annulus_filenames + annulus_filename_index, number_of_loops)
-                [annulus_point_coordinates_1, labels_1] = get_annulus_contour_points(csv_filename, annulus_filename, annulus_phase, valve_type_1)
-                [annulus_point_coordinates_2, labels_2] = get_annulus_contour_points(csv_filename, annulus_filename, annulus_phase, valve_type_2)
+                [annulus_point_coordinates_1, labels_1] = annulus_table.get_annulus_contour_points(annulus_filename, annulus_phase, valve_type_1)
+                [annulus_point_coordinates_2, labels_2] = annulus_table.get_annulus_contour_points(annulus_filename, annulus_phase, valve_type_2)
                 if scale_factors is not None:
                     annulus_point_coordinates_1 *= scale_factors[annulus_filename]
                     annulus_point_coordinates_2 *= scale_factors[annulus_filename]
@@ -593,21 +719,19 @@ def run(csv_filename, label_order, number_of_points_per_segment=100, valve_type=
     individualTubeRadius = 0.1
     individualColors = [[0.5, 0, 0], [0, 0.5, 0], [0, 0, 0.5], [0, 0.5, 0.5]]
 
-    annulus_filenames = get_unique_column_values(csv_filename, 'Filename')
+    annulus_table = AnnulusTable.load(csv_filename)
+    annulus_filenames = annulus_table.get_unique_values('Filename')
 
     if annulus_phases is None:
         # if user does not provide phases then process all phases
-        annulus_phases = get_unique_column_values(csv_filename, 'Phase')
+        annulus_phases = annulus_table.get_unique_values('Phase')
     elif type(annulus_phases) == str:
         # if user provides a simple string then convert it to a single-element list
         annulus_phases = [annulus_phases]
 
     if valve_type is None:
         # if user does not provide phases then process first valve type
-        valve_types = get_unique_column_values(csv_filename, 'Valve')
-        if valve_types is None:
-            raise ValueError("CSV file {0} does not contain 'Valve' column".format(csv_filename))
-        valve_type = valve_types[0]
+        valve_type = annulus_table.get_unique_values('Valve')[0]
 
     number_of_annulus_segments = len(label_order)
 
@@ -627,8 +751,8 @@ def run(csv_filename, label_order, number_of_points_per_segment=100, valve_type=
         for annulus_filename in annulus_filenames:
             # logging.debug('Annulus: {0} - {1}'.format(annulus_filename, annulus_phase))
             try:
-                [annulus_point_coordinates, labels] = get_annulus_contour_points(csv_filename, annulus_filename,
-                                                                                 annulus_phase, valve_type)
+                [annulus_point_coordinates, labels] = annulus_table.get_annulus_contour_points(annulus_filename,
+                                                                                          annulus_phase, valve_type)
                 if scale_factors is not None:
                     annulus_point_coordinates *= scale_factors[annulus_filename]
                 [ordered_annulus_point_coordinates, ordered_labels] = order_annulus_contour_points(
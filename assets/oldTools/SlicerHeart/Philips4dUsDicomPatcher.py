@@ -1,8 +1,14 @@
 import os
+import sys
+import json
+import hashlib
+import concurrent.futures
+import concurrent.futures.process
 import unittest
 import vtk, qt, ctk, slicer
 from slicer.ScriptedLoadableModule import *
 import logging
+from Philips4dUsDicomPatcherLib import DicomPatcher
 
 #
 # Philips4dUsDicomPatcher
@@ -130,6 +136,12 @@ class Philips4dUsDicomPatcherLogic(ScriptedLoadableModuleLogic):
   def __init__(self):
     ScriptedLoadableModuleLogic.__init__(self)
     self.logCallback = None
+    # Number of worker processes, defaults to the number of CPUs
+    self.maxWorkers = None
+    # Maximum total size (in bytes) of input files queued or being patched in worker processes
+    self.memoryBudget = 2*1024*1024*1024
+    # Directory of the resume manifests, defaults to the Slicer cache directory
+    self.manifestDirectory = None
 
   def generateUid(self):
     if slicer.app.majorVersion == 4 and slicer.app.minorVersion <= 10:
@@ -175,6 +187,54 @@ class Philips4dUsDicomPatcherLogic(ScriptedLoadableModuleLogic):
     
     return success    
       
+  def getProcessPoolContext(self):
+    # Worker processes are started with the Python executable bundled with Slicer
+    # (sys.executable is the Slicer application itself).
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")
+    pythonSlicer = os.path.join(os.path.dirname(sys.executable), "PythonSlicer"+(".exe" if os.name == "nt" else ""))
+    if os.path.isfile(pythonSlicer):
+      context.set_executable(pythonSlicer)
+    return context
+
+  def runTasks(self, executor, function, tasks, resultCallback):
+    """Call function(*arguments) for each (arguments, inputSize) in tasks.
+    If executor is None then the tasks are run one after the other in this process, otherwise in the executor's
+    worker processes, while keeping the total input size of queued and running tasks within memoryBudget.
+    resultCallback(taskIndex, result, exception) is called in this thread, in the order the tasks are completed.
+    """
+    if executor is None:
+      for taskIndex, (arguments, inputSize) in enumerate(tasks):
+        try:
+          result = function(*arguments)
+        except Exception as e:
+          resultCallback(taskIndex, None, e)
+          continue
+        resultCallback(taskIndex, result, None)
+      return
+
+    maxPendingTasks = 4 * (self.maxWorkers or os.cpu_count() or 1)
+    futures = {}
+    inFlightSize = 0
+    nextTaskIndex = 0
+    while nextTaskIndex < len(tasks) or futures:
+      # Queue tasks until the memory budget is used up (at least one task is always queued)
+      while nextTaskIndex < len(tasks) and len(futures) < maxPendingTasks:
+        arguments, inputSize = tasks[nextTaskIndex]
+        if futures and inFlightSize + inputSize > self.memoryBudget:
+          break
+        futures[executor.submit(function, *arguments)] = (nextTaskIndex, inputSize)
+        inFlightSize += inputSize
+        nextTaskIndex += 1
+      done, notDone = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+      for future in done:
+        taskIndex, inputSize = futures.pop(future)
+        inFlightSize -= inputSize
+        exception = future.exception()
+        if isinstance(exception, concurrent.futures.process.BrokenProcessPool):
+          raise exception
+        resultCallback(taskIndex, None if exception else future.result(), exception)
+
   def patchDicomDir(self, inputDirPath, outputDirPath, exportDicom = True, anonymizeDicom = False, exportUltrasoundToNrrd = False):
     """
     Since CTK (rightly) requires certain basic information [1] before it can import
@@ -189,134 +249,259 @@ class Philips4dUsDicomPatcherLogic(ScriptedLoadableModuleLogic):
     same study of the same patient.  Also that each instance (file) is an
     independent (multiframe) series.
 
+    Headers are read and patched files are written in worker processes (see Philips4dUsDicomPatcherLib),
+    the pixel data is copied as raw bytes. New tag values are decided in this process, in directory walk order,
+    and stored with the result of each file in a manifest, so an interrupted run continues where it stopped
+    when it is started again with the same directories and options.
+
     [1] https://github.com/commontk/CTK/blob/16aa09540dcb59c6eafde4d9a88dfee1f0948edc/Libs/DICOM/Core/ctkDICOMDatabase.cpp#L1283-L1287
     """
 
-    if slicer.app.majorVersion == 4 and slicer.app.minorVersion <= 10:
-      import dicom
-    else:
-      import pydicom as dicom
-
     if not outputDirPath:
       outputDirPath = inputDirPath
-    
+
     self.addLog('DICOM patching started...')
     logging.debug('DICOM patch input directory: '+inputDirPath)
     logging.debug('DICOM patch output directory: '+outputDirPath)
 
-    patientIDToRandomIDMap = {}
-    studyUIDToRandomUIDMap = {}
-    seriesUIDToRandomUIDMap = {}
-    numberOfSeriesInStudyMap = {}
+    options = {"exportDicom": exportDicom, "anonymizeDicom": anonymizeDicom, "exportUltrasoundToNrrd": exportUltrasoundToNrrd}
+    manifest = Philips4dUsDicomPatchManifest(self.getManifestFilePath(inputDirPath, outputDirPath), options)
 
-    # All files without a patient ID will be assigned to the same patient
-    randomPatientID = self.generateUid()
-    
-    requiredTags = ['PatientName', 'PatientID', 'StudyInstanceUID', 'SeriesInstanceUID', 'SeriesNumber']
+    # Input files in directory walk order
+    inputFiles = []
     for root, subFolders, files in os.walk(inputDirPath):
-    
-      # Assume that all files in a directory belongs to the same study
-      randomStudyUID = self.generateUid()
-      
       currentSubDir = os.path.relpath(root, inputDirPath)
-      rootOutput = os.path.join(outputDirPath, currentSubDir)
-      
       for file in files:
         filePath = os.path.join(root,file)
-        self.addLog('Examining %s...' % os.path.join(currentSubDir,file))
-        try:
-          ds = dicom.read_file(filePath)
-        except (IOError, dicom.filereader.InvalidDicomError):
-          self.addLog('  Not DICOM file. Skipped.')
-          continue
+        inputFiles.append({"path": filePath, "subDir": currentSubDir, "name": file, "key": manifest.fileKey(filePath)})
 
-        if not hasattr(ds,'SOPClassUID'):
-          self.addLog('  No SOPClassUID tag found. Skipped.')
-          continue
-          
-        if ds.SOPClassUID != '1.2.840.113543.6.6.1.3.10002':
-          self.addLog('  Not recognized as Philips Cartesian 4D ultrasound DICOM file. Skipped.')
-          continue
+    workers = min(len(inputFiles), self.maxWorkers or os.cpu_count() or 1)
+    executor = None
+    if workers > 1:
+      try:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=self.getProcessPoolContext())
+        self.addLog('Processing {0} files using {1} processes.'.format(len(inputFiles), workers))
+      except OSError as e:
+        self.addLog('Parallel processing is not available ({0}), processing files one by one.'.format(e))
 
-        self.addLog('  Patching...')
-
-        for tag in requiredTags:
-          if not hasattr(ds,tag):
-            setattr(ds,tag,'')
-
-        # Generate a new SOPInstanceUID to avoid different files having the same SOPInstanceUID
-        ds.SOPInstanceUID = self.generateUid()
-            
-        if ds.PatientName == '':
-          ds.PatientName = "Unspecified Patient"
-        if ds.PatientID == '':
-          ds.PatientID = randomPatientID
-        if ds.StudyInstanceUID == '':
-          ds.StudyInstanceUID = randomStudyUID
-        if ds.SeriesInstanceUID == '':
-          ds.SeriesInstanceUID = self.generateUid()
-          
-        # Generate series number to make it easier to identify a sequence within a study
-        if ds.SeriesNumber == '':
-          if ds.StudyInstanceUID not in numberOfSeriesInStudyMap:
-            numberOfSeriesInStudyMap[ds.StudyInstanceUID] = 0
-          numberOfSeriesInStudyMap[ds.StudyInstanceUID] = numberOfSeriesInStudyMap[ds.StudyInstanceUID] + 1
-          ds.SeriesNumber = numberOfSeriesInStudyMap[ds.StudyInstanceUID]
-
-        if anonymizeDicom:
-
-          self.addLog('  Anonymizing...')
-
-          ds.StudyDate = ''
-          ds.StudyTime = ''
-          ds.ContentDate = ''
-          ds.ContentTime = ''
-          ds.AccessionNumber = ''
-          ds.ReferringPhysiciansName = ''
-          ds.PatientsBirthDate = ''
-          ds.PatientsSex = ''
-          ds.StudyID = ''
-          ds[(0x3001,0x1004)].value = '' # Some ID in a private tag - clear it, just in case
-          ds.PatientName = "Unspecified Patient"
-
-          # replace ids with random values - re-use if we have seen them before
-          if ds.PatientID not in patientIDToRandomIDMap:  
-            patientIDToRandomIDMap[ds.PatientID] = self.generateUid()
-          ds.PatientID = patientIDToRandomIDMap[ds.PatientID]
-          if ds.StudyInstanceUID not in studyUIDToRandomUIDMap:  
-            studyUIDToRandomUIDMap[ds.StudyInstanceUID] = self.generateUid()
-          ds.StudyInstanceUID = studyUIDToRandomUIDMap[ds.StudyInstanceUID]  
-          if ds.SeriesInstanceUID not in studyUIDToRandomUIDMap:
-            seriesUIDToRandomUIDMap[ds.SeriesInstanceUID] = self.generateUid()
-          ds.SeriesInstanceUID = seriesUIDToRandomUIDMap[ds.SeriesInstanceUID]
-
-        if inputDirPath==outputDirPath:
-          (name, ext) = os.path.splitext(filePath)
-          patchedFilePath = name + ('-anon' if anonymizeDicom else '') + '-patched' + ext
-          nrrdFilePath = name + '.seq.nrrd'
+    try:
+      try:
+        self.examineAndPlan(executor, inputFiles, manifest, anonymizeDicom)
+        self.patchPlannedFiles(executor, inputFiles, manifest, inputDirPath, outputDirPath, exportDicom, anonymizeDicom, exportUltrasoundToNrrd)
+      except concurrent.futures.process.BrokenProcessPool as e:
+        self.addLog('Worker processes stopped ({0}), processing remaining files one by one.'.format(e))
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+        self.examineAndPlan(executor, inputFiles, manifest, anonymizeDicom)
+        self.patchPlannedFiles(executor, inputFiles, manifest, inputDirPath, outputDirPath, exportDicom, anonymizeDicom, exportUltrasoundToNrrd)
+    finally:
+      if executor:
+        executor.shutdown()
+      manifest.close()
+
+    self.addLog('DICOM patching completed.')
+
+  def getManifestFilePath(self, inputDirPath, outputDirPath):
+    # The manifest contains original patient and study IDs, therefore it is not written into the output directory
+    manifestDirectory = self.manifestDirectory or os.path.join(slicer.app.cachePath, "Philips4dUsDicomPatcher")
+    if not os.path.isdir(manifestDirectory):
+      os.makedirs(manifestDirectory)
+    directories = os.path.abspath(inputDirPath)+"|"+os.path.abspath(outputDirPath)
+    return os.path.join(manifestDirectory, hashlib.sha256(directories.encode()).hexdigest()+".jsonl")
+
+  def examineAndPlan(self, executor, inputFiles, manifest, anonymizeDicom):
+    """Read the header of the files that are not in the manifest yet and decide their new tag values"""
+    newFiles = [inputFile for inputFile in inputFiles if inputFile["key"] not in manifest.plan]
+    if not newFiles:
+      return
+    summaries = [None] * len(newFiles)
+    def storeSummary(taskIndex, summary, exception):
+      summaries[taskIndex] = summary if exception is None else {"status": "skipped", "message": "Not DICOM file. Skipped."}
+    # Only the header is read, so input size does not count towards the memory budget
+    self.runTasks(executor, DicomPatcher.examineFile, [((inputFile["path"],), 0) for inputFile in newFiles], storeSummary)
+
+    # Tag values depend on the previously seen files, so they are decided in walk order
+    state = manifest.state or {
+      # All files without a patient ID will be assigned to the same patient
+      "randomPatientID": self.generateUid(),
+      # Assume that all files in a directory belongs to the same study
+      "randomStudyUIDs": {},
+      "patientIDToRandomIDMap": {},
+      "studyUIDToRandomUIDMap": {},
+      "seriesUIDToRandomUIDMap": {},
+      "numberOfSeriesInStudyMap": {},
+      }
+    for inputFile, summary in zip(newFiles, summaries):
+      if summary["status"] == "patch":
+        summary["tags"] = self.planTags(state, inputFile["subDir"], summary["tags"], anonymizeDicom)
+      manifest.plan[inputFile["key"]] = summary
+    manifest.savePlan(state)
+
+  def planTags(self, state, subDir, tags, anonymizeDicom):
+    """Returns the tag values (keyword: value) that have to be set in a file that has the required tags"""
+    originalTags = tags
+    tags = dict(originalTags)
+
+    if tags['PatientName'] == '':
+      tags['PatientName'] = "Unspecified Patient"
+    if tags['PatientID'] == '':
+      tags['PatientID'] = state["randomPatientID"]
+    if tags['StudyInstanceUID'] == '':
+      if subDir not in state["randomStudyUIDs"]:
+        state["randomStudyUIDs"][subDir] = self.generateUid()
+      tags['StudyInstanceUID'] = state["randomStudyUIDs"][subDir]
+    if tags['SeriesInstanceUID'] == '':
+      tags['SeriesInstanceUID'] = self.generateUid()
+
+    # Generate series number to make it easier to identify a sequence within a study
+    numberOfSeriesInStudyMap = state["numberOfSeriesInStudyMap"]
+    if tags['SeriesNumber'] == '':
+      if tags['StudyInstanceUID'] not in numberOfSeriesInStudyMap:
+        numberOfSeriesInStudyMap[tags['StudyInstanceUID']] = 0
+      numberOfSeriesInStudyMap[tags['StudyInstanceUID']] = numberOfSeriesInStudyMap[tags['StudyInstanceUID']] + 1
+      tags['SeriesNumber'] = numberOfSeriesInStudyMap[tags['StudyInstanceUID']]
+
+    if anonymizeDicom:
+      tags['PatientName'] = "Unspecified Patient"
+      # replace ids with random values - re-use if we have seen them before
+      for tag, randomIDMap in [('PatientID', "patientIDToRandomIDMap"), ('StudyInstanceUID', "studyUIDToRandomUIDMap"), ('SeriesInstanceUID', "seriesUIDToRandomUIDMap")]:
+        if tags[tag] not in state[randomIDMap]:
+          state[randomIDMap][tags[tag]] = self.generateUid()
+        tags[tag] = state[randomIDMap][tags[tag]]
+
+    tagValues = {tag: value for tag, value in tags.items() if value != originalTags[tag]}
+    # Generate a new SOPInstanceUID to avoid different files having the same SOPInstanceUID
+    tagValues['SOPInstanceUID'] = self.generateUid()
+    return tagValues
+
+  def patchPlannedFiles(self, executor, inputFiles, manifest, inputDirPath, outputDirPath, exportDicom, anonymizeDicom, exportUltrasoundToNrrd):
+    tasks = []
+    taskFiles = []
+    numberOfCompletedFiles = 0
+    for inputFile in inputFiles:
+      plan = manifest.plan[inputFile["key"]]
+      if plan["status"] != "patch":
+        self.addLog('Examining %s...' % os.path.join(inputFile["subDir"], inputFile["name"]))
+        self.addLog('  ' + plan["message"])
+        continue
+      if manifest.isCompleted(inputFile["key"]):
+        numberOfCompletedFiles += 1
+        continue
+
+      if inputDirPath==outputDirPath:
+        (name, ext) = os.path.splitext(inputFile["path"])
+        inputFile["patchedFilePath"] = name + ('-anon' if anonymizeDicom else '') + '-patched' + ext
+        inputFile["nrrdFilePath"] = name + '.seq.nrrd'
+      else:
+        rootOutput = os.path.join(outputDirPath, inputFile["subDir"])
+        inputFile["patchedFilePath"] = os.path.abspath(os.path.join(rootOutput, inputFile["name"]))
+        inputFile["nrrdFilePath"] = os.path.splitext(inputFile["patchedFilePath"])[0]+'.seq.nrrd'
+
+      tasks.append(((inputFile["path"], inputFile["patchedFilePath"], plan["tags"], anonymizeDicom), os.path.getsize(inputFile["path"])))
+      taskFiles.append(inputFile)
+
+    if numberOfCompletedFiles:
+      self.addLog('{0} files were already patched in a previous run.'.format(numberOfCompletedFiles))
+
+    def onPatched(taskIndex, bytesWritten, exception):
+      inputFile = taskFiles[taskIndex]
+      patchedFilePath = inputFile["patchedFilePath"]
+      nrrdFilePath = inputFile["nrrdFilePath"]
+      self.addLog('Patching %s...' % os.path.join(inputFile["subDir"], inputFile["name"]))
+      if exception is not None:
+        self.addLog('  Patching failed: {0}'.format(exception))
+        manifest.addResult(inputFile["key"], "failed", [], str(exception))
+        return
+      self.addLog('  Created DICOM file: %s' % patchedFilePath)
+      outputFilePaths = [patchedFilePath]
+
+      if exportUltrasoundToNrrd and self.isDicomUltrasoundFile(patchedFilePath):
+        self.addLog('  Writing NRRD...')
+
+        if self.convertUltrasoundDicomToNrrd(patchedFilePath, nrrdFilePath):
+          self.addLog('  Created NRRD file: %s' % nrrdFilePath)
+          outputFilePaths.append(nrrdFilePath)
         else:
-          patchedFilePath = os.path.abspath(os.path.join(rootOutput,file))
-          nrrdFilePath = os.path.splitext(patchedFilePath)[0]+'.seq.nrrd'
-          if not os.path.exists(rootOutput):
-            os.makedirs(rootOutput)
+          self.addLog('  NRRD file save failed')
+          manifest.addResult(inputFile["key"], "failed", [], "NRRD file save failed")
+          return
 
-        self.addLog('  Writing DICOM...')
-        dicom.write_file(patchedFilePath, ds)
-        self.addLog('  Created DICOM file: %s' % patchedFilePath)
+      if not exportDicom:
+        os.remove(patchedFilePath)
+        outputFilePaths.remove(patchedFilePath)
+        self.addLog('  Deleted temporary DICOM file')
 
-        if exportUltrasoundToNrrd and self.isDicomUltrasoundFile(patchedFilePath):
-          self.addLog('  Writing NRRD...')
+      manifest.addResult(inputFile["key"], "patched", outputFilePaths)
 
-          if self.convertUltrasoundDicomToNrrd(patchedFilePath, nrrdFilePath):
-            self.addLog('  Created NRRD file: %s' % nrrdFilePath)
-          else:
-            self.addLog('  NRRD file save failed')
+    self.runTasks(executor, DicomPatcher.patchFile, tasks, onPatched)
 
-        if not exportDicom:
-          os.remove(patchedFilePath)
-          self.addLog('  Deleted temporary DICOM file')
+class Philips4dUsDicomPatchManifest(object):
+  """Plan and per-file results of a patchDicomDir run, used for resuming interrupted runs.
+  Stored as JSON lines: "plan" records contain the options, the state of the generated IDs and
+  the header summary and new tag values of each file, "result" records the outcome of each patched file.
+  Files are identified by path, size and modification time, so modified files are processed again.
+  """
 
-    self.addLog('DICOM patching completed.')
+  def __init__(self, filePath, options):
+    self.filePath = filePath
+    self.options = options
+    self.plan = {}  # file key -> header summary and tag values
+    self.state = None
+    self.results = {}  # file key -> result record
+
+    records = []
+    try:
+      with open(filePath, "r") as manifestFile:
+        for line in manifestFile:
+          try:
+            records.append(json.loads(line))
+          except ValueError:
+            # empty line or the last record of an interrupted run
+            pass
+    except IOError:
+      pass
+
+    plans = [record for record in records if record.get("type") == "plan"]
+    if plans and plans[-1]["options"] == options:
+      self.plan = plans[-1]["files"]
+      self.state = plans[-1]["state"]
+      for record in records:
+        if record.get("type") == "result":
+          self.results[record["key"]] = record
+      self.file = open(filePath, "a")
+      # terminate the last line, in case it was only partially written
+      self.file.write("\n")
+    else:
+      # new run, or options changed: start over
+      self.file = open(filePath, "w")
+
+  @staticmethod
+  def fileKey(filePath):
+    fileStat = os.stat(filePath)
+    return os.path.abspath(filePath)+"|"+str(fileStat.st_size)+"|"+str(fileStat.st_mtime_ns)
+
+  def writeRecord(self, record):
+    self.file.write(json.dumps(record)+"\n")
+    self.file.flush()
+
+  def savePlan(self, state):
+    self.state = state
+    self.writeRecord({"type": "plan", "options": self.options, "state": state, "files": self.plan})
+
+  def addResult(self, key, status, outputFilePaths, message=None):
+    record = {"type": "result", "key": key, "status": status, "outputs": outputFilePaths, "message": message}
+    self.results[key] = record
+    self.writeRecord(record)
+
+  def isCompleted(self, key):
+    # The file was patched and all its output files still exist
+    result = self.results.get(key)
+    if not result or result["status"] != "patched":
+      return False
+    return all(os.path.exists(outputFilePath) for outputFilePath in result["outputs"])
+
+  def close(self):
+    self.file.close()
 
 
 class Philips4dUsDicomPatcherTest(ScriptedLoadableModuleTest):
@@ -349,4 +534,69 @@ class Philips4dUsDicomPatcherTest(ScriptedLoadableModuleTest):
     your test should break so they know that the feature is needed.
     """
 
-    self.delayDisplay("No tests are implemented")
+    self.delayDisplay("Starting the test")
+
+    import shutil
+    import numpy as np
+    import pydicom as dicom
+
+    testDir = os.path.join(slicer.app.temporaryPath, "Philips4dUsDicomPatcherTest")
+    if os.path.exists(testDir):
+      shutil.rmtree(testDir)
+    inputDir = os.path.join(testDir, "input")
+    outputDir = os.path.join(testDir, "output")
+    os.makedirs(inputDir)
+
+    # Philips 4D US files without patient and study information, and a file that is not DICOM
+    pixelData = {}
+    for index in range(6):
+      fileMeta = dicom.dataset.FileMetaDataset()
+      fileMeta.MediaStorageSOPClassUID = DicomPatcher.PHILIPS_4D_US_SOP_CLASS_UID
+      fileMeta.MediaStorageSOPInstanceUID = dicom.uid.generate_uid()
+      fileMeta.TransferSyntaxUID = dicom.uid.ExplicitVRLittleEndian
+      filePath = os.path.join(inputDir, "image{0}.dcm".format(index))
+      ds = dicom.dataset.FileDataset(filePath, {}, file_meta=fileMeta, preamble=b"\0" * 128)
+      ds.is_little_endian = True
+      ds.is_implicit_VR = False
+      ds.SOPClassUID = DicomPatcher.PHILIPS_4D_US_SOP_CLASS_UID
+      ds.Rows = 16
+      ds.Columns = 16
+      ds.BitsAllocated = 8
+      ds.NumberOfFrames = 4
+      ds.ReferringPhysicianName = "Referring^Physician"
+      ds.PatientBirthDate = "19700101"
+      ds.PatientSex = "F"
+      pixelData[index] = np.random.randint(0, 256, 16*16*4, dtype=np.uint8).tobytes()
+      ds.PixelData = pixelData[index]
+      ds.save_as(filePath, write_like_original=False)
+    with open(os.path.join(inputDir, "readme.txt"), "w") as textFile:
+      textFile.write("not a DICOM file")
+
+    logic = Philips4dUsDicomPatcherLogic()
+    logic.manifestDirectory = testDir
+    logic.memoryBudget = 1024
+    logic.patchDicomDir(inputDir, outputDir, exportDicom=True, anonymizeDicom=True)
+
+    studyUIDs = set()
+    sopInstanceUIDs = set()
+    for index in range(6):
+      ds = dicom.read_file(os.path.join(outputDir, "image{0}.dcm".format(index)))
+      self.assertEqual(ds.PatientName, "Unspecified Patient")
+      self.assertEqual(ds.PixelData, pixelData[index])
+      for tag in DicomPatcher.ANONYMIZED_TAGS:
+        self.assertEqual(DicomPatcher.tagValue(ds, tag), '')
+      studyUIDs.add(ds.StudyInstanceUID)
+      sopInstanceUIDs.add(ds.SOPInstanceUID)
+    self.assertEqual(len(studyUIDs), 1)
+    self.assertEqual(len(sopInstanceUIDs), 6)
+    self.assertFalse(os.path.exists(os.path.join(outputDir, "readme.txt")))
+
+    # Resume: only the missing output file is written again, with the same study
+    os.remove(os.path.join(outputDir, "image3.dcm"))
+    modifiedTime = os.path.getmtime(os.path.join(outputDir, "image0.dcm"))
+    logic.patchDicomDir(inputDir, outputDir, exportDicom=True, anonymizeDicom=True)
+    ds = dicom.read_file(os.path.join(outputDir, "image3.dcm"))
+    self.assertEqual(ds.StudyInstanceUID, studyUIDs.pop())
+    self.assertEqual(os.path.getmtime(os.path.join(outputDir, "image0.dcm")), modifiedTime)
+
+    self.delayDisplay('Test passed!')
@@ -0,0 +1,100 @@
+#
+#   DicomPatcher.py: Reads and patches Philips 4D ultrasound DICOM files
+#
+#   Only depends on pydicom, so that the functions can run in worker processes
+#   (see Philips4dUsDicomPatcherLogic.patchDicomDir) where Slicer modules are not available.
+#
+#   Only the header is parsed (stop_before_pixels). The pixel data element and everything after it
+#   is copied to the patched file as raw bytes, without decoding or loading it into memory.
+#
+
+import os
+import shutil
+
+try:
+  import pydicom as dicom
+except ImportError:
+  # Slicer-4.10 backward compatibility
+  import dicom
+
+# SOP class UID of the (bogus, non-standard) Philips Cartesian 4D ultrasound files
+PHILIPS_4D_US_SOP_CLASS_UID = '1.2.840.113543.6.6.1.3.10002'
+
+# Tags that CTK requires for importing a file, they are added if missing
+REQUIRED_TAGS = ['PatientName', 'PatientID', 'StudyInstanceUID', 'SeriesInstanceUID', 'SeriesNumber']
+
+# Tags cleared when anonymizing (in addition to the IDs that are replaced by random values)
+ANONYMIZED_TAGS = ['StudyDate', 'StudyTime', 'ContentDate', 'ContentTime', 'AccessionNumber',
+  'ReferringPhysicianName', 'PatientBirthDate', 'PatientSex', 'StudyID']
+
+# Private tag containing some ID, cleared when anonymizing, just in case
+PRIVATE_ID_TAG = (0x3001, 0x1004)
+
+# Size of the blocks the pixel data is copied in
+COPY_CHUNK_SIZE = 16*1024*1024
+
+def readHeader(fileHandle):
+  # Parse the header of an open DICOM file.
+  # Returns (dataset, offset of the pixel data element), the offset is the end of the file if there is no pixel data.
+  ds = dicom.read_file(fileHandle, stop_before_pixels=True)
+  return ds, fileHandle.tell()
+
+def tagValue(ds, tag):
+  # Value of a tag as string, empty string if the tag is missing or empty
+  value = ds.get(tag)
+  if value is None:
+    return ''
+  return str(value)
+
+def examineFile(filePath):
+  # Header summary of a file, used for planning the patch:
+  # {"status": "patch", "tags": {required tag: value}} for Philips 4D ultrasound files,
+  # {"status": "skipped", "message": reason} for all other files.
+  try:
+    with open(filePath, 'rb') as fileHandle:
+      ds, pixelDataOffset = readHeader(fileHandle)
+  except (IOError, dicom.filereader.InvalidDicomError):
+    return {"status": "skipped", "message": "Not DICOM file. Skipped."}
+
+  if not hasattr(ds, 'SOPClassUID'):
+    return {"status": "skipped", "message": "No SOPClassUID tag found. Skipped."}
+
+  if ds.SOPClassUID != PHILIPS_4D_US_SOP_CLASS_UID:
+    return {"status": "skipped", "message": "Not recognized as Philips Cartesian 4D ultrasound DICOM file. Skipped."}
+
+  return {"status": "patch", "tags": {tag: tagValue(ds, tag) for tag in REQUIRED_TAGS}}
+
+def patchFile(inputFilePath, outputFilePath, tagValues, anonymize=False):
+  # Write a copy of inputFilePath to outputFilePath with the tags set to tagValues (dict of keyword: value).
+  # If anonymize is True then ANONYMIZED_TAGS and PRIVATE_ID_TAG are cleared.
+  # The output is written to a temporary file first, so that outputFilePath only exists if it is complete.
+  # Returns the number of bytes written.
+  outputDir = os.path.dirname(outputFilePath)
+  if outputDir and not os.path.exists(outputDir):
+    os.makedirs(outputDir, exist_ok=True)
+  partialFilePath = outputFilePath + '.partial'
+
+  with open(inputFilePath, 'rb') as inputFile:
+    ds, pixelDataOffset = readHeader(inputFile)
+
+    for tag in REQUIRED_TAGS:
+      if not hasattr(ds, tag):
+        setattr(ds, tag, '')
+    if anonymize:
+      for tag in ANONYMIZED_TAGS:
+        setattr(ds, tag, '')
+      if PRIVATE_ID_TAG in ds:
+        ds[PRIVATE_ID_TAG].value = ''
+    for tag, value in tagValues.items():
+      setattr(ds, tag, value)
+
+    with open(partialFilePath, 'wb') as outputFile:
+      # The header is written with the transfer syntax of the input file,
+      # so the raw pixel data bytes remain valid after it
+      dicom.write_file(outputFile, ds)
+      inputFile.seek(pixelDataOffset)
+      shutil.copyfileobj(inputFile, outputFile, COPY_CHUNK_SIZE)
+      bytesWritten = outputFile.tell()
+
+  os.replace(partialFilePath, outputFilePath)
+  return bytesWritten
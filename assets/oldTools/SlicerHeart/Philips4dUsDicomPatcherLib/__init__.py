@@ -0,0 +1 @@
+from .DicomPatcher import *
@@ -1,7 +1,13 @@
 import logging
+import hashlib
 from pathlib import Path
 import sys
+import json
+import time
+import uuid
+import socket
 import argparse
+from contextlib import contextmanager, nullcontext
 import vtk, qt, ctk, slicer
 from slicer.ScriptedLoadableModule import *
 from HeartValveLib.Constants import CARDIAC_CYCLE_PHASE_PRESETS
@@ -10,32 +16,6 @@ from ValveBatchExportRules import *
 from collections import deque
 
 
-class STATE:
-
-  PENDING = 'Pending'
-  NOT_RUNNING = 'NotRunning'
-  STARTING = 'Starting'
-  RUNNING = 'Running'
-  COMPLETED = 'Completed'
-
-
-ProcessError = {
-  qt.QProcess.FailedToStart: "FailedToStart",
-  qt.QProcess.Crashed: "Crashed",
-  qt.QProcess.Timedout: "Timedout",
-  qt.QProcess.ReadError: "ReadError",
-  qt.QProcess.WriteError: "WriteError",
-  qt.QProcess.UnknownError: "UnknownError"
-}
-
-
-ProcessState = {
-  qt.QProcess.NotRunning: STATE.NOT_RUNNING,
-  qt.QProcess.Starting: STATE.STARTING,
-  qt.QProcess.Running: STATE.RUNNING
-}
-
-
 #
 # ValveBatchExport
 #
@@ -127,6 +107,12 @@ class ValveBatchExportWidget(ScriptedLoadableModuleWidget):
     self.setupPhaseSelectionSection()
     self.exportOptionsFrameLayout.addRow("Phases (if available)", self.phaseSelectionWidget)
 
+    self.columnarTablesCheckBox = qt.QCheckBox()
+    self.columnarTablesCheckBox.checked = ValveBatchExportRule.WRITE_COLUMNAR_TABLES
+    self.columnarTablesCheckBox.setToolTip(
+      "Write merged tables in compressed columnar format with typed columns (.parquet) in addition to .csv")
+    self.exportOptionsFrameLayout.addRow("Columnar tables (.parquet)", self.columnarTablesCheckBox)
+
     parametersFormLayout.addRow(self.exportOptionsFrame)
 
     from multiprocessing import cpu_count
@@ -151,6 +137,22 @@ class ValveBatchExportWidget(ScriptedLoadableModuleWidget):
     hbox.addWidget(self.maxProcessesButton)
     parametersFormLayout.addRow("Parallel processes", hbox)
 
+    self.incrementalExportCheckBox = qt.QCheckBox()
+    self.incrementalExportCheckBox.checked = self.logic.incrementalExport
+    self.incrementalExportCheckBox.setToolTip(
+      "Only export scene files that are new, changed or failed previously, or that were exported with different"
+      " rules or phases. Exported cases are recorded in the manifest file of the output directory.")
+    self.incrementalExportCheckBox.toggled.connect(self.onIncrementalExportToggled)
+    parametersFormLayout.addRow("Incremental export", self.incrementalExportCheckBox)
+
+    self.profileExportCheckBox = qt.QCheckBox()
+    self.profileExportCheckBox.checked = self.logic.profileExport
+    self.profileExportCheckBox.setToolTip(
+      "Record wall time, CPU time and memory usage of loading scenes, rule steps and file writes per case and"
+      " phase in the trace file of the output directory and show statistics per step when the export is completed.")
+    self.profileExportCheckBox.toggled.connect(self.onProfileExportToggled)
+    parametersFormLayout.addRow("Profile export", self.profileExportCheckBox)
+
     self.exportButton = qt.QPushButton("Start Export")
     self.exportButton.toolTip = \
       "Iterate through all the scene files in the input directory and write results to the output directory"
@@ -169,6 +171,12 @@ class ValveBatchExportWidget(ScriptedLoadableModuleWidget):
   def onNumParallelProcessesChanged(self, val):
     self.logic.numParallelProcesses = int(val)
 
+  def onIncrementalExportToggled(self, checked):
+    self.logic.incrementalExport = checked
+
+  def onProfileExportToggled(self, checked):
+    self.logic.profileExport = checked
+
   def progressUpdate(self, value, maximum):
     self.progressbar.setValue(value)
     self.progressbar.setMaximum(maximum)
@@ -223,6 +231,7 @@ class ValveBatchExportWidget(ScriptedLoadableModuleWidget):
     self.outputDirSelector.addCurrentPathToHistory()
     self.statusLabel.plainText = ''
     ValveBatchExportRule.setPhasesToExport(self.getCheckedPhases())
+    ValveBatchExportRule.setWriteColumnarTables(self.columnarTablesCheckBox.checked)
     self.logic.clearRules()
     for registeredPlugin in self.registeredExportPlugins:
       if registeredPlugin.activated:
@@ -269,6 +278,16 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
     self._exportRules = []
     self.numParallelProcesses = 1
     self.parallelExport = None
+    # Worker instances used for parallel export (see ExportWorkerPool)
+    self.jobTimeout = 3600  # seconds, a worker exporting a file for longer than this is killed
+    self.maxJobsPerWorker = 50  # workers are replaced by a new Slicer instance after this many files
+    self.maxWorkerMemory = 4 * 1024 * 1024 * 1024  # bytes, workers using more memory than this are replaced
+    # If enabled then cases that are up to date according to the manifest of the output directory are not exported
+    self.incrementalExport = True
+    self.manifest = None
+    # If enabled then resource usage of the export steps is recorded (see ExportProfiler)
+    self.profileExport = True
+    self.profiler = ExportProfiler()
 
   def clearRules(self):
     self._exportRules = []
@@ -292,7 +311,11 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
     self.addLog(f'Output directory: {outputDirPath}')
 
     self.outputDirPath = outputDirPath
+    self.manifest = ValveBatchExportManifest(outputDirPath)
+    if self.profileExport:
+      self.profiler.start(Path(outputDirPath) / ExportProfiler.TRACE_FILENAME)
     self.examineInputs(inputDirPath)
+    self.planExport()
 
     self.resetExport()
 
@@ -307,38 +330,73 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
       subOutputDirPath = Path(self.outputDirPath) / Path(filePath).stem
       self._inputData[filePath] = subOutputDirPath
 
-  def _runMultiThreadedExport(self):
-    self.parallelExport = ProcessesLogic(progressFinishedCallback=self.onProcessFinished,
-                                         completedCallback=self.onProcessesCompleted,
-                                         maximumRunningProcesses=self.numParallelProcesses,
-                                         logCallback=self.addLog)
-    for filePath, subOutputDirPath in self._inputData.items():
-      process = self._createProcess(filePath, subOutputDirPath)
-      self.parallelExport.addProcess(process)
-    self.parallelExport.run()
+  def getRuleSignature(self):
+    """Rules, with their version and options, that the exported data depends on"""
+    return {type(rule).__name__: {"version": rule.VERSION, "flags": [rule.CMD_FLAG, *rule.OTHER_FLAGS]}
+            for rule in self._exportRules}
 
-  def _createProcess(self, filePath, subOutputDirPath):
-    path = Path(subOutputDirPath)
-    process = SlicerInstanceProcess(scriptPath=__file__,
-                                    scriptArguments=self._createProcessArgs(filePath, subOutputDirPath),
-                                    logDir=path)
-    process.name = path.name
-    return process
+  def planExport(self):
+    """Select the cases of _inputData that have to be exported.
 
-  def _createProcessArgs(self, inputFilePath, outputDirectory):
-    args = ["-in", inputFilePath,
-            "-out", outputDirectory]
+    In incremental mode, cases that the manifest records as completed with the same file content, rules and
+    phases are skipped. Cases that the manifest records with any difference are exported again even if their
+    output files exist, cases missing from the manifest are exported unless their output files exist.
+    """
+    self._ruleSignature = self.getRuleSignature()
+    self._phases = list(ValveBatchExportRule.EXPORT_PHASES)
+    self._sources = dict()
+    self._casesToExport = dict()
+    self._forcedCases = set()
+    for filePath, subOutputDirPath in self._inputData.items():
+      self._sources[filePath] = self.manifest.examineFile(filePath)
+      if not self.incrementalExport:
+        self._casesToExport[filePath] = subOutputDirPath
+        continue
+      if self.manifest.isUpToDate(filePath, self._sources[filePath], self._ruleSignature, self._phases,
+                                  subOutputDirPath):
+        continue
+      self._casesToExport[filePath] = subOutputDirPath
+      if self.manifest.hasEntry(filePath):
+        self._forcedCases.add(filePath)
+    self._jobInputs = {Path(subOutputDirPath).name: filePath for filePath, subOutputDirPath in self._casesToExport.items()}
+    numUpToDate = len(self._inputData) - len(self._casesToExport)
+    if numUpToDate:
+      self.addLog(f'{numUpToDate} of {len(self._inputData)} cases are up to date.')
 
+  def _runMultiThreadedExport(self):
+    self.parallelExport = ExportWorkerPool(scriptPath=__file__,
+                                           scriptArguments=self._createWorkerArgs(),
+                                           numWorkers=self.numParallelProcesses,
+                                           logDir=Path(self.outputDirPath) / "ExportWorkerLogs",
+                                           jobTimeout=self.jobTimeout,
+                                           maxJobsPerWorker=self.maxJobsPerWorker,
+                                           maxWorkerMemory=self.maxWorkerMemory,
+                                           jobFinishedCallback=self.onProcessFinished,
+                                           completedCallback=self.onProcessesCompleted,
+                                           logCallback=self.addLog)
+    for filePath, subOutputDirPath in self._casesToExport.items():
+      self.parallelExport.addJob(Path(subOutputDirPath).name, filePath, subOutputDirPath,
+                                 force=filePath in self._forcedCases)
+    self.parallelExport.run()
+
+  def _createWorkerArgs(self):
+    args = []
     for rule in self._exportRules:
       args.append(rule.CMD_FLAG)
       args.extend(rule.OTHER_FLAGS)
     args.extend(["-ph", *ValveBatchExportRule.EXPORT_PHASES])
+    if self.profileExport:
+      args.append("--profile")
     return args
 
+  def measure(self, step):
+    """Context manager that measures an export step if profiling is enabled"""
+    return self.profiler.measure(step) if self.profileExport else nullcontext()
+
   def resetExport(self):
     self._cancelExport = False
     if self.progressCallback:
-      self.progressCallback(0, len(self._inputData))
+      self.progressCallback(0, len(self._casesToExport))
 
   def stopExport(self):
     if self.parallelExport:
@@ -348,35 +406,93 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
 
   def onExportStopped(self):
     self.addLog("Export was cancelled.")
+    self.profiler.stop()
     self.resetExport()
 
   def _runSingleThreadedExport(self):
-    for fIdx, (filePath, subOutputDirPath) in enumerate(self._inputData.items()):
+    for fIdx, (filePath, subOutputDirPath) in enumerate(self._casesToExport.items()):
       if self._cancelExport:
         self.onExportStopped()
         return
-      self.exportMRBFile(filePath, subOutputDirPath)
-      self.onProcessFinished(fIdx + 1, len(self._inputData))
+      try:
+        self.exportMRBFile(filePath, subOutputDirPath, force=filePath in self._forcedCases)
+      except Exception as exc:
+        self.recordExportResult(filePath, str(exc))
+        raise
+      self.recordExportResult(filePath)
+      self.onProcessFinished(fIdx + 1, len(self._casesToExport), trace=self.profiler.takeRecords())
     self.onProcessesCompleted()
 
-  def onProcessFinished(self, numCompleted, numProcesses, process=None, exitCode=None, exitStatus=None):
-    if process:
-      if exitCode != qt.QProcess.NormalExit:
-        self.addLog(f'{process.name} failed with exit status: {ProcessError[exitStatus]}')
+  def onProcessFinished(self, numCompleted, numProcesses, name=None, error=None, trace=None):
+    if trace:
+      self.profiler.addRecords(trace)
+    if name:
+      if error:
+        self.addLog(f'{name} failed: {error}')
       else:
-        self.addLog(f"{process.name} finished")
+        self.addLog(f"{name} finished")
+      self.recordExportResult(self._jobInputs[name], error)
     self.addLog(f"{numCompleted} of {numProcesses} exports complete.")
     if self.progressCallback:
       self.progressCallback(numCompleted, numProcesses)
 
-  def onProcessesCompleted(self):
+  def recordExportResult(self, filePath, error=None):
+    self.manifest.setResult(filePath, self._sources[filePath], self._ruleSignature, self._phases,
+                            self._inputData[filePath], error)
+
+  def getDirectoriesToMerge(self):
+    """Input directories for the mergeTables method of the rules, empty if the merged tables are up to date.
+
+    If the merged tables contain only cases that are still up to date then they are merged with the
+    outputs of the new cases only. Otherwise (a merged case was exported again or removed, or the merged
+    tables are missing) the outputs of all cases are merged.
+    """
+    casesToMerge = {self.manifest.key(filePath): subOutputDirPath for filePath, subOutputDirPath in self._inputData.items()}
+    mergedCases = self.manifest.getMergedCases()
+    newCases = [subOutputDirPath for key, subOutputDirPath in casesToMerge.items() if key not in mergedCases]
+    mergedCasesValid = not self.manifest.mergedTablesStale and mergedCases.issubset(casesToMerge.keys())
+    mergedTablesExist = all(filePath.exists() for filePath in self.getMergedTableFiles())
+    if mergedCasesValid and not newCases and mergedTablesExist:
+      return []
+    if mergedCases and mergedCasesValid and mergedTablesExist:
+      # the merged tables in the output directory are merged with the new cases as if it was one more case
+      self.addLog(f'Merging {len(newCases)} new cases into the existing tables...')
+      return [self.outputDirPath, *newCases]
+    return list(casesToMerge.values())
+
+  def getMergedTableFiles(self):
+    """Merged table files the rules write into the output directory (.csv, and .parquet if columnar tables are
+    enabled)"""
+    filePaths = []
     for rule in self._exportRules:
-      rule.mergeTables(list(self._inputData.values()), self.outputDirPath)
+      for csvFileName in rule.OUTPUT_CSV_FILES:
+        filePaths.append(Path(self.outputDirPath) / csvFileName)
+        if ValveBatchExportRule.WRITE_COLUMNAR_TABLES:
+          filePaths.append((Path(self.outputDirPath) / csvFileName).with_suffix(".parquet"))
+    return filePaths
+
+  def onProcessesCompleted(self):
+    inputDirectories = self.getDirectoriesToMerge()
+    if inputDirectories:
+      self.profiler.case = None
+      for rule in self._exportRules:
+        rule.profiler = self.profiler if self.profileExport else None
+        with rule.measure("mergeTables"):
+          rule.mergeTables(inputDirectories, self.outputDirPath)
+      self.manifest.setMergedCases(self._inputData.keys())
+    else:
+      self.addLog('Merged tables are up to date.')
+    if self.profileExport:
+      self.profiler.addRecords(self.profiler.takeRecords())
+      self.addLog(self.profiler.getReport())
+      self.profiler.stop()
     self.addLog(f'\nExport completed.')
     if self.completedCallback:
       self.completedCallback()
 
-  def exportMRBFile(self, filePath, outputDirPath):
+  def exportMRBFile(self, filePath, outputDirPath, force=False):
+    """Export a scene file. Unless force is set, the export is skipped if the output directory
+    already contains the CSV files of all rules."""
     if not isMRBFile(filePath):
       self.addLog(f'  {filePath} is not a mrb file. Skipped.')
       return
@@ -384,7 +500,7 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
     proceed = True
     if not Path(outputDirPath).exists():
       Path(outputDirPath).mkdir(parents=True, exist_ok=True)
-    else:
+    elif not force:
       proceeds = []
       # iterate over all rules and check if all data is available
       for rule in self._exportRules:
@@ -401,122 +517,609 @@ class ValveBatchExportLogic(ScriptedLoadableModuleLogic):
 
     self.addLog(f'Exporting mrb file: {filePath}')
     self.addLog(f'Output directory: {outputDirPath}')
+    self.profiler.case = Path(filePath).stem
 
     # set properties and initiate process start
     for rule in self._exportRules:
       rule.logCallback = self.addLog
       rule.outputDir = outputDirPath
-      rule.processStart()
+      rule.profiler = self.profiler if self.profileExport else None
+      with rule.measure("processStart"):
+        rule.processStart()
 
     self.addLog('  Loading scene...')
-    try:
-      slicer.mrmlScene.Clear(False)
-      slicer.util.loadScene(filePath)
-      # NB: this happens in Slicer_4.11 even though the scene was successfully loaded -- need to fix
-    except RuntimeError:
-      self.addLog(f'  Warning: errors found while loading scene from {filePath}')
-      # slicer.mrmlScene.Clear(False)
-      # return
+    with self.measure("loadScene"):
+      try:
+        slicer.mrmlScene.Clear(False)
+        slicer.util.loadScene(filePath)
+        # NB: this happens in Slicer_4.11 even though the scene was successfully loaded -- need to fix
+      except RuntimeError:
+        self.addLog(f'  Warning: errors found while loading scene from {filePath}')
+        # slicer.mrmlScene.Clear(False)
+        # return
 
     self.addLog('  Collecting data...')
 
     for rule in self._exportRules:
-      rule.processScene(filePath)
+      with rule.measure("processScene"):
+        rule.processScene(filePath)
 
     for rule in self._exportRules:
-      rule.afterProcessScene(filePath)
+      with rule.measure("afterProcessScene"):
+        rule.afterProcessScene(filePath)
 
-    slicer.mrmlScene.Clear(False)
+    with self.measure("clearScene"):
+      slicer.mrmlScene.Clear(False)
 
     self.addLog('Writing results...')
     for rule in self._exportRules:
-      rule.processEnd()
+      with rule.measure("processEnd"):
+        rule.processEnd()
 
 
-class ProcessesLogic(object):
-  """ source: SlicerProcesses """
+class ExportProfiler(object):
+  """Measures wall time, CPU time and memory usage of the steps of exporting cases.
 
-  @property
-  def totalNumProcesses(self):
-    return len(self.processLists[STATE.RUNNING]) + \
-           len(self.processLists[STATE.PENDING]) + \
-           len(self.processLists[STATE.COMPLETED])
+  Steps are loading and clearing the scene, each hook of each rule, processing of each valve model (recorded
+  with its cardiac cycle phase) and writing each file. Export workers collect the records and send them with
+  their results, the main process writes them to a JSON lines trace file and reports statistics per step.
 
-  def __init__(self,
-               maximumRunningProcesses=None,
-               progressFinishedCallback=None,
-               completedCallback=None,
-               logCallback=None):
-    self.maximumRunningProcesses = os.cpu_count() if not maximumRunningProcesses else maximumRunningProcesses
-    self.completedCallback = completedCallback
-    self.progressFinishedCallback = progressFinishedCallback
-    self.logCallback = logCallback
-    self.__initializeProcessLists()
+  Memory usage of a step is recorded relative to the resident memory of the process when the step starts, so it
+  does not depend on the cases exported earlier by the same worker:
+  memoryDelta is the change of resident memory during the step, peakMemoryIncrease is how much the resident memory
+  grew above its value at the start of the step at most (Linux only, the peak of each step is measured by resetting
+  the peak resident memory of the process through /proc/self/clear_refs).
+  """
+
+  TRACE_FILENAME = "ValveBatchExportTrace.jsonl"
+
+  def __init__(self):
+    self.case = None
+    self.step = None
+    self.rule = None
+    self.phase = None
+    self.pendingRecords = []
+    self.traceFile = None
+    self.statistics = dict()  # (rule, step, phase): list of (wall time, CPU time, memory delta, peak memory increase)
+    # peak resident memory of each step being measured, up to the start of its innermost measured step
+    self.peakMemoryStack = []
+
+  def start(self, traceFilePath):
+    self.stop()
+    Path(traceFilePath).parent.mkdir(parents=True, exist_ok=True)
+    self.traceFile = open(traceFilePath, "w", encoding="utf-8")
+    self.pendingRecords = []
+    self.statistics = dict()
+
+  def stop(self):
+    if self.traceFile:
+      self.traceFile.close()
+      self.traceFile = None
+
+  @contextmanager
+  def measure(self, step, rule=None, phase=None, fileName=None):
+    """Record the resources used until the end of the context. Steps measured within the context
+    inherit its rule and phase."""
+    outerContext = (self.step, self.rule, self.phase)
+    self.step, self.rule, self.phase = step, rule or self.rule, phase or self.phase
+    self.startPeakMemoryMeasurement()
+    startMemory = getProcessMemoryUsage()
+    startWallTime = time.perf_counter()
+    startCpuTime = time.process_time()
+    try:
+      yield
+    finally:
+      wallTime = time.perf_counter() - startWallTime
+      cpuTime = time.process_time() - startCpuTime
+      endMemory = getProcessMemoryUsage()
+      peakMemory = self.stopPeakMemoryMeasurement()
+      self.pendingRecords.append({
+        "case": self.case,
+        "rule": self.rule,
+        "step": step,
+        "phase": self.phase,
+        "file": fileName,
+        "wallTime": wallTime,
+        "cpuTime": cpuTime,
+        "memoryDelta": endMemory - startMemory if startMemory is not None and endMemory is not None else None,
+        "peakMemoryIncrease": max(peakMemory - startMemory, 0)
+          if startMemory is not None and peakMemory is not None else None
+      })
+      self.step, self.rule, self.phase = outerContext
+
+  def startPeakMemoryMeasurement(self):
+    peakMemory = getProcessPeakMemoryUsageSinceReset()
+    if self.peakMemoryStack and peakMemory is not None:
+      # the peak of the enclosing step so far is kept, as resetting the process peak discards it
+      self.peakMemoryStack[-1] = max(self.peakMemoryStack[-1] or 0, peakMemory)
+    self.peakMemoryStack.append(getProcessMemoryUsage() if resetProcessPeakMemoryUsage() else None)
+
+  def stopPeakMemoryMeasurement(self):
+    """Peak resident memory since the matching startPeakMemoryMeasurement, None if it cannot be measured"""
+    peakMemory = self.peakMemoryStack.pop()
+    if peakMemory is None:
+      return None
+    peakMemory = max(peakMemory, getProcessPeakMemoryUsageSinceReset() or 0)
+    if self.peakMemoryStack and self.peakMemoryStack[-1] is not None:
+      self.peakMemoryStack[-1] = max(self.peakMemoryStack[-1], peakMemory)
+    return peakMemory
+
+  def measureIterations(self, items, getPhase):
+    """Yields the items and measures the processing of each item as a step of its phase"""
+    for item in items:
+      with self.measure(self.step, phase=getPhase(item)):
+        yield item
+
+  def takeRecords(self):
+    records = self.pendingRecords
+    self.pendingRecords = []
+    return records
+
+  def addRecords(self, records):
+    for record in records:
+      if self.traceFile:
+        self.traceFile.write(json.dumps(record) + "\n")
+      key = (record["rule"] or "", record["step"], record["phase"] or "")
+      self.statistics.setdefault(key, []).append(
+        (record["wallTime"], record["cpuTime"], record.get("memoryDelta"), record.get("peakMemoryIncrease")))
+    if self.traceFile:
+      self.traceFile.flush()
+
+  @staticmethod
+  def percentile(sortedValues, percent):
+    return sortedValues[min(len(sortedValues) - 1, int(round(percent / 100. * (len(sortedValues) - 1))))]
+
+  def getReport(self):
+    """Table of wall time percentiles, CPU time and memory usage per step, ordered by total wall time.
+    Memory columns: median change of resident memory during the step and largest increase of resident memory
+    above its value at the start of the step."""
+    lines = ["Export profile (times in seconds, memory in MB relative to the start of each step):",
+             f"{'rule / step / phase':<64}{'count':>7}{'wall p50':>10}{'p90':>9}{'p99':>9}{'max':>9}"
+             f"{'total':>10}{'cpu p50':>9}{'mem p50':>9}{'peak max':>10}"]
+    megabytes = lambda value: value / (1024 * 1024) if value is not None else float('nan')
+    for (rule, step, phase), values in sorted(self.statistics.items(), key=lambda item: -sum(v[0] for v in item[1])):
+      wallTimes = sorted(value[0] for value in values)
+      cpuTimes = sorted(value[1] for value in values)
+      memoryDeltas = sorted(value[2] for value in values if value[2] is not None)
+      peakMemoryIncrease = max((value[3] for value in values if value[3] is not None), default=None)
+      name = " / ".join(part for part in (rule, step, phase) if part)
+      lines.append(f"{name:<64}{len(values):>7}"
+                   f"{self.percentile(wallTimes, 50):>10.2f}{self.percentile(wallTimes, 90):>9.2f}"
+                   f"{self.percentile(wallTimes, 99):>9.2f}{wallTimes[-1]:>9.2f}{sum(wallTimes):>10.1f}"
+                   f"{self.percentile(cpuTimes, 50):>9.2f}"
+                   f"{megabytes(self.percentile(memoryDeltas, 50) if memoryDeltas else None):>9.1f}"
+                   f"{megabytes(peakMemoryIncrease):>10.1f}")
+    return "\n".join(lines)
+
+
+class ValveBatchExportManifest(object):
+  """Record of the cases exported into an output directory, used for incremental export.
+
+  For each input scene file it stores the content hash, the rules (with version and options) and phases it
+  was exported with, the files in its output directory and whether the export completed or failed.
+  A case is up to date if none of these changed and its output files still exist.
+  It also stores which cases are included in the merged tables of the output directory, so that new cases
+  can be merged into the existing tables instead of merging all cases again.
+  """
 
-  def __initializeProcessLists(self):
-    self.processLists = {}
-    for processState in [STATE.PENDING, STATE.RUNNING, STATE.COMPLETED]:
-      self.processLists[processState] = []
+  FILENAME = "ValveBatchExportManifest.json"
+  MANIFEST_VERSION = 1
+  HASH_CHUNK_SIZE = 16 * 1024 * 1024
 
-  def addProcess(self, process):
-    self.processLists[STATE.PENDING].append(process)
+  def __init__(self, outputDirPath):
+    self.filePath = Path(outputDirPath) / self.FILENAME
+    self.entries = {}
+    # set when a case included in the merged tables is exported again, so its old rows are in the merged tables
+    self.mergedTablesStale = False
+    self.load()
+
+  def load(self):
+    try:
+      with open(self.filePath, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    except (OSError, ValueError):
+      return
+    if data.get("version") != self.MANIFEST_VERSION:
+      return
+    self.entries = data.get("entries", {})
+    self.mergedTablesStale = data.get("mergedTablesStale", False)
+
+  def save(self):
+    self.filePath.parent.mkdir(parents=True, exist_ok=True)
+    tempFilePath = self.filePath.with_name(self.filePath.name + ".tmp")
+    with open(tempFilePath, "w", encoding="utf-8") as f:
+      json.dump({"version": self.MANIFEST_VERSION, "mergedTablesStale": self.mergedTablesStale,
+                 "entries": self.entries}, f, indent=1)
+    # replace the manifest only when it is completely written
+    tempFilePath.replace(self.filePath)
+
+  @staticmethod
+  def key(filePath):
+    return str(Path(filePath).resolve())
+
+  def hasEntry(self, filePath):
+    return self.key(filePath) in self.entries
+
+  def examineFile(self, filePath):
+    """Returns size, modification time and SHA-256 hash of the file content.
+    The hash is only computed if the size or modification time differs from the manifest entry.
+    """
+    stat = Path(filePath).stat()
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    entry = self.entries.get(self.key(filePath))
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+      source["hash"] = entry["hash"]
+      return source
+    contentHash = hashlib.sha256()
+    with open(filePath, "rb") as f:
+      for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+        contentHash.update(chunk)
+    source["hash"] = contentHash.hexdigest()
+    return source
+
+  def isUpToDate(self, filePath, source, rules, phases, outputDirPath):
+    entry = self.entries.get(self.key(filePath))
+    if not entry or entry.get("status") != "completed":
+      return False
+    if entry.get("hash") != source["hash"] or entry.get("rules") != rules:
+      return False
+    if sorted(entry.get("phases", [])) != sorted(phases) or entry.get("outputDir") != str(outputDirPath):
+      return False
+    return all((Path(outputDirPath) / fileName).exists() for fileName in entry.get("outputs", []))
+
+  def setResult(self, filePath, source, rules, phases, outputDirPath, error=None):
+    """Record the export of a case and save the manifest"""
+    key = self.key(filePath)
+    previousEntry = self.entries.get(key)
+    if previousEntry and previousEntry.get("merged"):
+      self.mergedTablesStale = True
+    outputDirPath = Path(outputDirPath)
+    outputs = []
+    if outputDirPath.is_dir():
+      outputs = sorted(path.relative_to(outputDirPath).as_posix() for path in outputDirPath.rglob("*") if path.is_file())
+    self.entries[key] = {
+      "input": str(filePath),
+      **source,
+      "rules": rules,
+      "phases": list(phases),
+      "outputDir": str(outputDirPath),
+      "outputs": outputs,
+      "status": "failed" if error else "completed",
+      "error": error,
+      "merged": False
+    }
+    self.save()
+
+  def getMergedCases(self):
+    return {key for key, entry in self.entries.items() if entry.get("merged")}
+
+  def setMergedCases(self, filePaths):
+    """Record that the merged tables contain exactly the given cases and save the manifest"""
+    mergedKeys = {self.key(filePath) for filePath in filePaths}
+    for key, entry in self.entries.items():
+      entry["merged"] = key in mergedKeys
+    self.mergedTablesStale = False
+    self.save()
+
+
+class ExportWorker(object):
+  """State of a Slicer instance of an ExportWorkerPool"""
+
+  def __init__(self, workerId, process):
+    self.id = workerId
+    self.process = process
+    self.connection = None
+    self.buffer = b""
+    self.job = None
+    self.jobStartTime = None
+    self.numJobs = 0
+    self.memory = None
+    self.quitting = False
+    self.quitTime = None
+
+
+class ExportWorkerConnection(object):
+  """Connection accepted by an ExportWorkerPool that has not sent its hello message yet"""
+
+  def __init__(self, connection):
+    self.connection = connection
+    self.buffer = b""
+    self.acceptTime = time.monotonic()
+
+
+class ExportWorkerPool(object):
+  """Long-lived Slicer instances that export .mrb files one after the other.
+
+  Each worker is a Slicer instance running this script in worker mode (see runExportWorker). It connects to a
+  local socket of this process, receives jobs (input .mrb file and output directory) as JSON lines, exports them
+  with the rules given on its command line and replies with the result, so Slicer startup is paid once per worker
+  instead of once per file.
+  A worker is killed if a job takes longer than jobTimeout seconds and it is replaced by a new instance after
+  maxJobsPerWorker jobs or when its memory usage exceeds maxWorkerMemory bytes. If a worker crashes then only
+  its current job fails.
+  When all jobs are completed, the workers are asked to quit and completedCallback is called once their processes
+  have exited.
+  """
+
+  POLL_INTERVAL_MSEC = 50
+  # Seconds a new connection may take to send its hello message
+  HELLO_TIMEOUT = 5
+  # Seconds a worker may take to exit after it is asked to quit, before it is killed
+  QUIT_TIMEOUT = 30
+  # Maximum number of workers that may exit without completing a job before the remaining jobs are given up
+  MAX_START_FAILURES = 3
+
+  def __init__(self, scriptPath, scriptArguments, numWorkers=None, logDir=None,
+               jobTimeout=None, maxJobsPerWorker=None, maxWorkerMemory=None,
+               jobFinishedCallback=None, completedCallback=None, logCallback=None):
+    self.scriptPath = scriptPath
+    self.scriptArguments = scriptArguments
+    self.numWorkers = numWorkers if numWorkers else os.cpu_count()
+    self.logDir = logDir
+    self.jobTimeout = jobTimeout
+    self.maxJobsPerWorker = maxJobsPerWorker
+    self.maxWorkerMemory = maxWorkerMemory
+    self.jobFinishedCallback = jobFinishedCallback
+    self.completedCallback = completedCallback
+    self.logCallback = logCallback
+    self.pendingJobs = deque()
+    self.workers = []
+    self.newConnections = []
+    self.numJobs = 0
+    self.numCompletedJobs = 0
+    self.nextWorkerId = 1
+    self.startFailures = 0
+    # workers have to send this token when connecting, so that other local processes cannot pose as workers
+    self.token = uuid.uuid4().hex
+    self.server = None
+    self.timer = None
+    self.running = False
 
   def addLog(self, text):
     logging.info(text)
     if self.logCallback:
       self.logCallback(text)
 
-  def terminate(self):
-    if self.processLists[STATE.RUNNING]:
-      for process in self.processLists[STATE.RUNNING]:
-        self.disconnectSignals(process)
-        process.terminate()
-    self.__initializeProcessLists()
-
-  def __checkFinished(self):
-    if not self.processLists[STATE.RUNNING] and not self.processLists[STATE.PENDING]:
-      self.completedCallback()
-    else:
-      self.run()
+  def addJob(self, name, inputFilePath, outputDirPath, force=False):
+    self.pendingJobs.append({"name": name, "input": str(inputFilePath), "output": str(outputDirPath), "force": force})
+    self.numJobs += 1
+
+  def run(self):
+    self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.server.bind(("127.0.0.1", 0))
+    self.server.listen()
+    self.server.setblocking(False)
+    self.running = True
+    self.dispatchJobs()
+    self.startTimer()
+
+  def startTimer(self):
+    self.timer = qt.QTimer()
+    self.timer.setInterval(self.POLL_INTERVAL_MSEC)
+    self.timer.timeout.connect(self.poll)
+    self.timer.start()
 
   def waitForFinished(self):
-    while self.processLists[STATE.RUNNING]:
-      self.run()
-      self.processLists[STATE.RUNNING][0].waitForFinished()
-      self.__checkFinished()
+    while self.running:
+      slicer.app.processEvents()
+      self.poll()
+      time.sleep(self.POLL_INTERVAL_MSEC / 1000.)
 
-  def run(self):
-    while self.processLists[STATE.PENDING]:
-      if len(self.processLists[STATE.RUNNING]) >= self.maximumRunningProcesses:
+  def terminate(self):
+    """Kill all workers, pending jobs are dropped"""
+    for worker in list(self.workers):
+      self.removeWorker(worker, kill=True)
+    self.pendingJobs.clear()
+    self.stop()
+
+  def stop(self):
+    self.running = False
+    if self.timer:
+      self.timer.stop()
+      self.timer = None
+    for newConnection in self.newConnections:
+      newConnection.connection.close()
+    self.newConnections = []
+    if self.server:
+      self.server.close()
+      self.server = None
+
+  def createWorkerProcess(self, name, arguments):
+    return SlicerInstanceProcess(scriptPath=self.scriptPath, scriptArguments=arguments, name=name, logDir=self.logDir)
+
+  def isProcessRunning(self, process):
+    return process.state() != qt.QProcess.NotRunning
+
+  def startWorker(self):
+    workerId = self.nextWorkerId
+    self.nextWorkerId += 1
+    arguments = [*self.scriptArguments,
+                 "--worker_port", str(self.server.getsockname()[1]),
+                 "--worker_token", self.token,
+                 "--worker_id", str(workerId)]
+    worker = ExportWorker(workerId, self.createWorkerProcess(f"ExportWorker{workerId}", arguments))
+    self.addLog(f"Starting export worker {workerId}")
+    worker.process.run()
+    self.workers.append(worker)
+
+  def removeWorker(self, worker, kill=False):
+    if kill and self.isProcessRunning(worker.process):
+      worker.process.kill()
+    if worker.connection:
+      worker.connection.close()
+      worker.connection = None
+    self.workers.remove(worker)
+
+  def quitWorker(self, worker):
+    worker.quitting = True
+    worker.quitTime = time.monotonic()
+    self.sendMessage(worker, {"type": "quit"})
+
+  def sendMessage(self, worker, message):
+    try:
+      worker.connection.settimeout(5)
+      worker.connection.sendall((json.dumps(message) + "\n").encode())
+      worker.connection.setblocking(False)
+      return True
+    except OSError:
+      return False
+
+  def poll(self):
+    if not self.running:
+      return
+    self.acceptConnections()
+    for worker in list(self.workers):
+      connected = self.readMessages(worker)
+      if worker.quitting:
+        # keep the worker (and its process object) until the process has exited
+        if not connected and worker.connection:
+          worker.connection.close()
+          worker.connection = None
+        if not self.isProcessRunning(worker.process):
+          self.removeWorker(worker)
+        elif time.monotonic() - worker.quitTime > self.QUIT_TIMEOUT:
+          self.addLog(f"Export worker {worker.id} did not quit in {self.QUIT_TIMEOUT}s, killing it")
+          self.removeWorker(worker, kill=True)
+      elif worker.job and self.jobTimeout and time.monotonic() - worker.jobStartTime > self.jobTimeout:
+        self.addLog(f"Export worker {worker.id} did not complete {worker.job['name']} in {self.jobTimeout}s, restarting it")
+        self.finishJob(worker, "Timedout")
+        self.removeWorker(worker, kill=True)
+      elif not connected or not self.isProcessRunning(worker.process):
+        if worker.job:
+          self.finishJob(worker, "Crashed")
+        elif worker.numJobs == 0:
+          self.startFailures += 1
+        self.removeWorker(worker, kill=True)
+    self.dispatchJobs()
+    self.checkFinished()
+
+  def acceptConnections(self):
+    while True:
+      try:
+        connection, address = self.server.accept()
+      except (BlockingIOError, socket.timeout):
+        break
+      connection.setblocking(False)
+      self.newConnections.append(ExportWorkerConnection(connection))
+
+    # the worker sends its hello message right after connecting, it is read without blocking
+    for newConnection in list(self.newConnections):
+      lines, connected = self.receiveLines(newConnection)
+      if not lines:
+        if not connected or time.monotonic() - newConnection.acceptTime > self.HELLO_TIMEOUT:
+          self.newConnections.remove(newConnection)
+          newConnection.connection.close()
+        continue
+      self.newConnections.remove(newConnection)
+      try:
+        hello = json.loads(lines[0])
+      except ValueError:
+        newConnection.connection.close()
+        continue
+      worker = next((worker for worker in self.workers
+                     if isinstance(hello, dict) and worker.id == hello.get("worker")), None)
+      if worker is None or hello.get("token") != self.token or worker.connection:
+        newConnection.connection.close()
+        continue
+      worker.connection = newConnection.connection
+      # messages received after the hello are handled by readMessages
+      worker.buffer = b"".join(line + b"\n" for line in lines[1:]) + newConnection.buffer
+
+  def receiveLines(self, receiver):
+    """Read the data available on receiver.connection without blocking.
+    Returns the complete lines received and False if the connection is closed, incomplete lines are kept in
+    receiver.buffer.
+    """
+    connected = True
+    while True:
+      try:
+        data = receiver.connection.recv(65536)
+      except (BlockingIOError, socket.timeout):
+        break
+      except OSError:
+        connected = False
+        break
+      if not data:
+        connected = False
         break
-      process = self.processLists[STATE.PENDING].pop()
-      self.connectSignals(process)
-      self.addLog(f"Starting export process {process.name}")
-      process.run()
-      self.processLists[STATE.RUNNING].append(process)
-
-  def connectSignals(self, process):
-    process.connect('finished(int,QProcess::ExitStatus)',
-                    lambda exitCode, exitStatus: self.onProcessFinished(process, exitCode, exitStatus))
-    process.stateChanged.connect(lambda status: self.onStateChanged(process, status))
-
-  def disconnectSignals(self, process):
-    # NB: disconnecting ALL slots from the specified signals. lambda returns a new function everytime. Otherwise could
-    #     also hold a reference for the lambda function for every process and connected signal
-    process.stateChanged.disconnect()
-    process.disconnect('finished(int,QProcess::ExitStatus)')
-
-  def onProcessFinished(self, process, exitCode, exitStatus):
-    self.disconnectSignals(process)
-    self.processLists[STATE.RUNNING].remove(process)
-    self.processLists[STATE.COMPLETED].append(process)
-    if self.progressFinishedCallback:
-      self.progressFinishedCallback(len(self.processLists[STATE.COMPLETED]), self.totalNumProcesses,
-                                    process, exitCode, exitStatus)
-    self.__checkFinished()
-
-  def onStateChanged(self, process, newState):
-    logging.debug(f'{process.name} process status: {newState, ProcessState[newState]}')
+      receiver.buffer += data
+    *lines, receiver.buffer = receiver.buffer.split(b"\n")
+    return lines, connected
+
+  def readMessages(self, worker):
+    """Handle the messages received from the worker, returns False if the connection is closed"""
+    if not worker.connection:
+      return True
+    lines, connected = self.receiveLines(worker)
+    for line in lines:
+      message = json.loads(line)
+      if message.get("type") == "result" and worker.job:
+        worker.numJobs += 1
+        worker.memory = message.get("memory")
+        self.finishJob(worker, message.get("error"), message.get("trace"))
+    return connected
+
+  def finishJob(self, worker, error=None, trace=None):
+    job = worker.job
+    worker.job = None
+    self.jobFinished(job, error, trace)
+
+  def jobFinished(self, job, error=None, trace=None):
+    self.numCompletedJobs += 1
+    if self.jobFinishedCallback:
+      self.jobFinishedCallback(self.numCompletedJobs, self.numJobs, job["name"], error, trace)
+
+  def needsRecycling(self, worker):
+    if self.maxJobsPerWorker and worker.numJobs >= self.maxJobsPerWorker:
+      return True
+    return bool(self.maxWorkerMemory and worker.memory and worker.memory > self.maxWorkerMemory)
+
+  def dispatchJobs(self):
+    for worker in list(self.workers):
+      if not worker.connection or worker.job or worker.quitting:
+        continue
+      if self.needsRecycling(worker):
+        memoryUsage = f", {worker.memory // (1024 * 1024)} MB memory used" if worker.memory else ""
+        self.addLog(f"Replacing export worker {worker.id} after {worker.numJobs} jobs{memoryUsage}")
+        self.quitWorker(worker)
+        continue
+      if not self.pendingJobs:
+        continue
+      worker.job = self.pendingJobs.popleft()
+      worker.jobStartTime = time.monotonic()
+      if not self.sendMessage(worker, {"type": "export", **worker.job}):
+        self.finishJob(worker, "WriteError")
+        self.removeWorker(worker, kill=True)
+
+    # start workers for the remaining jobs
+    activeWorkers = [worker for worker in self.workers if not worker.quitting]
+    idleWorkers = [worker for worker in activeWorkers if not worker.job]
+    numWorkersToStart = min(self.numWorkers - len(activeWorkers), len(self.pendingJobs) - len(idleWorkers))
+    if self.startFailures >= self.MAX_START_FAILURES:
+      if not activeWorkers:
+        while self.pendingJobs:
+          self.jobFinished(self.pendingJobs.popleft(), "FailedToStart")
+      return
+    for _ in range(numWorkersToStart):
+      self.startWorker()
+
+  def checkFinished(self):
+    if not self.running or self.pendingJobs or any(worker.job for worker in self.workers):
+      return
+    for worker in list(self.workers):
+      if worker.quitting:
+        continue
+      if worker.connection:
+        self.quitWorker(worker)
+      else:
+        # workers that have not connected yet are not needed anymore
+        self.removeWorker(worker, kill=True)
+    if self.workers:
+      # poll removes the workers as their processes exit
+      return
+    self.stop()
+    if self.completedCallback:
+      self.completedCallback()
 
 
 class SlicerInstanceProcess(qt.QProcess):
@@ -524,7 +1127,6 @@ class SlicerInstanceProcess(qt.QProcess):
   def __init__(self, scriptPath, scriptArguments, name="Process", logDir=None):
     super().__init__()
     self.name = name
-    self.processState = STATE.PENDING
     self.scriptPath = scriptPath
     self.scriptArguments = scriptArguments
     self.logDir = logDir
@@ -562,6 +1164,10 @@ class ValveBatchExportTest(ScriptedLoadableModuleTest):
     """
     self.setUp()
     self.test_ValveBatchExport1()
+    self.test_ValveBatchExportManifest()
+    self.test_ValveBatchExportTableMerge()
+    self.test_ValveBatchExportProfiler()
+    self.test_ValveBatchExportTableRowBuffer()
 
   def test_ValveBatchExport1(self):
     """ Ideally you should have several levels of tests.  At the lowest level
@@ -577,11 +1183,248 @@ class ValveBatchExportTest(ScriptedLoadableModuleTest):
     # TODO: implement tests
     pass
 
+  def test_ValveBatchExportManifest(self):
+    import shutil
+    testDir = Path(slicer.app.temporaryPath) / "ValveBatchExportManifestTest"
+    if testDir.exists():
+      shutil.rmtree(testDir)
+    caseOutputDir = testDir / "case"
+    caseOutputDir.mkdir(parents=True)
+    inputFilePath = testDir / "case.mrb"
+    inputFilePath.write_bytes(b"scene")
+    (caseOutputDir / "annulus_contour_points.csv").write_text("a,b\n1,2\n")
+    rules = {"AnnulusContourCoordinatesExportRule": {"version": 1, "flags": ["-acc"]}}
+
+    manifest = ValveBatchExportManifest(testDir)
+    source = manifest.examineFile(inputFilePath)
+    self.assertFalse(manifest.isUpToDate(inputFilePath, source, rules, ["MS"], caseOutputDir))
+    manifest.setResult(inputFilePath, source, rules, ["MS"], caseOutputDir)
+    manifest.setMergedCases([inputFilePath])
+
+    # state is restored from the manifest file
+    manifest = ValveBatchExportManifest(testDir)
+    self.assertEqual(manifest.examineFile(inputFilePath), source)
+    self.assertTrue(manifest.isUpToDate(inputFilePath, source, rules, ["MS"], caseOutputDir))
+    self.assertEqual(manifest.getMergedCases(), {manifest.key(inputFilePath)})
+
+    # other phases, rule versions or content, missing outputs and failed exports need export
+    self.assertFalse(manifest.isUpToDate(inputFilePath, source, rules, ["MS", "MD"], caseOutputDir))
+    otherRules = {"AnnulusContourCoordinatesExportRule": {"version": 2, "flags": ["-acc"]}}
+    self.assertFalse(manifest.isUpToDate(inputFilePath, source, otherRules, ["MS"], caseOutputDir))
+    self.assertFalse(manifest.isUpToDate(inputFilePath, {**source, "hash": "0"}, rules, ["MS"], caseOutputDir))
+    (caseOutputDir / "annulus_contour_points.csv").unlink()
+    self.assertFalse(manifest.isUpToDate(inputFilePath, source, rules, ["MS"], caseOutputDir))
+    manifest.setResult(inputFilePath, source, rules, ["MS"], caseOutputDir, error="Crashed")
+    self.assertFalse(manifest.isUpToDate(inputFilePath, source, rules, ["MS"], caseOutputDir))
+
+    # exporting a merged case again invalidates the merged tables
+    self.assertTrue(manifest.mergedTablesStale)
+    self.assertEqual(manifest.getMergedCases(), set())
+
+    # merged tables are merged again when one of them is missing, e.g. after enabling columnar tables
+    logic = ValveBatchExportLogic()
+    logic.addRule(AnnulusContourCoordinatesExportRule)
+    logic.outputDirPath = str(testDir)
+    logic.manifest = manifest
+    logic._inputData = {inputFilePath: caseOutputDir}
+    manifest.setMergedCases([inputFilePath])
+    (testDir / AnnulusContourCoordinatesExportRule.CSV_OUTPUT_FILENAME).write_text("a,b\n1,2\n")
+    writeColumnarTables = ValveBatchExportRule.WRITE_COLUMNAR_TABLES
+    try:
+      ValveBatchExportRule.setWriteColumnarTables(False)
+      self.assertEqual(logic.getDirectoriesToMerge(), [])
+      ValveBatchExportRule.setWriteColumnarTables(True)
+      self.assertEqual(logic.getDirectoriesToMerge(), [caseOutputDir])
+    finally:
+      ValveBatchExportRule.setWriteColumnarTables(writeColumnarTables)
+    shutil.rmtree(testDir)
+
+  def test_ValveBatchExportTableMerge(self):
+    import csv
+    import shutil
+    from ValveBatchExportRules.base import StreamingTableMerger
+    testDir = Path(slicer.app.temporaryPath) / "ValveBatchExportTableMergeTest"
+    if testDir.exists():
+      shutil.rmtree(testDir)
+    testDir.mkdir(parents=True)
+    (testDir / "case1.csv").write_text('"Filename","Phase","Value"\n"case1","MS","1.50"\n"case1","MS","1.50"\n')
+    (testDir / "case2.csv").write_text('Filename,Value,Unit\ncase2,2,mm\n')
+    inputFiles = [testDir / "case1.csv", testDir / "case2.csv"]
+
+    StreamingTableMerger(inputFiles, removeDuplicateRows=True).merge(testDir / "merged.csv")
+    with open(testDir / "merged.csv", newline="") as f:
+      rows = list(csv.reader(f))
+    # columns are merged, values are kept as they are and duplicate rows are removed
+    self.assertEqual(rows, [["Filename", "Phase", "Value", "Unit"],
+                            ["case1", "MS", "1.50", ""],
+                            ["case2", "", "2", "mm"]])
+
+    # the merged table can be merged with new tables
+    StreamingTableMerger([testDir / "merged.csv", testDir / "case2.csv"], removeDuplicateRows=True).merge(testDir / "merged.csv")
+    with open(testDir / "merged.csv", newline="") as f:
+      self.assertEqual(len(list(csv.reader(f))), 3)
+
+    with self.assertRaises(ValueError):
+      StreamingTableMerger(inputFiles, columnTypes={"Filename": "string", "Value": "float64"}).merge(testDir / "merged.csv")
+
+    try:
+      import pyarrow.parquet
+    except ImportError:
+      logging.info("pyarrow is not available, skip testing columnar tables")
+      shutil.rmtree(testDir)
+      return
+    StreamingTableMerger(inputFiles).merge(testDir / "merged.csv", testDir / "merged.parquet")
+    table = pyarrow.parquet.read_table(str(testDir / "merged.parquet"))
+    self.assertEqual([str(field.type) for field in table.schema], ["string", "string", "double", "string"])
+    self.assertEqual(table.column("Value").to_pylist(), [1.5, 1.5, 2.0])
+    shutil.rmtree(testDir)
+
+  def test_ValveBatchExportProfiler(self):
+    traceFilePath = Path(slicer.app.temporaryPath) / ExportProfiler.TRACE_FILENAME
+    profiler = ExportProfiler()
+    profiler.start(traceFilePath)
+    for case in ["case1", "case2"]:
+      profiler.case = case
+      with profiler.measure("processScene", rule="Rule"):
+        for phase in profiler.measureIterations(["MS", "ED"], lambda phase: phase):
+          with profiler.measure("write", fileName=f"{case}_{phase}.csv"):
+            pass
+    records = profiler.takeRecords()
+    self.assertEqual(len(records), 10)
+    # steps within a rule step inherit its rule and phase
+    self.assertEqual([(record["rule"], record["step"], record["phase"]) for record in records[:3]],
+                     [("Rule", "write", "MS"), ("Rule", "processScene", "MS"), ("Rule", "write", "ED")])
+    self.assertEqual(records[-1]["phase"], None)
+    profiler.addRecords(records)
+    self.assertEqual(len(profiler.statistics[("Rule", "write", "ED")]), 2)
+    report = profiler.getReport()
+    self.assertIn("Rule / processScene / MS", report)
+    # memory usage is measured per step, a step allocating memory reports it even after larger earlier steps
+    with profiler.measure("allocate"):
+      buffer = bytearray(64 * 1024 * 1024)
+      buffer[::4096] = b"\1" * len(buffer[::4096])
+      del buffer
+    record = profiler.takeRecords()[0]
+    if record["peakMemoryIncrease"] is not None:
+      self.assertGreater(record["peakMemoryIncrease"], 32 * 1024 * 1024)
+    profiler.stop()
+    with open(traceFilePath) as f:
+      self.assertEqual([json.loads(line) for line in f], records)
+    traceFilePath.unlink()
+
+  def test_ValveBatchExportTableRowBuffer(self):
+    table = TableRowBuffer("Filename", "Phase", "Measurement")
+    rowIndex = table.addRow("case1", "MS", "MV")
+    table.setValue(rowIndex, "Area", 12.5)
+    table.addRow("case2", "ES")
+    table.setValue(1, "Area", 10)
+    table.setValue(1, "Comment", "annulus, partial")
+    self.assertEqual(table.columns, ["Filename", "Phase", "Measurement", "Area", "Comment"])
+    self.assertTrue(table.isNumericColumn("Area"))
+    self.assertFalse(table.isNumericColumn("Comment"))
+
+    csvFilePath = Path(slicer.app.temporaryPath) / "ValveBatchExportTableRowBufferTest.csv"
+    table.writeCsv(csvFilePath, useStringDelimiter=True)
+    self.assertEqual(csvFilePath.read_text().splitlines(),
+                     ['"Filename","Phase","Measurement","Area","Comment"',
+                      '"case1","MS","MV",12.5,""',
+                      '"case2","ES","",10,"annulus, partial"'])
+    csvFilePath.unlink()
+
+    tableNode = table.createTableNode()
+    self.assertEqual(tableNode.GetNumberOfRows(), 2)
+    self.assertTrue(tableNode.GetTable().GetColumnByName("Area").IsA("vtkDoubleArray"))
+    self.assertEqual(tableNode.GetCellText(1, 4), "annulus, partial")
+
+
+def getProcessMemoryUsage():
+  """Memory used by this process in bytes (peak usage if neither psutil nor /proc is available), None if unknown"""
+  try:
+    import psutil
+    return psutil.Process().memory_info().rss
+  except ImportError:
+    pass
+  residentMemory = getProcessStatusMemoryValue("VmRSS")
+  if residentMemory is not None:
+    return residentMemory
+  return getProcessPeakMemoryUsage()
+
+
+def getProcessStatusMemoryValue(name):
+  """Memory value (such as VmRSS or VmHWM) of /proc/self/status in bytes, None if not available (not Linux)"""
+  try:
+    with open("/proc/self/status", "r") as f:
+      for line in f:
+        if line.startswith(name + ":"):
+          return int(line.split()[1]) * 1024
+  except (OSError, ValueError, IndexError):
+    pass
+  return None
+
+
+def resetProcessPeakMemoryUsage():
+  """Reset the peak resident memory of this process (VmHWM) to its current resident memory.
+  Returns False if not supported (not Linux)."""
+  try:
+    with open("/proc/self/clear_refs", "w") as f:
+      f.write("5")
+    return True
+  except OSError:
+    return False
+
+
+def getProcessPeakMemoryUsageSinceReset():
+  """Peak resident memory of this process in bytes since resetProcessPeakMemoryUsage, None if not available"""
+  return getProcessStatusMemoryValue("VmHWM")
+
+
+def getProcessPeakMemoryUsage():
+  """Peak memory used by this process in bytes, None if unknown"""
+  try:
+    import resource
+  except ImportError:
+    # Windows
+    try:
+      import psutil
+      return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+      return None
+  maxResidentSize = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # kilobytes on Linux, bytes on macOS
+  return maxResidentSize if sys.platform == "darwin" else maxResidentSize * 1024
+
+
+def runExportWorker(logic, port, token, workerId):
+  """Export the .mrb files received from an ExportWorkerPool, until it sends quit or closes the connection"""
+  import traceback
+  connection = socket.create_connection(("127.0.0.1", port))
+  stream = connection.makefile("rw", encoding="utf-8", newline="\n")
+
+  def sendMessage(message):
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+  sendMessage({"type": "hello", "worker": workerId, "token": token})
+  for line in stream:
+    message = json.loads(line)
+    if message["type"] != "export":
+      break
+    error = None
+    try:
+      logic.exportMRBFile(message["input"], message["output"], force=message.get("force", False))
+    except Exception:
+      error = traceback.format_exc()
+      logging.error(error)
+      slicer.mrmlScene.Clear(False)
+    sendMessage({"type": "result", "name": message["name"], "error": error, "memory": getProcessMemoryUsage(),
+                 "trace": logic.profiler.takeRecords()})
+  connection.close()
+
 
 def main(argv):
   parser = argparse.ArgumentParser(description="Valve Batch Export")
-  parser.add_argument("-in", "--input_mrb", metavar="PATH", help="input .mrb file", required=True)
-  parser.add_argument("-out", "--output_directory", metavar="PATH", required=True,
+  parser.add_argument("-in", "--input_mrb", metavar="PATH", help="input .mrb file")
+  parser.add_argument("-out", "--output_directory", metavar="PATH",
                       help="data output directory")
   parser.add_argument("-ph", "--phases", metavar="PHASE_SHORTNAME", type=str, nargs="+", required=True,
                       help="cardiac phases which will be exported")
@@ -605,7 +1448,15 @@ def main(argv):
   parser.add_argument(AnnulusContourModelExportRule.CMD_FLAG_MODEL, "--valve_annulus_contour_model", action='store_true')
 
   parser.add_argument("-d", "--debug", action='store_true', help="run python debugger upon Slicer start")
+  parser.add_argument("--profile", action='store_true',
+                      help="record wall time, CPU time and memory usage of the export steps")
+  parser.add_argument("--worker_port", type=int,
+                      help="run as export worker: receive input files from the ExportWorkerPool listening on this port")
+  parser.add_argument("--worker_token", help="token the export worker sends to the ExportWorkerPool")
+  parser.add_argument("--worker_id", type=int, help="identifier of the export worker in the ExportWorkerPool")
   args = parser.parse_args(argv)
+  if args.worker_port is None and (not args.input_mrb or not args.output_directory):
+    parser.error("-in/--input_mrb and -out/--output_directory are required")
 
   import slicer
 
@@ -615,6 +1466,7 @@ def main(argv):
     w.connectButton.click()
 
   logic = ValveBatchExportLogic()
+  logic.profileExport = args.profile
 
   ValveBatchExportRule.EXPORT_PHASES = args.phases
 
@@ -644,10 +1496,18 @@ def main(argv):
     ValveLandmarkLabelsExportRule.ONE_FILE_PER_LANDMARK = args.valve_landmark_label_individual_files
     logic.addRule(ValveLandmarkLabelsExportRule)
 
+  if args.worker_port is not None:
+    try:
+      runExportWorker(logic, args.worker_port, args.worker_token, args.worker_id)
+    finally:
+      sys.exit(0)
+
   assert Path(args.input_mrb).exists
 
   input_mrb = args.input_mrb
 
+  if args.profile:
+    logic.profiler.start(Path(args.output_directory) / f"{Path(input_mrb).stem}_{ExportProfiler.TRACE_FILENAME}")
   try:
     logic.exportMRBFile(input_mrb,
                         args.output_directory)
@@ -655,6 +1515,10 @@ def main(argv):
     import shutil
     logFilePath = slicer.app.errorLogModel().filePath
     shutil.copy(logFilePath, Path(args.output_directory) / f"{Path(input_mrb).stem}_Slicer.log")
+    if args.profile:
+      logic.profiler.addRecords(logic.profiler.takeRecords())
+      logging.info(logic.profiler.getReport())
+      logic.profiler.stop()
 
   sys.exit(0)
 
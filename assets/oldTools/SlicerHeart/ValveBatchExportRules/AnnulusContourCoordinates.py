@@ -2,7 +2,7 @@ import os
 from pathlib import Path
 
 import numpy as np
-from .base import ValveBatchExportRule
+from .base import ValveBatchExportRule, TableRowBuffer
 
 
 class AnnulusContourCoordinatesExportRule(ValveBatchExportRule):
@@ -11,6 +11,9 @@ class AnnulusContourCoordinatesExportRule(ValveBatchExportRule):
   DETAILED_DESCRIPTION = "Export 3D coordinates of annulus contour points"
   COLUMNS = \
     ['Filename', 'Phase', 'FrameNumber', 'Valve', 'AnnulusContourX', 'AnnulusContourY', 'AnnulusContourZ', 'AnnulusContourLabel']
+  COLUMN_TYPES = {'Filename': 'string', 'Phase': 'string', 'FrameNumber': 'int64', 'Valve': 'string',
+                  'AnnulusContourX': 'float64', 'AnnulusContourY': 'float64', 'AnnulusContourZ': 'float64',
+                  'AnnulusContourLabel': 'string'}
   CSV_OUTPUT_FILENAME = 'AnnulusContourPoints.csv'
 
   OUTPUT_CSV_FILES = [
@@ -18,16 +21,18 @@ class AnnulusContourCoordinatesExportRule(ValveBatchExportRule):
   ]
 
   CMD_FLAG = "-acc"
+  # 2: coordinates written as unquoted rounded numbers from a row buffer
+  VERSION = 2
 
   def processStart(self):
-    self.resultsTableNode = self.createTableNode(*self.COLUMNS)
+    self.resultsTable = TableRowBuffer(*self.COLUMNS)
 
   def processScene(self, sceneFileName):
     for valveModel in self.getHeartValveModelNodes():
       # Add a row for each contour point
       curvePoints = valveModel.annulusContourCurve.curvePoints
       numberOfAnnulusContourPoints = curvePoints.GetNumberOfPoints()
-      startingRowIndex = self.resultsTableNode.GetNumberOfRows()
+      startingRowIndex = self.resultsTable.numberOfRows
       filename, file_extension = os.path.splitext(os.path.basename(sceneFileName))
       valveType = valveModel.heartValveNode.GetAttribute('ValveType')
       cardiacCyclePhaseName = valveModel.cardiacCyclePhasePresets[valveModel.getCardiacCyclePhase()]["shortname"]
@@ -35,7 +40,7 @@ class AnnulusContourCoordinatesExportRule(ValveBatchExportRule):
       for i in range(numberOfAnnulusContourPoints):
         pos = [0.0, 0.0, 0.0]
         curvePoints.GetPoint(i, pos)
-        self.addRowData(self.resultsTableNode, filename, cardiacCyclePhaseName, str(frameNumber), valveType, *[f'{p:.2f}' for p in pos])
+        self.resultsTable.addRow(filename, cardiacCyclePhaseName, frameNumber, valveType, *[round(p, 2) for p in pos])
       # Add labels to label column
       annulusMarkupNode = valveModel.getAnnulusLabelsMarkupNode()
       numberOfMarkups = annulusMarkupNode.GetNumberOfFiducials()
@@ -47,11 +52,12 @@ class AnnulusContourCoordinatesExportRule(ValveBatchExportRule):
           # it is not a label on the annulus (for example, centroid), ignore it
           continue
         label = annulusMarkupNode.GetNthFiducialLabel(annulusMarkupIndex).strip()
-        self.resultsTableNode.SetCellText(startingRowIndex + closestPointIdOnAnnulusCurve, 7, label)
+        self.resultsTable.setValue(startingRowIndex + closestPointIdOnAnnulusCurve, 'AnnulusContourLabel', label)
 
   def processEnd(self):
-    self.writeTableNodeToCsv(self.resultsTableNode, self.CSV_OUTPUT_FILENAME)
+    self.writeRowBufferToCsv(self.resultsTable, self.CSV_OUTPUT_FILENAME)
 
   def mergeTables(self, inputDirectories, outputDirectory):
     contourPointsCSVs = self.findCorrespondingFilesInDirectories(inputDirectories, self.CSV_OUTPUT_FILENAME)
-    self.concatCSVsAndSave(contourPointsCSVs, Path(outputDirectory) / self.CSV_OUTPUT_FILENAME, removeDuplicateRows=True)
\ No newline at end of file
+    self.concatCSVsAndSave(contourPointsCSVs, Path(outputDirectory) / self.CSV_OUTPUT_FILENAME, removeDuplicateRows=True,
+                           columnTypes=self.COLUMN_TYPES)
\ No newline at end of file
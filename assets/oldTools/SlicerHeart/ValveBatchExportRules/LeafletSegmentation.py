@@ -100,7 +100,7 @@ class LeafletSegmentationExportRule(ValveBatchExportRule):
       segmentationsLogic.ExportVisibleSegmentsToLabelmapNode(segmentationNode, labelNode)
       segmentName = segmentationNode.GetSegmentation().GetSegment(segmentID).GetName()
       filename = f"{prefix}_{segmentName.replace(' ', '_')}.nii.gz"
-      slicer.util.saveNode(labelNode, str(Path(self.outputDir) / filename))
+      self.saveNode(labelNode, str(Path(self.outputDir) / filename))
 
 
 def getAllSegmentNames(segmentationNode):
@@ -4,7 +4,7 @@ import logging
 from pathlib import Path
 from collections import OrderedDict
 
-from .base import ValveBatchExportRule
+from .base import ValveBatchExportRule, TableRowBuffer
 from HeartValveLib.helpers import getSpecificHeartValveMeasurementNodes, getAllHeartValveModelNodes
 
 
@@ -27,13 +27,15 @@ class PapillaryAnalysisResultsExportRule(ValveBatchExportRule):
   ]
 
   CMD_FLAG = "-pr"
+  # 2: metric values written as unquoted numbers from a row buffer
+  VERSION = 2
 
   def __init__(self):
     super(PapillaryAnalysisResultsExportRule, self).__init__()
 
   def processStart(self):
     self._unitsDictionary = OrderedDict()
-    self.resultsTableNode = self.createTableNode(*self.COLUMNS)
+    self.resultsTable = TableRowBuffer(*self.COLUMNS)
     self.valveQuantificationLogic = slicer.modules.valvequantification.widgetRepresentation().self().logic
 
   @classmethod
@@ -129,25 +131,24 @@ class PapillaryAnalysisResultsExportRule(ValveBatchExportRule):
       valve = measurementPresetId.replace(self.MEASUREMENT_PRESET_ID_SUFFIX, "")
 
       filename, file_extension = os.path.splitext(os.path.basename(sceneFileName))
-      resultsTableRowIndex = \
-        self.addRowData(self.resultsTableNode, filename, cardiacCyclePhaseName, valve)
+      resultsTableRowIndex = self.resultsTable.addRow(filename, cardiacCyclePhaseName, valve)
 
       if measurementResultsTableNode:
         numberOfMetrics = measurementResultsTableNode.GetNumberOfRows()
         for metricIndex in range(numberOfMetrics):
           metricName, metricValue, metricUnit = self.getColData(measurementResultsTableNode, metricIndex, range(3))
-          self.setValueInTable(self.resultsTableNode, resultsTableRowIndex, metricName, metricValue)
+          self.resultsTable.setValue(resultsTableRowIndex, metricName, self.parseNumber(metricValue))
           self._unitsDictionary[metricName] = metricUnit
 
   def processEnd(self):
     self._writeUnitsTable()
-    self.writeTableNodeToCsv(self.resultsTableNode, self.RESULTS_CSV_OUTPUT_FILENAME)
+    self.writeRowBufferToCsv(self.resultsTable, self.RESULTS_CSV_OUTPUT_FILENAME)
 
   def _writeUnitsTable(self):
-    unitsTableNode = self.createTableNode('Measurement', 'Unit')
+    unitsTable = TableRowBuffer('Measurement', 'Unit')
     for metricName, metricUnit in self._unitsDictionary.items():
-      self.addRowData(unitsTableNode, metricName, metricUnit)
-    self.writeTableNodeToCsv(unitsTableNode, self.UNITS_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
+      unitsTable.addRow(metricName, metricUnit)
+    self.writeRowBufferToCsv(unitsTable, self.UNITS_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
 
   def mergeTables(self, inputDirectories, outputDirectory):
     unitCSVs = self.findCorrespondingFilesInDirectories(inputDirectories, self.UNITS_CSV_OUTPUT_FILENAME)
@@ -4,7 +4,7 @@ import slicer
 from pathlib import Path
 
 from collections import OrderedDict
-from .base import ValveBatchExportRule
+from .base import ValveBatchExportRule, TableRowBuffer
 from HeartValveLib.helpers import getSpecificHeartValveMeasurementNodes, getAllFilesWithExtension
 
 
@@ -31,14 +31,16 @@ class QuantificationResultsExportRule(ValveBatchExportRule):
   ]
 
   CMD_FLAG = "-qr"
+  # 2: metric values written as unquoted numbers from a row buffer
+  VERSION = 2
 
   QUANTIFICATION_RESULTS_IDENTIFIER = 'Quantification results'
 
   def processStart(self):
     self.unitsDictionary = OrderedDict()
 
-    self.wideResultsTableNode = self.createTableNode(*self.WIDE_COLUMNS)
-    self.longResultsTableNode = self.createTableNode(*self.LONG_COLUMNS)
+    self.wideResultsTable = TableRowBuffer(*self.WIDE_COLUMNS)
+    self.longResultsTable = TableRowBuffer(*self.LONG_COLUMNS)
     self.hybridTempValues = dict()
     self.valveQuantificationLogic = slicer.modules.valvequantification.widgetRepresentation().self().logic
 
@@ -74,21 +76,21 @@ class QuantificationResultsExportRule(ValveBatchExportRule):
       if quantificationResultsTableNode:
         filename, file_extension = os.path.splitext(os.path.basename(sceneFileName))
         # long data table
-        self.addRowData(self.longResultsTableNode, filename, cardiacCyclePhaseName, "ValveType", measurementPresetId)
+        self.longResultsTable.addRow(filename, cardiacCyclePhaseName, "ValveType", measurementPresetId)
 
         # wide table
-        resultsTableRowIndex = \
-          self.addRowData(self.wideResultsTableNode, filename, cardiacCyclePhaseName, measurementPresetId)
+        resultsTableRowIndex = self.wideResultsTable.addRow(filename, cardiacCyclePhaseName, measurementPresetId)
 
         numberOfMetrics = quantificationResultsTableNode.GetNumberOfRows()
         for metricIndex in range(numberOfMetrics):
           metricName, metricValue, metricUnit = self.getColData(quantificationResultsTableNode, metricIndex, range(3))
+          metricValue = self.parseNumber(metricValue)
 
           # wide data table
-          self.setValueInTable(self.wideResultsTableNode, resultsTableRowIndex, metricName, metricValue)
+          self.wideResultsTable.setValue(resultsTableRowIndex, metricName, metricValue)
 
           # long data table
-          self.addRowData(self.longResultsTableNode, filename, cardiacCyclePhaseName, metricName, metricValue)
+          self.longResultsTable.addRow(filename, cardiacCyclePhaseName, metricName, metricValue)
 
           # hybrid data table
           if not metricName in list(self.hybridTempValues.keys()):
@@ -101,8 +103,8 @@ class QuantificationResultsExportRule(ValveBatchExportRule):
 
   def processEnd(self):
     self._writeUnitsTable()
-    self.writeTableNodeToCsv(self.wideResultsTableNode, self.WIDE_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
-    self.writeTableNodeToCsv(self.longResultsTableNode, self.LONG_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
+    self.writeRowBufferToCsv(self.wideResultsTable, self.WIDE_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
+    self.writeRowBufferToCsv(self.longResultsTable, self.LONG_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
 
     def getPhases():
       _phases = list()
@@ -113,21 +115,21 @@ class QuantificationResultsExportRule(ValveBatchExportRule):
 
     # hybrid data table
     phases = sorted(getPhases())
-    resultsHybridTableNode = self.createTableNode('Measurement', 'Filename', *phases)
+    resultsHybridTable = TableRowBuffer('Measurement', 'Filename', *phases)
 
     for metricName, filenames in self.hybridTempValues.items():
       for filename, values in filenames.items():
         phaseValues = [values[phase] if phase in values.keys() else "" for phase in phases]
-        self.addRowData(resultsHybridTableNode, metricName, filename, *phaseValues)
+        resultsHybridTable.addRow(metricName, filename, *phaseValues)
 
-    self.writeTableNodeToCsv(resultsHybridTableNode, self.HYBRID_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
+    self.writeRowBufferToCsv(resultsHybridTable, self.HYBRID_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
 
   def _writeUnitsTable(self):
-    unitsTableNode = self.createTableNode(*self.UNIT_COLUMNS)
+    unitsTable = TableRowBuffer(*self.UNIT_COLUMNS)
     # iterate over units dict
     for metricName, metricUnit in self.unitsDictionary.items():
-      self.addRowData(unitsTableNode, metricName, metricUnit)
-    self.writeTableNodeToCsv(unitsTableNode, self.UNITS_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
+      unitsTable.addRow(metricName, metricUnit)
+    self.writeRowBufferToCsv(unitsTable, self.UNITS_CSV_OUTPUT_FILENAME, useStringDelimiter=True)
 
   def mergeTables(self, inputDirectories, outputDirectory):
     unitCSVs = self.findCorrespondingFilesInDirectories(inputDirectories, self.UNITS_CSV_OUTPUT_FILENAME)
@@ -1,5 +1,5 @@
 import os
-from .base import ValveBatchExportRule
+from .base import ValveBatchExportRule, TableRowBuffer
 
 
 class ValveLandmarkCoordinatesExportRule(ValveBatchExportRule):
@@ -15,9 +15,11 @@ class ValveLandmarkCoordinatesExportRule(ValveBatchExportRule):
   ]
 
   CMD_FLAG = "-lc"
+  # 2: coordinates written as unquoted rounded numbers from a row buffer
+  VERSION = 2
 
   def processStart(self):
-    self.resultsTableNode = self.createTableNode(*self.COLUMNS)
+    self.resultsTable = TableRowBuffer(*self.COLUMNS)
 
   def processScene(self, sceneFileName):
     for valveModel in self.getHeartValveModelNodes():
@@ -31,11 +33,11 @@ class ValveLandmarkCoordinatesExportRule(ValveBatchExportRule):
         markupLabel = valveModel.getAnnulusLabelsMarkupNode().GetNthFiducialLabel(markupIndex)
         pos = [0.0, 0.0, 0.0]
         valveModel.getAnnulusLabelsMarkupNode().GetNthFiducialPosition(markupIndex, pos)
-        self.addRowData(self.resultsTableNode, filename, cardiacCyclePhaseName, str(frameNumber), valveType, markupLabel,
-                        *[f'{p:.2f}' for p in pos])
+        self.resultsTable.addRow(filename, cardiacCyclePhaseName, frameNumber, valveType, markupLabel,
+                                 *[round(p, 2) for p in pos])
 
   def processEnd(self):
-    self.writeTableNodeToCsv(self.resultsTableNode, self.CSV_OUTPUT_FILENAME)
+    self.writeRowBufferToCsv(self.resultsTable, self.CSV_OUTPUT_FILENAME)
 
   def mergeTables(self, inputDirectories, outputDirectory):
     from pathlib import Path
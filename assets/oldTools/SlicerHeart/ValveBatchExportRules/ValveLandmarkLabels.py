@@ -100,23 +100,23 @@ class ValveLandmarkLabelsExportRule(ValveBatchExportRule):
           if pos is None:
             continue
           labelNode = getLabelFromLandmarkPositions(lm, [pos], valveModel)
-          slicer.util.saveNode(labelNode,
-                               os.path.join(self.outputDir, f"{valveModelName}_landmark_{lm}.{fileExtension}"))
+          self.saveNode(labelNode,
+                        os.path.join(self.outputDir, f"{valveModelName}_landmark_{lm}.{fileExtension}"))
       else:
         if self.EXPORT_QUADRANT_LANDMARKS:
           positions = valveModel.getAnnulusMarkupPositionsByLabels(VALVE_QUADRANT_LANDMARKS[valveType])
           positions = list(filter(lambda pos: pos is not None, positions))
           if positions:
             labelNode = getLabelFromLandmarkPositions("quadrant_landmarks", positions, valveModel)
-            slicer.util.saveNode(labelNode, os.path.join(self.outputDir,
-                                                         f"{valveModelName}_quadrant_landmarks.{fileExtension}"))
+            self.saveNode(labelNode, os.path.join(self.outputDir,
+                                                  f"{valveModelName}_quadrant_landmarks.{fileExtension}"))
         if self.EXPORT_COMMISSURAL_LANDMARKS:
           positions = valveModel.getAnnulusMarkupPositionsByLabels(VALVE_COMMISSURAL_LANDMARKS[valveType])
           positions = list(filter(lambda pos: pos is not None, positions))
           if positions:
             labelNode = getLabelFromLandmarkPositions("commissural_landmarks", positions, valveModel)
-            slicer.util.saveNode(labelNode, os.path.join(self.outputDir,
-                                                         f"{valveModelName}_commissural_landmarks.{fileExtension}"))
+            self.saveNode(labelNode, os.path.join(self.outputDir,
+                                                  f"{valveModelName}_commissural_landmarks.{fileExtension}"))
 
 
 def getLabelFromLandmarkPositions(name, positions, valveModel):
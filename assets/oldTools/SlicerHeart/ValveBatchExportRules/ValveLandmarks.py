@@ -19,4 +19,4 @@ class ValveLandmarksExportRule(ValveBatchExportRule):
       valveType = valveModel.heartValveNode.GetAttribute('ValveType')
       cardiacCyclePhaseName = valveModel.cardiacCyclePhasePresets[valveModel.getCardiacCyclePhase()]["shortname"]
       valveModelName = self.generateValveModelName(filename, valveType, cardiacCyclePhaseName, frameNumber, "landmarks")
-      slicer.util.saveNode(annulusMarkupNode, str(Path(self.outputDir) / f"{valveModelName}.fcsv"))
\ No newline at end of file
+      self.saveNode(annulusMarkupNode, str(Path(self.outputDir) / f"{valveModelName}.fcsv"))
\ No newline at end of file
@@ -1,4 +1,4 @@
-from .base import ValveBatchExportPlugin, ValveBatchExportRule
+from .base import ValveBatchExportPlugin, ValveBatchExportRule, TableRowBuffer
 from .QuantificationResults import *
 from .PapillaryAnalysisResults import *
 from .AnnulusContourCoordinates import *
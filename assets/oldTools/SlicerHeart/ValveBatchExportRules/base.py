@@ -1,9 +1,13 @@
 import os
+import csv
+import contextlib
+import hashlib
 import qt
 import vtk
 import logging
 import slicer
-from HeartValveLib.helpers import getAllHeartValveModelNodes, getSpecificHeartValveModelNodes
+from HeartValveLib.helpers import getAllHeartValveModelNodes, getSpecificHeartValveModelNodes, getValvePhaseShortName
+from pathlib import Path
 from typing import Union
 
 
@@ -66,10 +70,16 @@ class ValveBatchExportRule(object):
 
   EXPORT_PHASES = [] # empty means all phases will be exported
   OUTPUT_CSV_FILES = []
+  # If enabled then merged tables are written in compressed columnar format (.parquet) as well
+  WRITE_COLUMNAR_TABLES = False
 
   CMD_FLAG = None  # Necessary when running export via python script
   OTHER_FLAGS = []  # changed at runtime for additional options
 
+  # Increase when the exported data changes, so that incremental exports (see ValveBatchExportManifest)
+  # export the cases again that were exported with a previous version of the rule
+  VERSION = 1
+
   @classmethod
   def getAssociatedFrameNumber(cls, valveModel):
     frameNumber = valveModel.getValveVolumeSequenceIndex()
@@ -82,6 +92,14 @@ class ValveBatchExportRule(object):
     return self.generateUniqueName("_".join(filter(lambda c: c != "",
                                                    [filename, valveType, frame, cardiacCyclePhaseName, suffix])))
 
+  @staticmethod
+  def parseNumber(text):
+    """Number represented by the text, the text itself if it is not a number"""
+    try:
+      return float(text)
+    except ValueError:
+      return text
+
   @staticmethod
   def addRowData(tableNode, *args):
     rowIndex = tableNode.AddEmptyRow()
@@ -105,6 +123,11 @@ class ValveBatchExportRule(object):
     logging.debug("Phases to export set to: %s" % phases)
     cls.EXPORT_PHASES = phases
 
+  @classmethod
+  def setWriteColumnarTables(cls, enabled):
+    logging.debug("Write columnar tables set to: %s" % enabled)
+    cls.WRITE_COLUMNAR_TABLES = enabled
+
   @staticmethod
   def getTableNode(measurementNode, identifier):
     shNode = slicer.vtkMRMLSubjectHierarchyNode.GetSubjectHierarchyNode(slicer.mrmlScene)
@@ -142,19 +165,16 @@ class ValveBatchExportRule(object):
     return files
 
   @classmethod
-  def concatCSVsAndSave(cls, inputCSVs, outFile, removeDuplicateRows=False):
-    import pandas as pd
-
-    dfs = cls.loadCSVs(inputCSVs)
-    if len(dfs) == 0:
+  def concatCSVsAndSave(cls, inputCSVs, outFile, removeDuplicateRows=False, columnTypes=None):
+    """Merge CSV files into outFile (see StreamingTableMerger).
+    If WRITE_COLUMNAR_TABLES is enabled then a .parquet file is written next to outFile as well.
+    :param columnTypes: dictionary of column name: type ("string", "int64" or "float64"). If specified then
+      all input tables must contain exactly these columns.
+    """
+    if len(inputCSVs) == 0:
       raise ValueError("No CSV files found for merging")
-    if len(dfs) > 1:
-      df = pd.concat(dfs)
-      if removeDuplicateRows:
-        df = df.drop_duplicates()
-    else:
-      df = dfs[0]
-    cls.saveCSV(df, outFile)
+    columnarFile = Path(outFile).with_suffix(".parquet") if cls.WRITE_COLUMNAR_TABLES else None
+    StreamingTableMerger(inputCSVs, removeDuplicateRows, columnTypes).merge(outFile, columnarFile)
 
   @staticmethod
   def loadCSVs(inputCSVs: list) -> list:
@@ -169,6 +189,7 @@ class ValveBatchExportRule(object):
     self.logCallback = None
     self.outputDir = None
     self.usedNames = set()
+    self.profiler = None  # set by ValveBatchExportLogic if profiling is enabled (see ExportProfiler)
 
   @classmethod
   def setupUI(cls, layout):
@@ -176,9 +197,19 @@ class ValveBatchExportRule(object):
 
   def getHeartValveModelNodes(self):
     if self.EXPORT_PHASES:
-      return getSpecificHeartValveModelNodes(self.EXPORT_PHASES)
+      valveModels = getSpecificHeartValveModelNodes(self.EXPORT_PHASES)
     else:
-      return getAllHeartValveModelNodes()
+      valveModels = getAllHeartValveModelNodes()
+    if self.profiler is None:
+      return valveModels
+    # processing of each valve model is measured as part of its phase
+    return self.profiler.measureIterations(valveModels, getValvePhaseShortName)
+
+  def measure(self, step, fileName=None):
+    """Context manager that measures a step of the rule if profiling is enabled"""
+    if self.profiler is None:
+      return contextlib.nullcontext()
+    return self.profiler.measure(step, rule=type(self).__name__, fileName=fileName)
 
   def addLog(self, text):
     logging.info(text)
@@ -211,9 +242,27 @@ class ValveBatchExportRule(object):
     writer.SetInputData(tableNode.GetTable())
     writer.SetFieldDelimiter(",")
     writer.SetUseStringDelimiter(useStringDelimiter)
-    if not writer.Write():
+    with self.measure("write", fileName=filename):
+      success = writer.Write()
+    if not success:
       raise Exception('Failed to write file: ' + filepath)
 
+  def writeRowBufferToCsv(self, rowBuffer, filename, useStringDelimiter=False):
+    """
+    Write table row buffer to CSV file
+    :param rowBuffer: TableRowBuffer
+    :param filename:
+    :param useStringDelimiter: if True then quotes will be placed around each non-numeric value
+    """
+    filepath = os.path.join(self.outputDir, filename)
+    with self.measure("write", fileName=filename):
+      rowBuffer.writeCsv(filepath, useStringDelimiter)
+
+  def saveNode(self, node, filepath):
+    """Save node to file using slicer.util.saveNode"""
+    with self.measure("write", fileName=os.path.basename(filepath)):
+      return slicer.util.saveNode(node, filepath)
+
   def mergeTables(self, inputDirectories: list, outputDirectory: str):
     """ takes input directories and looks for specific file(s) defined per class
     """
@@ -236,6 +285,226 @@ class ValveBatchExportRule(object):
     pass
 
 
+class TableRowBuffer(object):
+  """Table that collects rows in Python lists, for creating a table node or CSV file from them at once.
+
+  Much faster than filling a vtkMRMLTableNode cell by cell with SetCellText. Values keep their Python type:
+  columns that contain only numbers become numeric arrays in table nodes and are not quoted in CSV files.
+  Columns can be added after rows were added, cells without value are empty.
+  """
+
+  def __init__(self, *columns):
+    self.columns = []
+    self.columnValues = dict()  # column name: list of values
+    self.numberOfRows = 0
+    for column in columns:
+      self.addColumn(column)
+
+  def addColumn(self, name):
+    """Add a column if it does not exist yet, returns the list of values of the column"""
+    if name not in self.columnValues:
+      self.columns.append(name)
+      self.columnValues[name] = [""] * self.numberOfRows
+    return self.columnValues[name]
+
+  def addRow(self, *values):
+    """Add a row with the values of the first columns, returns the index of the new row"""
+    if len(values) > len(self.columns):
+      raise ValueError(f"Row has {len(values)} values but the table has only {len(self.columns)} columns")
+    for columnIndex, column in enumerate(self.columns):
+      self.columnValues[column].append(values[columnIndex] if columnIndex < len(values) else "")
+    self.numberOfRows += 1
+    return self.numberOfRows - 1
+
+  def setValue(self, rowIndex, columnName, value):
+    """Set the value of a cell, the column is added if it does not exist yet"""
+    self.addColumn(columnName)[rowIndex] = value
+
+  def getRows(self):
+    return zip(*[self.columnValues[column] for column in self.columns])
+
+  def isNumericColumn(self, name):
+    values = self.columnValues[name]
+    return bool(values) and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+
+  def writeCsv(self, filepath, useStringDelimiter=False):
+    """Write the table to a CSV file. If useStringDelimiter is True then quotes are placed around each
+    non-numeric value (as vtkDelimitedTextWriter does for string columns)."""
+    with open(filepath, "w", newline="") as f:
+      writer = csv.writer(f, lineterminator="\n",
+                          quoting=csv.QUOTE_NONNUMERIC if useStringDelimiter else csv.QUOTE_MINIMAL)
+      writer.writerow(self.columns)
+      writer.writerows(self.getRows())
+
+  def createTableNode(self):
+    """Table node with vtkDoubleArray for numeric columns and vtkStringArray for other columns"""
+    import numpy as np
+    from vtk.util.numpy_support import numpy_to_vtk
+    tableNode = slicer.vtkMRMLTableNode()
+    table = tableNode.GetTable()
+    for column in self.columns:
+      values = self.columnValues[column]
+      if self.isNumericColumn(column):
+        array = numpy_to_vtk(np.array(values, dtype=np.float64), deep=True)
+      else:
+        array = vtk.vtkStringArray()
+        array.SetNumberOfValues(len(values))
+        for rowIndex, value in enumerate(values):
+          array.SetValue(rowIndex, str(value))
+      array.SetName(column)
+      table.AddColumn(array)
+    return tableNode
+
+
+class StreamingTableMerger(object):
+  """Concatenates CSV tables into one file, reading the input tables one row at a time.
+
+  Columns of the merged table are the union of the input table columns, in order of first occurrence. Cells of
+  columns missing from an input table are left empty and values are copied without parsing and formatting.
+  Duplicate rows are found using a set of row digests, so memory usage does not grow with the table sizes.
+
+  Optionally a Parquet file with typed columns is written as well. Column types are taken from columnTypes or,
+  if not specified, detected from the values in an additional pass over the input files.
+  """
+
+  COLUMN_TYPES = ["string", "int64", "float64"]
+  # Number of rows written to the columnar file at once
+  ROW_GROUP_SIZE = 65536
+
+  def __init__(self, inputFiles, removeDuplicateRows=False, columnTypes=None):
+    self.inputFiles = [str(inputFile) for inputFile in inputFiles]
+    self.removeDuplicateRows = removeDuplicateRows
+    self.columnTypes = dict(columnTypes) if columnTypes else None
+    if self.columnTypes and not set(self.columnTypes.values()).issubset(self.COLUMN_TYPES):
+      raise ValueError(f"Column types must be one of {self.COLUMN_TYPES}")
+
+  @staticmethod
+  def readRows(inputFile):
+    with open(inputFile, "r", newline="") as f:
+      yield from csv.reader(f)
+
+  def readHeader(self, inputFile):
+    return next(self.readRows(inputFile), [])
+
+  def getColumns(self):
+    """Merged column names. Raises ValueError if the inputs do not match columnTypes."""
+    columns = dict()
+    for inputFile in self.inputFiles:
+      header = self.readHeader(inputFile)
+      if self.columnTypes and set(header) != set(self.columnTypes):
+        raise ValueError(f"Columns of {inputFile} do not match the expected columns {list(self.columnTypes)}")
+      columns.update((column, None) for column in header if column not in columns)
+    return list(columns)
+
+  def getAlignedRows(self, inputFile, columns):
+    """Rows of the input file with values in the order of the merged columns"""
+    rows = self.readRows(inputFile)
+    header = next(rows, [])
+    columnIndices = [header.index(column) if column in header else None for column in columns]
+    for row in rows:
+      if not row:
+        continue
+      yield [row[index] if index is not None and index < len(row) else "" for index in columnIndices]
+
+  def detectColumnTypes(self, columns):
+    """Type of each column: as specified in columnTypes or, if not specified, the most specific type that can
+    represent all non-empty values of the column (int64, then float64, then string)."""
+    if self.columnTypes:
+      return {column: self.columnTypes[column] for column in columns}
+    columnTypes = dict.fromkeys(columns)  # None until a value is found in the column
+    for inputFile in self.inputFiles:
+      for row in self.getAlignedRows(inputFile, columns):
+        for column, value in zip(columns, row):
+          if not value:
+            continue
+          columnType = columnTypes[column] or "int64"
+          while columnType != "string" and self.convertValue(value, columnType) is None:
+            columnType = "float64" if columnType == "int64" else "string"
+          columnTypes[column] = columnType
+    return {column: columnType or "string" for column, columnType in columnTypes.items()}
+
+  @staticmethod
+  def convertValue(value, columnType):
+    """Value converted to the column type, None if not possible"""
+    try:
+      if columnType == "int64":
+        return int(value)
+      if columnType == "float64":
+        return float(value)
+    except ValueError:
+      return None
+    return value
+
+  def openColumnarWriter(self, columnarFile, columnTypes):
+    try:
+      import pyarrow
+    except ImportError:
+      logging.warning(f"Writing columnar tables requires python package 'pyarrow'. Installing ...")
+      slicer.util.pip_install("pyarrow")
+      import pyarrow
+    import pyarrow.parquet
+    schema = pyarrow.schema([(column, getattr(pyarrow, columnType)()) for column, columnType in columnTypes.items()])
+    return pyarrow.parquet.ParquetWriter(str(columnarFile), schema, compression="zstd")
+
+  def writeRowGroup(self, columnarWriter, columnTypes, rowGroup, inputFile):
+    import pyarrow
+    columnValues = []
+    for columnIndex, (column, columnType) in enumerate(columnTypes.items()):
+      values = []
+      for row in rowGroup:
+        value = row[columnIndex]
+        convertedValue = self.convertValue(value, columnType) if value else None
+        if value and convertedValue is None:
+          raise ValueError(f"Value '{value}' of column '{column}' in {inputFile} is not {columnType}")
+        values.append(convertedValue)
+      columnValues.append(pyarrow.array(values, type=columnarWriter.schema.field(column).type))
+    columnarWriter.write_table(pyarrow.Table.from_arrays(columnValues, schema=columnarWriter.schema))
+
+  def merge(self, outFile, columnarFile=None):
+    """Write the merged table to outFile (CSV) and, if specified, columnarFile (Parquet).
+    Files are written under a temporary name first, so outFile may be one of the input files.
+    """
+    columns = self.getColumns()
+    columnTypes = self.detectColumnTypes(columns) if columnarFile else None
+    partialOutFile = Path(f"{outFile}.partial")
+    partialColumnarFile = Path(f"{columnarFile}.partial") if columnarFile else None
+    rowDigests = set()
+    columnarWriter = None
+    try:
+      with open(partialOutFile, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        if columnarFile:
+          columnarWriter = self.openColumnarWriter(partialColumnarFile, columnTypes)
+        for inputFile in self.inputFiles:
+          rowGroup = []
+          for row in self.getAlignedRows(inputFile, columns):
+            if self.removeDuplicateRows:
+              rowDigest = hashlib.blake2b("\0".join(row).encode(), digest_size=16).digest()
+              if rowDigest in rowDigests:
+                continue
+              rowDigests.add(rowDigest)
+            writer.writerow(row)
+            if columnarWriter:
+              rowGroup.append(row)
+              if len(rowGroup) >= self.ROW_GROUP_SIZE:
+                self.writeRowGroup(columnarWriter, columnTypes, rowGroup, inputFile)
+                rowGroup = []
+          if columnarWriter and rowGroup:
+            self.writeRowGroup(columnarWriter, columnTypes, rowGroup, inputFile)
+      if columnarWriter:
+        columnarWriter.close()
+        columnarWriter = None
+        partialColumnarFile.replace(columnarFile)
+      partialOutFile.replace(outFile)
+    finally:
+      if columnarWriter:
+        columnarWriter.close()
+      for partialFile in [partialOutFile, partialColumnarFile]:
+        if partialFile and partialFile.exists():
+          partialFile.unlink()
+
+
 def getNewSegmentationNode(masterVolumeNode):
   segmentationNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLSegmentationNode')
   segmentationNode.CreateDefaultDisplayNodes()
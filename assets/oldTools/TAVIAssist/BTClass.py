@@ -1,5 +1,10 @@
+import socket
+
 import bluetooth
 
+import BTRecorder
+import BTStream
+
 
 
 class BTClass(object):
@@ -7,6 +12,10 @@ class BTClass(object):
         self.currentDevice=None
         self.listDevices=None
         self.sock=None
+        # background reader filling the ring buffer, GUI only reads self.buffer
+        self.buffer=BTStream.AngleRingBuffer()
+        self.reader=None
+        self.recorder=None
 
     # Search Devices and return list
     def searchDevices(self,addr,uuid):
@@ -49,6 +58,7 @@ class BTClass(object):
 
             print(f"Connected successfully on port {port}")
             self.currentDevice = self.sock
+            self.startStreaming()
             return self.currentDevice
 
         except bluetooth.BluetoothError as e:
@@ -58,33 +68,66 @@ class BTClass(object):
             print(f"Unexpected error: {e}")
             return None
 
-    #get connected Device by sock.recv. if data is nulled nothing is connected so make current Device nulled
-    def getConnectedDevice(self):
+    # Connect to a TCP stand-in device (BTStream.LoopbackTracker or a replayer) instead of Bluetooth
+    def connectLoopback(self, host="127.0.0.1", port=5005):
         try:
-            data=self.sock.recv(1024)
-            if len(data)==0:
-                self.currentDevice=None
-                return None
-            else:
-                self.currentDevice=self.sock
-                return self.currentDevice
-        except:
+            self.sock = socket.create_connection((host, port))
+        except OSError as e:
+            print(f"Loopback Error: {e}")
             return None
-    # Get Data in Bytes
+        self.currentDevice = self.sock
+        self.startStreaming()
+        return self.currentDevice
+
+    # Start / stop the background reader on the connected socket
+    def startStreaming(self):
+        self.stopStreaming()
+        on_bytes = self.recorder.write if self.recorder else None
+        self.reader = BTStream.TrackerReader(self.sock, self.buffer, on_bytes=on_bytes)
+        self.reader.start()
+        return self.reader
+
+    def stopStreaming(self):
+        if self.reader:
+            self.reader.stop()
+            self.reader.join(timeout=1)
+            self.reader = None
+
+    # Record the raw tracker stream to a BTRecorder log, replay it with BTRecorder.TrackerReplayer
+    def startRecording(self, path):
+        self.stopRecording()
+        self.recorder = BTRecorder.TrackerRecorder(path)
+        if self.reader:
+            self.reader.on_bytes = self.recorder.write
+        return self.recorder
+
+    def stopRecording(self):
+        if self.reader:
+            self.reader.on_bytes = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    #connected as long as the reader thread still receives data
+    def getConnectedDevice(self):
+        if self.reader and self.reader.connected:
+            self.currentDevice=self.sock
+            return self.currentDevice
+        self.currentDevice=None
+        return None
+    # Get Data in Bytes, only while not streaming (the reader owns the socket)
     def recvBTdata_raw(self):
         return self.sock.recv(1024)
-    # Get Data in SPlitted Form to plot on graph
-
-    def recvBTdata_splitted(self):
-        data=self.sock.recv(1024)
-        if data:
-            # print("received [%s]" % data)
-            BTdata = data.decode("utf-8")
-            bt_data = BTdata.split('|')
-            bt_data = bt_data[1].split(",")
-            if len(bt_data)>2:
-                return bt_data;
-            else:
-                return None
+    # Get latest sample [index, RAO/LAO, CRAN/CAUD] from the ring buffer to plot on graph,
+    # None if no sample arrived (waits up to `timeout` seconds for the first one)
+    def recvBTdata_splitted(self, timeout=None):
+        sample = self.buffer.latest(timeout)
+        if sample is None:
+            return None
+        return sample[1].tolist()
+
+    # Samples of the last `seconds`, (times, values) arrays oldest first
+    def recvBTdata_window(self, seconds):
+        return self.buffer.window(seconds)
 # initial BTCLass so can be accessed from all files
-myBT = BTClass()
\ No newline at end of file
+myBT = BTClass()
@@ -0,0 +1,115 @@
+import struct
+import threading
+import time
+
+import numpy as np
+
+import BTStream
+
+
+# -------------------------------------------------------
+# Record and replay raw NaviCath tracker byte streams
+#
+# Log format (little endian):
+#   header  b"NCTRLOG1"
+#   records (float64 seconds since recording start, uint32 length, <length> raw bytes)
+# Raw chunks are stored exactly as received, so replaying a log exercises the same
+# framing and parsing as the live tracker.
+
+MAGIC = b"NCTRLOG1"
+RECORD = struct.Struct("<dI")
+
+
+# -------------------------------------------------------
+# Use as TrackerReader.on_bytes callback: BTClass.myBT.startRecording(path) does this
+class TrackerRecorder(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start = None
+        self.chunks = 0
+        self.lock = threading.Lock()
+
+    def write(self, t, data):
+        with self.lock:
+            if self.file is None:
+                return
+            if self.start is None:
+                self.start = t
+            self.file.write(RECORD.pack(t - self.start, len(data)))
+            self.file.write(data)
+            self.chunks += 1
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+# log -> list of (seconds, bytes)
+def read_log(path):
+    records = []
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a tracker log")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            t, length = RECORD.unpack(head)
+            records.append((t, f.read(length)))
+    return records
+
+
+# Synthetic log of `seconds` at `rate` Hz, one "|index,LR,CC|" record per chunk (e.g. 200 Hz stress input)
+def write_synthetic_log(path, seconds=10.0, rate=200.0):
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    lr = np.round(30 * np.sin(t / 4)).astype(int)
+    cc = np.round(20 * np.cos(t / 4)).astype(int)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for i in range(n):
+            data = ("|%d,%d,%d|" % (i, lr[i], cc[i])).encode("utf-8")
+            f.write(RECORD.pack(t[i], len(data)))
+            f.write(data)
+    return n
+
+
+# -------------------------------------------------------
+# Serves a recorded log on a local TCP port, connect with BTClass.myBT.connectLoopback(*replayer.address).
+# speed: 1 = real time, N = N times faster, None or 0 = as fast as possible
+class TrackerReplayer(BTStream.LoopbackTracker):
+
+    def __init__(self, path, speed=1.0, host="127.0.0.1", port=0):
+        BTStream.LoopbackTracker.__init__(self, host, port)
+        self.name = "TrackerReplayer"
+        self.records = read_log(path)
+        self.speed = speed
+        self.sent = 0
+        self.finished = threading.Event()
+
+    def run(self):
+        try:
+            conn, _ = self.server.accept()
+        except OSError:
+            self.finished.set()
+            return
+        with conn:
+            start = time.monotonic()
+            for t, data in self.records:
+                if self._stop_event.is_set():
+                    break
+                if self.speed:
+                    delay = start + t / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    break
+                self.sent += 1
+        self.finished.set()
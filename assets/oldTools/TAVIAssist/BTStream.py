@@ -0,0 +1,213 @@
+import select
+import socket
+import threading
+import time
+
+import numpy as np
+
+
+# -------------------------------------------------------
+# Non blocking NaviCath tracker ingestion
+#
+# The tracker sends records separated by '|', each record is comma separated
+# (index, RAO/LAO, CRAN/CAUD, ...). A TrackerReader thread owns the socket, frames the
+# byte stream (records split over several recv calls or several records in one recv are
+# both handled) and pushes timestamped samples into an AngleRingBuffer. GUI code only
+# reads the ring buffer and never touches the socket.
+
+FIELDS = 3  # index, RAO/LAO, CRAN/CAUD
+
+
+# -------------------------------------------------------
+# Fixed size ring buffer of (time, values) samples, safe to use from reader and GUI threads
+class AngleRingBuffer(object):
+
+    def __init__(self, capacity=4096, fields=FIELDS):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=float)
+        self.values = np.zeros((capacity, fields), dtype=float)
+        self.count = 0  # total samples pushed since start
+        self.lock = threading.Condition()
+
+    def push(self, t, values):
+        with self.lock:
+            i = self.count % self.capacity
+            self.times[i] = t
+            self.values[i] = values
+            self.count += 1
+            self.lock.notify_all()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # latest (time, values) or None if nothing was received yet,
+    # waits up to `timeout` seconds for the first sample when the buffer is empty
+    def latest(self, timeout=None):
+        with self.lock:
+            if self.count == 0 and timeout:
+                self.lock.wait_for(lambda: self.count > 0, timeout)
+            if self.count == 0:
+                return None
+            i = (self.count - 1) % self.capacity
+            return self.times[i], self.values[i].copy()
+
+    # last n samples (or all kept), oldest first -> (times (m,), values (m, fields))
+    def history(self, n=None):
+        with self.lock:
+            size = min(self.count, self.capacity)
+            if n is not None:
+                size = min(size, n)
+            idx = (np.arange(self.count - size, self.count)) % self.capacity
+            return self.times[idx], self.values[idx]
+
+    # samples received within the last `seconds` before `now` (default: latest sample time)
+    def window(self, seconds, now=None):
+        times, values = self.history()
+        if len(times) == 0:
+            return times, values
+        if now is None:
+            now = times[-1]
+        keep = times >= now - seconds
+        return times[keep], values[keep]
+
+
+# -------------------------------------------------------
+# Split '|' delimited records out of a byte stream, keeping incomplete tails between calls
+class RecordFramer(object):
+
+    def __init__(self, delimiter=b"|"):
+        self.delimiter = delimiter
+        self.pending = b""
+
+    # returns list of complete records (bytes), empty records are skipped
+    def feed(self, data):
+        self.pending += data
+        parts = self.pending.split(self.delimiter)
+        self.pending = parts.pop()
+        return [p for p in parts if p.strip()]
+
+
+# record b"0,23,-15" -> array of FIELDS floats, None if it is not a valid angle record
+def parse_record(record, fields=FIELDS):
+    try:
+        items = record.decode("utf-8").strip().split(",")
+    except UnicodeDecodeError:
+        return None
+    if len(items) < fields:
+        return None
+    try:
+        return np.array([float(v) for v in items[:fields]])
+    except ValueError:
+        return None
+
+
+# -------------------------------------------------------
+# Background reader thread: socket -> framer -> ring buffer
+# on_bytes(t, data) is called for every raw chunk (used by the recorder)
+class TrackerReader(threading.Thread):
+
+    def __init__(self, sock, buffer=None, on_bytes=None, on_sample=None, chunk_size=1024):
+        threading.Thread.__init__(self, name="TrackerReader", daemon=True)
+        self.sock = sock
+        self.buffer = buffer if buffer is not None else AngleRingBuffer()
+        self.on_bytes = on_bytes
+        self.on_sample = on_sample
+        self.chunk_size = chunk_size
+        self.framer = RecordFramer()
+        self.dropped = 0  # malformed records
+        self.connected = True
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def feed(self, t, data):
+        if self.on_bytes:
+            self.on_bytes(t, data)
+        for record in self.framer.feed(data):
+            values = parse_record(record)
+            if values is None:
+                self.dropped += 1
+                continue
+            self.buffer.push(t, values)
+            if self.on_sample:
+                self.on_sample(t, values)
+
+    # True when the socket has data (or was closed), False if nothing arrived within timeout.
+    # Polled with select instead of a socket timeout: a timed out PyBluez RFCOMM recv raises
+    # BluetoothError (an OSError), which cannot be told apart from a disconnect.
+    def wait_readable(self, timeout):
+        try:
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+        except (AttributeError, TypeError, ValueError):
+            # no usable fileno(), fall back to a blocking recv
+            return True
+        return bool(readable)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                # short poll interval so stop() is noticed even when the tracker is silent
+                if not self.wait_readable(0.5):
+                    continue
+                data = self.sock.recv(self.chunk_size)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                print(f"Tracker read error: {e}")
+                break
+            if not data:
+                break
+            self.feed(time.monotonic(), data)
+        self.connected = False
+
+
+# -------------------------------------------------------
+# Local TCP stand-in for the NaviCath tracker, sends "|index,LR,CC|" records at `rate` Hz.
+# angles(t) returns (LR, CC) for elapsed time t, default is a slow sweep.
+class LoopbackTracker(threading.Thread):
+
+    def __init__(self, host="127.0.0.1", port=0, rate=5.0, angles=None):
+        threading.Thread.__init__(self, name="LoopbackTracker", daemon=True)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(1)
+        self.address = self.server.getsockname()
+        self.rate = rate
+        self.angles = angles if angles else (lambda t: (round(30 * np.sin(t / 4)), round(20 * np.cos(t / 4))))
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self.server.close()
+
+    def run(self):
+        try:
+            conn, _ = self.server.accept()
+        except OSError:
+            return
+        start = time.monotonic()
+        index = 0
+        with conn:
+            while not self._stop_event.is_set():
+                lr, cc = self.angles(time.monotonic() - start)
+                try:
+                    conn.sendall(("|%d,%s,%s|" % (index, lr, cc)).encode("utf-8"))
+                except OSError:
+                    break
+                index += 1
+                time.sleep(1.0 / self.rate)
+
+
+if __name__ == "__main__":
+    tracker = LoopbackTracker(rate=50)
+    tracker.start()
+    sock = socket.create_connection(tracker.address)
+    reader = TrackerReader(sock)
+    reader.start()
+    for _ in range(5):
+        time.sleep(0.2)
+        print(reader.buffer.latest(), len(reader.buffer))
+    reader.stop()
+    tracker.stop()
@@ -10,6 +10,7 @@ from matplotlib.ticker import MultipleLocator, AutoMinorLocator
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
 import DB
+import ValueStorage
 import NAVICath
 import BTClass
 import BT_list
@@ -44,7 +45,10 @@ class Ui_ThreeDSDSCurve(object):
         self.canvas.draw()
 
     def get_current_pos(self, type):
-        self.bt_data = BTClass.myBT.recvBTdata_splitted()
+        self.bt_data = BTClass.myBT.recvBTdata_splitted(timeout=BT_list.CAPTURE_TIMEOUT)
+        if self.bt_data is None:
+            BT_list.showNoTrackerData()
+            return None
 
         if type == 1:
             self.LAO1, self.CRAN1 = round(int(self.bt_data[1])), round( int(self.bt_data[2]))
@@ -99,11 +103,9 @@ class Ui_ThreeDSDSCurve(object):
 
         self.data2 = NAVICath.get_s_curve_device(self.CRAN1, self.LAO1, self.CAUD2, self.RAO2)
         planes = [self.CRAN1, self.LAO1, self.CAUD2, self.RAO2]
-        planes = ",".join(map(str, planes))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/Device/Planes", planes)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/Device/Planes", planes)
 
         self.plot_device = self.ax.plot(range(-90, 90), self.data2, label="Evolut", color="blue")
         plt.legend(loc="upper left")
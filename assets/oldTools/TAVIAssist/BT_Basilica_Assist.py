@@ -10,6 +10,7 @@ from matplotlib.ticker import MultipleLocator, AutoMinorLocator
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
 import DB
+import ValueStorage
 import NAVICath
 import BTClass
 import BT_list
@@ -46,7 +47,10 @@ class Ui_BasilicaAssist(object):
         self.canvas.draw()
 
     def get_current_pos(self, type):
-        self.bt_data = BTClass.myBT.recvBTdata_splitted()
+        self.bt_data = BTClass.myBT.recvBTdata_splitted(timeout=BT_list.CAPTURE_TIMEOUT)
+        if self.bt_data is None:
+            BT_list.showNoTrackerData()
+            return None
 
         if type == 1:
             self.LAO1, self.CRAN1 = round(float(self.bt_data[1])), round( float(self.bt_data[2]))
@@ -91,32 +95,30 @@ class Ui_BasilicaAssist(object):
         # self.canvas.draw()
         # check DB for values
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "BPV/MDCT/Planes")
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "BPV/MDCT/Planes")
 
-        if (values):
-            AV_MDCT_Planes = values[len(values) - 1]
-            xCCV1, xRLV1, xCCV2, xRLV2 = AV_MDCT_Planes[3].split(",")
-            self.data = NAVICath.get_s_curve_device(float(xCCV1), float(xRLV1), float(xCCV2), float(xRLV2))
+        if values is not None:
+            xCCV1, xRLV1, xCCV2, xRLV2 = values
+            self.data = NAVICath.get_s_curve_device(xCCV1, xRLV1, xCCV2, xRLV2)
             self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="MDCT_Planes")
             self.ax.legend(loc="upper left")
             self.canvas.draw()
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "BPV/MDCT/Coordinates")
-        if (values):
-            AV_MDCT_Cordinates = values[len(values) - 1]
-            Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz = AV_MDCT_Cordinates[3].split(",")
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "BPV/MDCT/Coordinates")
+        if values is not None:
+            Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz = values
 
-            self.vxLCC.setText(Lx)
-            self.vyLCC.setText(Ly)
-            self.vzLCC.setText(Lz)
+            self.vxLCC.setText(str(Lx))
+            self.vyLCC.setText(str(Ly))
+            self.vzLCC.setText(str(Lz))
 
-            self.vxRCC.setText(Rx)
-            self.vyRCC.setText(Ry)
-            self.vzRCC.setText(Rz)
+            self.vxRCC.setText(str(Rx))
+            self.vyRCC.setText(str(Ry))
+            self.vzRCC.setText(str(Rz))
 
-            self.vxNCC.setText(Nx)
-            self.vyNCC.setText(Ny)
-            self.vzNCC.setText(Nz)
+            self.vxNCC.setText(str(Nx))
+            self.vyNCC.setText(str(Ny))
+            self.vzNCC.setText(str(Nz))
             self.Get_Scurve_XYZ()
 
 
@@ -151,11 +153,10 @@ class Ui_BasilicaAssist(object):
             # self.ax.legend(loc="upper left")
             # self.canvas.draw()
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "AV/MDCT/Enface")
-        if (values):
-            AV_MDCT_Enface = values[len(values) - 1]
-            y, z = AV_MDCT_Enface[3].split(",")
-            self.data = NAVICath.make_s_curve_array(float(y), float(z))
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "AV/MDCT/Enface")
+        if values is not None:
+            y, z = values
+            self.data = NAVICath.make_s_curve_array(y, z)
             self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="MDCT_Enface")
             self.ax.legend(loc="upper left")
             self.canvas.draw()
@@ -260,11 +261,9 @@ class Ui_BasilicaAssist(object):
         # Rz=1819.3
 
         cord = [Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz]
-        cordinates = ",".join(map(str, cord))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "BPV/MDCT/Coordinates", cordinates)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "BPV/MDCT/Coordinates", cord)
 
         self.RCC_A = NAVICath.COPV_RCC_A(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
         self.scat_bt_rf = self.ax.scatter(float(self.RCC_A[0]), float(self.RCC_A[1]), c="green", label="RCC Frontal")
@@ -279,6 +278,11 @@ class Ui_BasilicaAssist(object):
         #i have changed frontal view to 60 degree difference view
         SCurve = NAVICath.SCurve_XYZ(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
         self.LCC_P=NAVICath.find_front_view(self.RCC_A,SCurve)
+        if self.LCC_P is None:
+            # the side views are computed from the LCC frontal view
+            self.show_missing_views(["LCC Frontal", "LCC Side View", "RCC Side View"])
+            self.canvas.draw()
+            return
 
 
         self.scat_bt_lf = self.ax.scatter(round(float(self.LCC_P[0])), round(float(self.LCC_P[1])), c="pink", label="LCC Frontal")
@@ -289,16 +293,26 @@ class Ui_BasilicaAssist(object):
         self.sideview_right=NAVICath.find_side_view(self.LCC_P, self.RCC_A, "Right")
         self.sideview_left=NAVICath.find_side_view(self.LCC_P, self.RCC_A, "Left")
 
-        self.scat_bt_ls = self.ax.scatter(round(float(self.sideview_left[0])), round(float(self.sideview_left[1])), c="red",
-                                       label="LCC SIDE View")
-        self.ax.text(round(self.sideview_left[0]), round(self.sideview_left[1]),
-                     " LCC Side View: " + (
-                             str(round(float(self.sideview_left[0]))) + "," + str(round(float(self.sideview_left[1])))))
+        missing_views = []
+        if self.sideview_left is None:
+            missing_views.append("LCC Side View")
+        else:
+            self.scat_bt_ls = self.ax.scatter(round(float(self.sideview_left[0])), round(float(self.sideview_left[1])), c="red",
+                                           label="LCC SIDE View")
+            self.ax.text(round(self.sideview_left[0]), round(self.sideview_left[1]),
+                         " LCC Side View: " + (
+                                 str(round(float(self.sideview_left[0]))) + "," + str(round(float(self.sideview_left[1])))))
+
+        if self.sideview_right is None:
+            missing_views.append("RCC Side View")
+        else:
+            self.scat_bt_rs = self.ax.scatter(round(float(self.sideview_right[0])), round(float(self.sideview_right[1])), c="green",label="RCC Side View")
+            self.ax.text(round(self.sideview_right[0]), round(self.sideview_right[1]),
+                         " RCC Side View: " + (
+                                 str(round(float(self.sideview_right[0]))) + "," + str(round(float(self.sideview_right[1])))))
 
-        self.scat_bt_rs = self.ax.scatter(round(float(self.sideview_right[0])), round(float(self.sideview_right[1])), c="green",label="RCC Side View")
-        self.ax.text(round(self.sideview_right[0]), round(self.sideview_right[1]),
-                     " RCC Side View: " + (
-                             str(round(float(self.sideview_right[0]))) + "," + str(round(float(self.sideview_right[1])))))
+        if missing_views:
+            self.show_missing_views(missing_views)
 
 
 
@@ -310,6 +324,13 @@ class Ui_BasilicaAssist(object):
         #                          str(round(float(self.data[0]))) + "," + str(round(float(self.data[1])))))
         self.canvas.draw()
 
+    # NAVICath returns None when no view on the S curve matches, tell the user which views are not plotted
+    def show_missing_views(self, names):
+        Msgbox = QtWidgets.QMessageBox()
+        Msgbox.setIcon(QtWidgets.QMessageBox.Information)
+        Msgbox.setText("No matching view found for: " + ", ".join(names) + ".")
+        Msgbox.exec_()
+
     def scale_negatives(self,x, y, z):
         print(x,y,z)
 
@@ -357,11 +378,9 @@ class Ui_BasilicaAssist(object):
         # Rz = 1819.3
 
         cord = [Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz]
-        cordinates = ",".join(map(str, cord))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "BPV/MDCT/Coordinates", cordinates)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "BPV/MDCT/Coordinates", cord)
 
         self.data = NAVICath.SCurve_XYZ(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
 
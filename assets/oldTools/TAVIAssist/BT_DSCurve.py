@@ -9,6 +9,7 @@ import NAVICath
 import BTClass
 import BT_list
 import DB
+import ValueStorage
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
@@ -53,7 +54,10 @@ class Ui_BTDSCurve(object):
 
 
     def get_current_pos(self, type):
-        self.bt_data = BTClass.myBT.recvBTdata_splitted()
+        self.bt_data = BTClass.myBT.recvBTdata_splitted(timeout=BT_list.CAPTURE_TIMEOUT)
+        if self.bt_data is None:
+            BT_list.showNoTrackerData()
+            return None
 
         if type==1:
             self.LAO1,self.CRAN1=round(int(self.bt_data[1])), round( int(self.bt_data[2]))
@@ -65,11 +69,9 @@ class Ui_BTDSCurve(object):
             self.data2 = NAVICath.get_s_curve_device(self.CRAN1, self.LAO1, self.CAUD2, self.RAO2)
             self.plot_device = self.ax.plot(range(-90, 90), self.data2, label="Evolut")
             planes = [self.CRAN1, self.LAO1, self.CAUD2, self.RAO2]
-            planes = ",".join(map(str, planes))
 
             # save values to System
-            values = (DB.patientsDB.myExam, "AV/Device/Planes", planes)
-            DB.patientsDB.add_value(values)
+            ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/Device/Planes", planes)
 
             self.LAO1,self.RAO2,self.CAUD2,self.CRAN1=None,None,None,None
             self.ax.legend(loc="upper left")
@@ -101,30 +103,27 @@ class Ui_BTDSCurve(object):
         #check DB for values
 
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "AV/MDCT/Planes")
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "AV/MDCT/Planes")
 
-        if(values):
-            AV_MDCT_Planes=values[len(values) - 1]
-            xCCV1, xRLV1, xCCV2, xRLV2=AV_MDCT_Planes[3].split(",")
-            self.data = NAVICath.get_s_curve_device(int(xCCV1), int(xRLV1), int(xCCV2), int(xRLV2))
+        if values is not None:
+            xCCV1, xRLV1, xCCV2, xRLV2 = values
+            self.data = NAVICath.get_s_curve_device(xCCV1, xRLV1, xCCV2, xRLV2)
             self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="MDCT_Planes")
             self.ax.legend(loc="upper left")
             self.canvas.draw()
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "AV/MDCT/Coordinates")
-        if (values):
-            AV_MDCT_Cordinates=values[len(values) - 1]
-            Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz=AV_MDCT_Cordinates[3].split(",")
-            self.data = NAVICath.SCurve_XYZ(int(Lx),int(Ly),int(Lz),int(Rx),int(Ry),int(Rz),int(Nx),int(Ny),int(Nz))
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "AV/MDCT/Coordinates")
+        if values is not None:
+            Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz = values
+            self.data = NAVICath.SCurve_XYZ(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz)
             self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="MDCT_Cord")
             self.ax.legend(loc="upper left")
             self.canvas.draw()
 
-        values = DB.patientsDB.get_value_by_ValueType(DB.patientsDB.myExam, "AV/MDCT/Enface")
-        if (values):
-            AV_MDCT_Enface=values[len(values) - 1]
-            y,z=AV_MDCT_Enface[3].split(",")
-            self.data = NAVICath.make_s_curve_array(int(y), int(z))
+        values = ValueStorage.valueStore.GetValue(DB.patientsDB.myExam, "AV/MDCT/Enface")
+        if values is not None:
+            y,z = values
+            self.data = NAVICath.make_s_curve_array(y, z)
             self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="MDCT_Enface")
             self.ax.legend(loc="upper left")
             self.canvas.draw()
@@ -147,11 +146,9 @@ class Ui_BTDSCurve(object):
         self.data = NAVICath.get_s_curve_device(xCCV1, xRLV1, xCCV2, xRLV2)
 
         planes = [xCCV1, xRLV1, xCCV2, xRLV2]
-        planes = ",".join(map(str, planes))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/Device/Planes", planes)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/Device/Planes", planes)
 
         # self.data=NAVICath.make_s_curve_array(111,-37);
         self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="Device Plane")
@@ -41,7 +41,10 @@ class Ui_BTDSCurve(object):
         print("Animation Started")
 
     def get_current_pos(self, type):
-        self.bt_data = BTClass.myBT.recvBTdata_splitted()
+        self.bt_data = BTClass.myBT.recvBTdata_splitted(timeout=BT_list.CAPTURE_TIMEOUT)
+        if self.bt_data is None:
+            BT_list.showNoTrackerData()
+            return None
 
         if type==1:
             self.LAO1,self.CRAN1=round(int(self.bt_data[1])), round(-1 * int(self.bt_data[2]))
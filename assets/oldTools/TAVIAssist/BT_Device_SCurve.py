@@ -9,6 +9,7 @@ import NAVICath
 import BTClass
 import BT_list
 import DB
+import ValueStorage
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
@@ -53,7 +54,10 @@ class Ui_MainWindow(object):
 
 
     def get_current_pos(self, type):
-        self.bt_data = BTClass.myBT.recvBTdata_splitted()
+        self.bt_data = BTClass.myBT.recvBTdata_splitted(timeout=BT_list.CAPTURE_TIMEOUT)
+        if self.bt_data is None:
+            BT_list.showNoTrackerData()
+            return None
 
         if type==1:
             self.LAO1,self.CRAN1=round(int(self.bt_data[1])), round( int(self.bt_data[2]))
@@ -65,11 +69,9 @@ class Ui_MainWindow(object):
             self.data2 = NAVICath.get_s_curve_device(self.CRAN1, self.LAO1, self.CAUD2, self.RAO2)
 
             planes = [self.CRAN1, self.LAO1, self.CAUD2, self.RAO2]
-            planes = ",".join(map(str, planes))
 
             # save values to System
-            values = (DB.patientsDB.myExam, "AV/Device/Planes", planes)
-            DB.patientsDB.add_value(values)
+            ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/Device/Planes", planes)
 
             self.plot_device = self.ax.plot(range(-90, 90), self.data2, label="Evolut", color="blue")
             self.ax.legend(loc="upper left")
@@ -114,11 +116,9 @@ class Ui_MainWindow(object):
         self.data = NAVICath.get_s_curve_device(xCCV1, xRLV1, xCCV2, xRLV2)
 
         planes = [xCCV1, xRLV1, xCCV2, xRLV2]
-        planes = ",".join(map(str, planes))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/Device/Planes", planes)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/Device/Planes", planes)
         # self.data=NAVICath.make_s_curve_array(111,-37);
         self.plot_structure = self.ax.plot(range(-90, 90), self.data, label="Device Plane", color="red")
         self.ax.legend(loc="upper left")
@@ -3,6 +3,16 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 import BTClass
 import BT_SCurve
 
+# seconds a position capture waits for the first tracker sample
+CAPTURE_TIMEOUT = 1.0
+
+# shown when a position is captured but the tracker has not sent any data
+def showNoTrackerData():
+    Msgbox = QtWidgets.QMessageBox()
+    Msgbox.setIcon(QtWidgets.QMessageBox.Information)
+    Msgbox.setText("No data received from the NaviCath tracker. Check the connection and try again.")
+    Msgbox.exec_()
+
 class MyWindow(QtWidgets.QMainWindow):
     def closeEvent(self,event):
         print("BTList Window Closed")
@@ -0,0 +1,88 @@
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+import BTClass
+import BTRecorder
+
+
+# -------------------------------------------------------
+# End to end latency of the real time angle path, offline:
+# recorded (or synthetic) log -> TrackerReplayer -> BTClass reader thread -> ring buffer
+# -> update_plot style redraw -> canvas.draw_idle
+#
+# usage: python Benchmark_BTLatency.py [log file] [speed] [update interval s]
+# without a log a synthetic 200 Hz stream is used.
+
+
+def percentiles(values):
+    if len(values) == 0:
+        return "n/a"
+    p = np.percentile(np.asarray(values) * 1e3, [50, 95, 99, 100])
+    return "p50 %.2f  p95 %.2f  p99 %.2f  max %.2f ms" % tuple(p)
+
+
+def run(path=None, speed=1.0, interval=0.005, seconds=10.0, rate=200.0):
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.nctr")
+        BTRecorder.write_synthetic_log(path, seconds, rate)
+
+    replayer = BTRecorder.TrackerReplayer(path, speed)
+    replayer.start()
+    bt = BTClass.myBT
+    first = bt.buffer.count
+    if not bt.connectLoopback(*replayer.address):
+        return
+
+    # same drawing as the BT_* update_plot callbacks
+    figure = Figure()
+    canvas = FigureCanvas(figure)
+    ax = figure.add_subplot(111)
+    ax.set_xlim(-90, 90)
+    ax.set_ylim(-90, 90)
+    scat_bt = ax.scatter(0, 0, c="blue")
+    scat_bt_txt = ax.text(0, 0, "")
+
+    latencies = []
+    draw_times = []
+    last_t = None
+    while True:
+        done = replayer.finished.is_set() and not bt.getConnectedDevice()
+        sample = bt.buffer.latest()
+        if sample is not None and sample[0] != last_t:
+            last_t, bt_data = sample
+            start = time.monotonic()
+            scat_bt.remove()
+            scat_bt_txt.remove()
+            scat_bt_txt = ax.text(round(bt_data[1]), round(bt_data[2]), str(round(bt_data[1])) + "," + str(round(bt_data[2])))
+            scat_bt = ax.scatter(round(bt_data[1]), round(bt_data[2]), c="blue")
+            canvas.draw_idle()
+            end = time.monotonic()
+            draw_times.append(end - start)
+            latencies.append(end - last_t)
+        if done:
+            break
+        time.sleep(interval)
+
+    received = bt.buffer.count - first
+    dropped = bt.reader.dropped if bt.reader else 0
+    bt.stopStreaming()
+    replayer.stop()
+
+    print("Log:", path)
+    print("Chunks sent: %d  samples received: %d  malformed: %d" % (replayer.sent, received, dropped))
+    print("Redraws: %d (interval %.1f ms)" % (len(latencies), interval * 1e3))
+    print("Arrival -> draw_idle :", percentiles(latencies))
+    print("Redraw only          :", percentiles(draw_times))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(path=args[0] if len(args) > 0 else None,
+        speed=float(args[1]) if len(args) > 1 else 1.0,
+        interval=float(args[2]) if len(args) > 2 else 0.005)
@@ -0,0 +1,67 @@
+import time
+import numpy as np
+
+import NAVICath
+import EnfaceSolver
+
+
+# -------------------------------------------------------
+# Recorded projection pairs from the tracker, same order as get_s_curve_device
+# (CRAN/CAUD 1, RAO/LAO 1, CRAN/CAUD 2, RAO/LAO 2), integer degrees as sent by NaviCath
+RECORDED_PAIRS = [
+    (-14, 30, -34, -30),
+    (31, 30, 10, -30),
+    (-60, 30, -48, -30),
+    (59, 30, 64, -30),
+    (-73, 30, 0, -30),
+    (12, 30, -42, -30),
+    (-9, 30, -8, -30),
+    (-20, 20, 20, -20),
+    (-5, 40, -28, -20),
+    (18, 25, -10, -35),
+    (-38, 10, -22, -45),
+    (25, 45, 40, -15),
+]
+
+
+# -------------------------------------------------------
+def time_calls(func, pairs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for pair in pairs:
+            func(*pair)
+    return (time.perf_counter() - start) / (repeat * len(pairs))
+
+
+def run(repeat_new=200):
+    pairs = RECORDED_PAIRS
+
+    grid_time = time_calls(NAVICath.get_s_curve_device_grid, pairs, 1)
+    solver_time = time_calls(NAVICath.get_s_curve_device, pairs, repeat_new)
+    enface_time = time_calls(EnfaceSolver.solve_enface_pairs, pairs, repeat_new)
+
+    # whole session in one call
+    w, x, ww, xx = np.asarray(pairs, dtype=float).T
+    batch = np.tile(np.stack([w, x, ww, xx]), 1000)
+    start = time.perf_counter()
+    EnfaceSolver.solve_enface_pairs(*batch)
+    batch_time = (time.perf_counter() - start) / batch.shape[1]
+
+    # S curve agreement between the grid search and the closed form
+    max_dev = 0.0
+    for pair in pairs:
+        old = NAVICath.get_s_curve_device_grid(*pair)
+        new = NAVICath.get_s_curve_device(*pair)
+        max_dev = max(max_dev, float(np.nanmax(np.abs(old - new))))
+
+    print("Pairs:", len(pairs))
+    print("Grid search  get_s_curve_device_grid : %10.3f ms/call" % (grid_time * 1e3))
+    print("Closed form  get_s_curve_device      : %10.3f ms/call" % (solver_time * 1e3))
+    print("Closed form  solve_enface_pairs      : %10.3f ms/call" % (enface_time * 1e3))
+    print("Batched      solve_enface_pairs      : %10.3f us/pair (%d pairs)" % (batch_time * 1e6, batch.shape[1]))
+    print("Speedup (S curve per call)           : %10.1fx" % (grid_time / solver_time))
+    print("Max S curve deviation grid vs solver : %10.2f deg" % max_dev)
+
+
+if __name__ == "__main__":
+    run()
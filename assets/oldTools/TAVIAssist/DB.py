@@ -1,17 +1,27 @@
 # All Database Logic Here
 #
+# One persistent connection in WAL mode. Every query is parameterized, so sqlite3 keeps
+# the compiled statements in its statement cache and values never need quoting.
 
 
 import sqlite3
 from datetime import datetime
 
 
+# columns that may be used as identifiers in search_patient / update_exams
+PATIENT_SEARCH_FIELDS = ("id", "Name", "Age", "Gender", "MRNo", "DoA")
+EXAM_FIELDS = ("patientID", "DoExam")
+
+
 class patientsDB(object):
 
-    def __init__(self):
-        self.connection = sqlite3.connect('patients.db')
+    def __init__(self, path='patients.db'):
+        self.connection = sqlite3.connect(path, cached_statements=256)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
         self.myPatient=None
         self.myExam=None
+        self.create_tables()
 
 
     # Operation Create and Drop Tables
@@ -20,7 +30,7 @@ class patientsDB(object):
         return self.myPatient
 
 
-    #Create Patient Table if not created
+    #Create Patient Table and indexes if not created
     def create_tables(self):
 
         #Patient tables fot patient data
@@ -35,6 +45,11 @@ class patientsDB(object):
 
         #valueType is AV S Curve, Device S Curve etc etc
         cur.execute(''' CREATE TABLE if not exists tValues (id integer PRIMARY KEY, examID integer, ValueType Text, Value Text, Time Text)''')
+
+        # latest_value / get_value_by_ValueType walk this index backwards, no table scan
+        cur.execute('CREATE INDEX if not exists idx_tValues_exam_type ON tValues (examID, ValueType, id)')
+        cur.execute('CREATE INDEX if not exists idx_tPatients_mrno_name ON tPatients (MRNo, Name)')
+        cur.execute('CREATE INDEX if not exists idx_tExams_patient ON tExams (patientID)')
         return self.connection.commit()
 
     #-----WARNNING--- Delete All Data
@@ -66,7 +81,7 @@ class patientsDB(object):
         cur.execute(sql, values)
         self.connection.commit()
         return cur.lastrowid
-    
+
     def add_emergency_patient(self):
         values = ("Emergency "+str(datetime.now()), "0", "Other", str(datetime.now()), str(datetime.now()))
         self.myPatient=self.add_patient(values)
@@ -84,28 +99,36 @@ class patientsDB(object):
         self.connection.commit()
         return cur.lastrowid
 
+    def add_values(self, rows):
+        # rows=[(examID,ValueType,Value), ...] written in one transaction
+        sql = ''' INSERT OR IGNORE INTO tValues (examID,ValueType,Value) VALUES (?,?,?) '''
+        with self.connection:
+            cur = self.connection.executemany(sql, rows)
+        return cur.rowcount
+
 
 
     #Operation UPDATE
 
     def update_patient(self,patientID,values):
-        cur=self.connection.cursor()
-        sql='Update tPatients SET Name=?, Age=?, Gender=?,MRNO=? where id=' + patientID
-        cur.execute(sql, values)
-
+        # values=(Name,Age,Gender,MRNO)
+        sql='Update tPatients SET Name=?, Age=?, Gender=?,MRNO=? where id=?'
+        self.connection.execute(sql, tuple(values) + (patientID,))
         return self.connection.commit()
 
     def update_exams(self,examID,field,value):
+        if field not in EXAM_FIELDS:
+            raise ValueError("Unknown exam field: " + str(field))
         cur=self.connection.cursor()
-        sql='Update tExams Set ' + field +'="'+ value +'" where id = ' + examID+ ';'
-        cur.execute(sql)
+        sql='Update tExams Set ' + field + '=? where id=?'
+        cur.execute(sql, (value, examID))
         self.connection.commit()
         return cur.lastrowid
 
     def update_value(self,examID,ValueType,value):
         cur = self.connection.cursor()
-        sql = 'Update tValues Set value="' + value + '" where examID = ' + examID + ' and ValueType="'+ValueType+'"'
-        cur.execute(sql)
+        sql = 'Update tValues Set Value=? where examID=? and ValueType=?'
+        cur.execute(sql, (value, examID, ValueType))
         self.connection.commit()
         return cur.lastrowid
 
@@ -119,78 +142,65 @@ class patientsDB(object):
         return cur.fetchall()
 
     def get_patient_exams(self,id):
-        sql='select * from tExams where patientID=' + id
-        cur=self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+        sql='select * from tExams where patientID=?'
+        return self.connection.execute(sql, (id,)).fetchall()
 
     def get_exam_values(self,id):
-        sql = 'select * from tValues where examID=' + id
-        cur = self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+        sql = 'select * from tValues where examID=?'
+        return self.connection.execute(sql, (id,)).fetchall()
 
 
     def get_patient_by_id(self,id):
-        sql='select * from tPatients where id="' + str(id)+'"'
-        cur=self.connection.cursor()
-        cur.execute(sql)
+        sql='select * from tPatients where id=?'
         self.myPatient = id
-        return cur.fetchone()
+        return self.connection.execute(sql, (id,)).fetchone()
 
     def get_exam_by_id(self,id):
-        sql = 'select * from tExams where id=' + id
-        cur = self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+        sql = 'select * from tExams where id=?'
+        return self.connection.execute(sql, (id,)).fetchall()
 
     def get_last_exam(self,patient_id):
-        sql='select TOP 1 from tExams where patientID='+patient_id+" ORDER BY ID DESC"
-        cur = self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+        sql='select * from tExams where patientID=? ORDER BY id DESC LIMIT 1'
+        return self.connection.execute(sql, (patient_id,)).fetchall()
 
 
 
     def get_value_by_ValueType(self,examID,ValueType):
-        sql = 'select * from tValues where examID=' + examID + ' and ValueType="'+ValueType+'"'
-        cur = self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+        sql = 'select * from tValues where examID=? and ValueType=? ORDER BY id'
+        return self.connection.execute(sql, (examID, ValueType)).fetchall()
+
+    # newest row of a value type for an exam, None if there is none
+    def latest_value(self,examID,ValueType):
+        sql = 'select * from tValues where examID=? and ValueType=? ORDER BY id DESC LIMIT 1'
+        return self.connection.execute(sql, (examID, ValueType)).fetchone()
     #Delete Exam
 
     def delete_exam(self,id):
-        sql = 'delete  from tExams where id=' + id
-        cur = self.connection.cursor()
-        cur.execute(sql)
+        sql = 'delete  from tExams where id=?'
+        self.connection.execute(sql, (id,))
         return self.connection.commit()
 
 
     def delete_patient(self,id):
-        sql = 'delete  from tPatients where id=' + id
-        cur = self.connection.cursor()
-        cur.execute(sql)
+        sql = 'delete  from tPatients where id=?'
+        self.connection.execute(sql, (id,))
         return self.connection.commit()
 
     # Operation SEARCH
 
     def search_patient(self,value,Type):
         # TYPE NAME,ID,DOA, DOE,
+        if Type not in PATIENT_SEARCH_FIELDS:
+            raise ValueError("Unknown patient field: " + str(Type))
 
         if Type=='Name':
-            sql = 'select * from tPatients where ' + Type + ' Like "%'+ value+'%"'
-            print(sql)
+            sql = 'select * from tPatients where Name Like ?'
+            value = '%' + value + '%'
         else:
-            sql = 'select * from tPatients where ' + Type + '="'+ value+'"'
-        cur = self.connection.cursor()
-        cur.execute(sql)
-        return cur.fetchall()
+            sql = 'select * from tPatients where ' + Type + '=?'
+        return self.connection.execute(sql, (value,)).fetchall()
 
 
 
 
 patientsDB=patientsDB()
-
-
-
-
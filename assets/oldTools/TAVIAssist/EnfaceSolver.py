@@ -0,0 +1,65 @@
+import numpy as np
+
+
+# -------------------------------------------------------
+# Closed form solver for the enface angles behind NAVICath.get_s_curve_device
+#
+# S curve model (same as NAVICath.make_s_curve_array):
+#   CC = -atan(cos(LR - y) / tan(z))      y = RAO/LAO enface, z = CRAN/CAUD enface
+# expanding cos(LR - y) gives
+#   -tan(CC) = a*cos(LR) + b*sin(LR)       a = cos(y)/tan(z), b = sin(y)/tan(z)
+# which is linear in (a, b). Two projections give an exact 2x2 solve, more projections
+# a least squares fit. y and z are recovered from the polar form of (a, b).
+# All functions work on whole arrays so a full session can be solved in one call.
+
+
+# -------------------------------------------------------
+# Pass CRAN/CAUD and RAO/LAO of k >= 2 projections per case, shape (..., k), in degrees.
+# Returns (y, z) enface arrays of shape (...). y is kept in [-90, 90] (RAO/LAO),
+# z in [-90, 90] (CRAN/CAUD). Cases where all projections share the same RAO/LAO are nan.
+def solve_enface(cran_caud, rao_lao):
+    cc = np.radians(np.asarray(cran_caud, dtype=float))
+    lr = np.radians(np.asarray(rao_lao, dtype=float))
+    cc, lr = np.broadcast_arrays(cc, lr)
+
+    t = -np.tan(cc)
+    c = np.cos(lr)
+    s = np.sin(lr)
+
+    # normal equations of  [c s] @ [a b]^T = t  summed over the projection axis
+    scc = np.sum(c * c, axis=-1)
+    sss = np.sum(s * s, axis=-1)
+    scs = np.sum(c * s, axis=-1)
+    sct = np.sum(c * t, axis=-1)
+    sst = np.sum(s * t, axis=-1)
+    det = scc * sss - scs * scs
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        degenerate = np.abs(det) < 1e-12
+        det = np.where(degenerate, np.nan, det)
+        a = (sss * sct - scs * sst) / det
+        b = (scc * sst - scs * sct) / det
+
+        y = np.degrees(np.arctan2(b, a))
+        cot_z = np.hypot(a, b)
+
+        # (y, z) and (y +- 180, -z) describe the same S curve, keep y on the RAO/LAO side
+        flip = np.abs(y) > 90
+        y = np.where(flip, y - np.copysign(180.0, y), y)
+        cot_z = np.where(flip, -cot_z, cot_z)
+        z = np.degrees(np.arctan(1.0 / cot_z))
+
+    return y, z
+
+
+# -------------------------------------------------------
+# Same argument order as NAVICath.get_s_curve_device:
+# w and ww is CRA/CAUD in both projections, x and xx is RAO/LAO in both projections.
+# Scalars return floats, arrays return arrays (one enface pair per element).
+def solve_enface_pairs(w, x, ww, xx):
+    cran_caud = np.stack(np.broadcast_arrays(np.asarray(w, dtype=float), np.asarray(ww, dtype=float)), axis=-1)
+    rao_lao = np.stack(np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(xx, dtype=float)), axis=-1)
+    y, z = solve_enface(cran_caud, rao_lao)
+    if y.ndim == 0:
+        return float(y), float(z)
+    return y, z
@@ -1,15 +1,15 @@
 import math
 import numpy as np
 
+import EnfaceSolver
+from SCurveEngine import engine
+import ViewPlanner
+
 
 # -------------------------------------------------------
 # Pass Enface RAO and LAO and make an Array of S cruve y=RAO_LAO z=CRAN_CAUD
 def make_s_curve_array(y, z):
-    ret = np.array([])
-    for f in range(-90, 90):
-        ret = np.append(ret, math.degrees(
-            -math.atan(math.cos(math.radians(f) - math.radians(y)) / math.tan(math.radians(z)))))
-    return ret
+    return engine.from_enface(y, z)
 
 
 # -------------------------------------------------------
@@ -22,7 +22,14 @@ def make_s_curve_array(y, z):
 # y RAO/LAO enface--need to calculate
 # z CRA/CAUD enface-- need to calculate
 # forumula is w =(-math.atan(math.cos(math.radians(x) - math.radians(y)) / math.tan(math.radians(z))))
+# y and z are solved in closed form by EnfaceSolver (sub degree, no grid search)
 def get_s_curve_device(w, x, ww, xx):
+    y, z = EnfaceSolver.solve_enface_pairs(w, x, ww, xx)
+    return make_s_curve_array(y, z)
+
+
+# Legacy 360x360 grid search, kept as reference for Benchmark_EnfaceSolver
+def get_s_curve_device_grid(w, x, ww, xx):
     oldy, oldz = 0, 0  # will store previous nearest y and z value.
     output_array = []
     w=round(w)
@@ -60,23 +67,8 @@ def get_s_curve_device(w, x, ww, xx):
 
 
 def SCurve_XYZ(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz):
-
-    ret = np.array([])
-    for xLR in range(-90, 90):
-        val1=( -math.sin(math.radians(xLR))) *    ((Ry - Ny) * (Lz - Nz) - (Rz - Nz) * (Ly - Ny))
-        val2= math.cos(math.radians(xLR)) * (  (Rz - Nz) * (Lx - Nx) -   (Rx - Nx) * (Lz - Nz)  )
-        val3=   ((Rx - Nx) * (Ly - Ny)) -   ((Ry - Ny) * (Lx - Nx))
-       # print(val1,val2,val3)
-        #ret = np.append(ret, math.degrees(math.atan((  ((-1* math.sin (xLR) )*(((Ry-Ny)*(Lz-Nz))-((Rz-Nz)*(Ly-Ny)))  )+ (math.cos(xLR)*(((Rz-Nz)*(Lx-Nx)) - ((Rx-Nx)*(Lz-Nz))  )))/ (((Rx-Nx)*(Ly-Ny))-((Ry-Ny)*(Lx-Nx))) )))
-
-        val1 = 0.1 if val1 == 0 else val1
-        val2 = 0.1 if val2 == 0 else val2
-        val3 = 0.1 if val3 == 0 else val3
-        ret = np.append(ret, math.degrees(math.atan(( val1 + val2) / val3)))
-        #print (xLR, math.degrees(math.atan(( val1 + val2) / val3)))
-
-    #print(ret)
-    return ret
+    # S curve from LCC, RCC and NCC coordinates, see SCurveEngine.coordinate_coefficients
+    return engine.from_coordinates([Lx, Ly, Lz], [Rx, Ry, Rz], [Nx, Ny, Nz])
 
 #Research Article
 def COPV(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz):
@@ -84,147 +76,49 @@ def COPV(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz):
     xCC=math.degrees(math.atan(2* Rz - Lz - Nz)/ math.sqrt ((2*Rx-Lx-Nx)**2 +(2*Ry-Ly-Nx)**2))
     return [xLR,xCC]
 def COPV_LCC_P(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz):
-    #xLR = (math.degrees((math.atan2(2 * Ry - Ly - Ny, -(2 * Rx - Lx - Nx)))))
     #RCC Anterior
-    xLR=(math.degrees(-(math.atan2 ( (2*Ry-Ly-Ny),-(2*Rx-Lx-Nx)))))-90
-    xCC = math.degrees(math.atan((2 * Rz - Lz - Nz) / (math.sqrt(((2 * Rx - Lx - Nx) ** 2) + ((2 * Ry - Ly - Ny) ** 2)))))
-    angle=Valve_Angle(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz, xLR)
-    return [xLR,xCC,angle]
+    return _copv("LCC_P", Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
 def COPV_NCC_P(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz):
     # NCC Post
-    xLR = (math.degrees((math.atan2(-(2 * Ny - Ry - Ly), -(2 * Nx - Rx - Lx)))))+90
-    xCC = math.degrees(math.atan((2 * Nz - Rz - Lz) / (math.sqrt(((2 * Nx - Rx - Lx) ** 2) + ((2 * Ny - Ry - Ly) ** 2)))))*-1
-    angle = Valve_Angle(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz, xLR)
-    return [xLR, xCC, angle]
+    return _copv("NCC_P", Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
 def ThreeD_angle_difference(angle1,angle2):
-
-    # x1=np.sin(angle1[0])*np.cos(angle1[1])
-    x1=np.tan(np.radians(angle1[0]))
-    x2 = np.tan(np.radians(angle2[0]))
-    # x2=np.sin(angle2[0])*np.cos(angle2[1])
-    #
-    # y1=np.sin(angle1[0])
-    # y2=np.sin(angle2[0])
-
-    y1 = np.tan(np.radians(angle1[1]))
-    y2 = np.tan(np.radians(angle2[1]))
-
-    #
-    # z1=np.cos(angle1[0])*np.cos(angle1[1])
-    # z2=np.cos(angle2[0])*np.cos(angle2[1])
-    z1=1
-    z2=1
-
-    vector1=np.array([x1,y1,z1])
-    normalized_vector1 = vector1 / np.linalg.norm(vector1)
-
-    vector2=np.array([x2,y2,z2])
-    normalized_vector2 = vector2 / np.linalg.norm(vector2)
-
-    dot_product = np.dot(normalized_vector1,normalized_vector2)
-
-    angle_normalized = np.arccos(dot_product)  # Angle with normalized vectors
-
-    #print(x1,x2,y1,y2,z1,z2)
-    #print(dot_product)
-
-
-    deviation=np.rad2deg(angle_normalized)
-
-    return deviation
+    # angle between the views (tan(LR), tan(CC), 1), see ViewPlanner.deviation
+    return ViewPlanner.deviation(angle1[0], angle1[1], angle2[0], angle2[1])
 def COPV_RCC_A(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz):
     # LCC Post
-    xLR = (math.degrees((math.atan2(-(2 * Ly - Ry - Ny), -(2 * Lx - Rx - Nx))))) + 90
-    xCC = math.degrees(
-    math.atan((2 * Lz - Rz - Nz) / (math.sqrt(((2 * Lx - Rx - Nx) ** 2) + ((2 * Ly - Ry - Ny) ** 2))))) * -1
-    angle = Valve_Angle(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz, xLR)
-    return [xLR, xCC, angle]
+    return _copv("RCC_A", Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
+
+def _copv(view, Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz):
+    xLR, xCC, angle = ViewPlanner.copv_views([Lx, Ly, Lz], [Rx, Ry, Rz], [Nx, Ny, Nz])[view]
+    return [float(xLR), float(xCC), float(angle)]
 
+# returns [LR, CC, deviation] of the view on the S curve through both front views that is
+# 90 degree from the RCC (Right) or LCC (Left) front view, None if there is none
 def find_side_view(front_view_LCC, front_view_RCC, cusp):
-        if cusp == "Right":
-            Scurve = get_s_curve_device(front_view_LCC[1], front_view_LCC[0], front_view_RCC[1], front_view_RCC[0])
-            angulations = []
-            # print("SCurve",Scurve)
-            x = -90
-            for anglulation in Scurve:
-                deviation = ThreeD_angle_difference([x, anglulation], front_view_RCC)
-                # print("Right Deviaiton All", [x, anglulation], front_view_RCC, deviation)
-
-                if 89 <= deviation <= 91:
-                    # print("Right Deviaiton", [x,anglulation],front_view_RCC,deviation)
-                    angulations.append([x, anglulation, deviation])
-                x = x + 1
-            closest_to_90 = min(angulations, key=lambda x: abs(x[2] - 90))
-            for ang in angulations:
-                if ang[2] == closest_to_90[2]:
-                    return ang
-
-        if cusp == "Left":
-            Scurve = get_s_curve_device(front_view_LCC[1], front_view_LCC[0], front_view_RCC[1], front_view_RCC[0])
-            angulations = []
-            x = -90
-            for anglulation in Scurve:
-                deviation = ThreeD_angle_difference([x, anglulation], front_view_LCC)
-                # print("Left Deviaiton All", [x, anglulation], front_view_RCC, deviation)
-
-                if 89 <= deviation <= 91:
-                    print("Left Deviaiton", [x, anglulation], front_view_LCC, deviation)
-                    angulations.append([x, anglulation, deviation])
-                x = x + 1
-            closest_to_90 = min(angulations, key=lambda x: abs(x[2] - 90))
-            for ang in angulations:
-                if ang[2] == closest_to_90[2]:
-                    return ang
+    Scurve = get_s_curve_device(front_view_LCC[1], front_view_LCC[0], front_view_RCC[1], front_view_RCC[0])
+    if cusp == "Right":
+        return _best_view(Scurve, front_view_RCC, 90)
+    if cusp == "Left":
+        return _best_view(Scurve, front_view_LCC, 90)
 
 
+# returns [LR, CC, deviation] of the view on Scurve 60 degree from and before the RCC front view
 def find_front_view(front_view_RCC,Scurve):
+    return _best_view(Scurve, front_view_RCC, 60, max_lr=front_view_RCC[0])
 
-    #Scurve=get_s_curve_device(front_view_LCC[1],front_view_LCC[0],front_view_RCC[1],front_view_RCC[0])
-    angulations=[]
-    #print("SCurve",Scurve)
-    x=-90
-    for anglulation in Scurve:
-        deviation=ThreeD_angle_difference([x,anglulation],front_view_RCC )
-        #print("Right Deviaiton All", [x, anglulation], front_view_RCC, deviation)
-
-        if (59 <= deviation <= 61) and front_view_RCC[0]>x:
-            print("Right Deviaiton frontal", [x,anglulation],front_view_RCC,deviation)
-            angulations.append([x,anglulation,deviation])
-        x = x + 1
-    closest_to_60 = min(angulations, key=lambda x: abs(x[2] - 60))
-    for ang in angulations:
-        if ang[2] == closest_to_60[2]:
-            return ang
 
-    #blah blah
+def _best_view(Scurve, reference, target, max_lr=None):
+    candidates = ViewPlanner.view_candidates(engine.lr, Scurve, reference, target, max_lr=max_lr)
+    if len(candidates) == 0:
+        return None
+    return [float(v) for v in candidates[0]]
 
 
 
 
 def Valve_Angle(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz,xLR):
-
-    ret = np.array([])
-
-    val1=( -math.sin(math.radians(xLR))) *    ((Ry - Ny) * (Lz - Nz) - (Rz - Nz) * (Ly - Ny))
-    val2= math.cos(math.radians(xLR)) * (  (Rz - Nz) * (Lx - Nx) -   (Rx - Nx) * (Lz - Nz)  )
-    val3=   ((Rx - Nx) * (Ly - Ny)) -   ((Ry - Ny) * (Lx - Nx))
-    val1 = 0.1 if val1 == 0 else val1
-    val2 = 0.1 if val2 == 0 else val2
-    val3 = 0.1 if val3 == 0 else val3
-    ret=math.degrees(math.atan((val1 + val2) / val3))
-
-    xLR1=xLR+1.1
-
-    val1 = (-math.sin(math.radians(xLR1))) * ((Ry - Ny) * (Lz - Nz) - (Rz - Nz) * (Ly - Ny))
-    val2 = math.cos(math.radians(xLR1)) * ((Rz - Nz) * (Lx - Nx) - (Rx - Nx) * (Lz - Nz))
-    val3 = ((Rx - Nx) * (Ly - Ny)) - ((Ry - Ny) * (Lx - Nx))
-    val1 = 0.1 if val1 == 0 else val1
-    val2 = 0.1 if val2 == 0 else val2
-    val3 = 0.1 if val3 == 0 else val3
-
-    ret1 = math.degrees(math.atan(( val1 + val2) / val3))
-
-    return math.degrees(math.atan(ret1-ret)/(xLR1-xLR))
+    # angle of the S curve tangent at xLR, from the analytic derivative instead of a 1.1 degree finite difference
+    return float(engine.valve_angle([Lx, Ly, Lz], [Rx, Ry, Rz], [Nx, Ny, Nz], xLR))
 
 #SCurve_XYZ(26,-175,1615,   16,-188 ,1620,  7.637, -171 ,  1623)
 print(COPV(27,-188 , 1615,   25,-160 ,1620,  16, -101 ,  1624))
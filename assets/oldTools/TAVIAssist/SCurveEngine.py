@@ -0,0 +1,94 @@
+import numpy as np
+
+
+# -------------------------------------------------------
+# Array native S curve evaluation
+#
+# Every S curve NAVICath draws has the form
+#   CC(LR) = atan(a*cos(LR) + b*sin(LR))
+# with one (a, b) coefficient pair per curve:
+#   enface (y=RAO/LAO, z=CRAN/CAUD):  a = -cos(y)/tan(z),  b = -sin(y)/tan(z)
+#   cusp coordinates L, R, N:         n = (R - N) x (L - N),  a = n_y/n_z,  b = -n_x/n_z
+# so curves for any LAO/RAO grid and any number of valves / frames are one broadcasted
+# expression over coefficients of shape (..., 2) and a grid of shape (n,) -> (..., n).
+# The derivative dCC/dLR is analytic:
+#   (b*cos(LR) - a*sin(LR)) / (1 + (a*cos(LR) + b*sin(LR))**2)
+
+
+class SCurveEngine(object):
+
+    def __init__(self, start=-90, stop=90, step=1.0, lr=None):
+        # default grid is the one every plot uses: range(-90, 90)
+        if lr is None:
+            lr = np.arange(start, stop, step, dtype=float)
+        self.lr = np.asarray(lr, dtype=float)
+
+    # -------------------------------------------------------
+    # Coefficients
+
+    # y, z: scalars or arrays of enface RAO/LAO and CRAN/CAUD in degrees -> (..., 2)
+    @staticmethod
+    def enface_coefficients(y, z):
+        y = np.radians(np.asarray(y, dtype=float))
+        z = np.radians(np.asarray(z, dtype=float))
+        with np.errstate(divide="ignore"):
+            cot_z = 1.0 / np.tan(z)
+        return np.stack(np.broadcast_arrays(-np.cos(y) * cot_z, -np.sin(y) * cot_z), axis=-1)
+
+    # L, R, N: LCC, RCC, NCC coordinates of shape (..., 3) -> (..., 2)
+    @staticmethod
+    def coordinate_coefficients(L, R, N):
+        L = np.asarray(L, dtype=float)
+        R = np.asarray(R, dtype=float)
+        N = np.asarray(N, dtype=float)
+        n = np.cross(R - N, L - N)
+        nz = n[..., 2]
+        # coplanar projection of the annulus, same guard as the scalar SCurve_XYZ
+        nz = np.where(nz == 0, 0.1, nz)
+        return np.stack([n[..., 1] / nz, -n[..., 0] / nz], axis=-1)
+
+    # -------------------------------------------------------
+    # Evaluation
+
+    def _grid(self, lr):
+        return self.lr if lr is None else np.asarray(lr, dtype=float)
+
+    # coefficients (..., 2) -> CRAN/CAUD in degrees, shape (..., n) for the grid
+    # (or broadcast against lr when lr is given with matching leading axes)
+    def evaluate(self, coefficients, lr=None):
+        coefficients = np.asarray(coefficients, dtype=float)
+        lr = np.radians(self._grid(lr))
+        a = coefficients[..., 0, np.newaxis]
+        b = coefficients[..., 1, np.newaxis]
+        return np.degrees(np.arctan(a * np.cos(lr) + b * np.sin(lr)))
+
+    # analytic slope dCC/dLR (degrees per degree), same shapes as evaluate
+    def derivative(self, coefficients, lr=None):
+        coefficients = np.asarray(coefficients, dtype=float)
+        lr = np.radians(self._grid(lr))
+        a = coefficients[..., 0, np.newaxis]
+        b = coefficients[..., 1, np.newaxis]
+        cos_lr = np.cos(lr)
+        sin_lr = np.sin(lr)
+        u = a * cos_lr + b * sin_lr
+        return (b * cos_lr - a * sin_lr) / (1.0 + u * u)
+
+    # -------------------------------------------------------
+    # Shortcuts
+
+    def from_enface(self, y, z, lr=None):
+        return self.evaluate(self.enface_coefficients(y, z), lr)
+
+    def from_coordinates(self, L, R, N, lr=None):
+        return self.evaluate(self.coordinate_coefficients(L, R, N), lr)
+
+    # angle of the S curve tangent at xLR in degrees, for one or many valves
+    def valve_angle(self, L, R, N, xLR):
+        coefficients = self.coordinate_coefficients(L, R, N)
+        xLR = np.asarray(xLR, dtype=float)
+        slope = self.derivative(coefficients, xLR[..., np.newaxis])[..., 0]
+        return np.degrees(np.arctan(slope))
+
+
+# initial engine on the default -90..89 grid so can be accessed from all files
+engine = SCurveEngine()
@@ -6,7 +6,7 @@ from matplotlib.figure import Figure
 from matplotlib.ticker import MultipleLocator, AutoMinorLocator
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
-import NAVICath, DB
+import NAVICath, DB, ValueStorage
 
 
 
@@ -26,11 +26,9 @@ class Ui_MainWindow(object):
         Nz = int(self.vzNCC.toPlainText())
 
         cord = [Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz]
-        cordinates = ",".join(map(str, cord))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/MDCT/Coordinates", cordinates)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/MDCT/Coordinates", cord)
 
 
         self.data = NAVICath.SCurve_XYZ(Lx,Ly,Lz,Rx,Ry,Rz,Nx,Ny,Nz)
@@ -44,11 +42,9 @@ class Ui_MainWindow(object):
         enCC = int(self.vCCEnface.toPlainText())
 
         enface = [enRL,enCC]
-        enface = ",".join(map(str, enface))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/MDCT/Enface", enface)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/MDCT/Enface", enface)
 
 
         self.data=NAVICath.make_s_curve_array(enRL,enCC)
@@ -63,11 +59,9 @@ class Ui_MainWindow(object):
         xCC2=int(self.vCCP2.toPlainText())
 
         planes = [xCC1,xRL1,xCC2,xRL2]
-        planes = ",".join(map(str, planes))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/MDCT/Planes", planes)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/MDCT/Planes", planes)
 
         self.data=NAVICath.get_s_curve_device(xCC1,xRL1,xCC2,xRL2)
         self.SCruve_Plane = self.ax.plot(range(-90, 90), self.data, label="Plannar", color="blue")
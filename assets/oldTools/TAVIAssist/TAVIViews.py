@@ -6,7 +6,7 @@ from matplotlib.figure import Figure
 from matplotlib.ticker import MultipleLocator, AutoMinorLocator
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 
-import NAVICath,DB
+import NAVICath,DB,ValueStorage
 
 
 
@@ -26,11 +26,9 @@ class Ui_MainWindow(object):
         Nz = float(self.vzNCC.toPlainText())
 
         cord=[Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz]
-        cordinates=",".join(map(str, cord))
 
-        #save values to System
-        values = (DB.patientsDB.myExam, "AV/MDCT/Coordinates",cordinates)
-        DB.patientsDB.add_value(values)
+        # save values to System
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/MDCT/Coordinates", cord)
 
         self.data = NAVICath.COPV_RCC_A(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
         self.scat_bt = self.ax.scatter(float(self.data[0]),float(self.data[1]), c="blue",label= "COPV RCC Anterior")
@@ -63,11 +61,9 @@ class Ui_MainWindow(object):
         Nz = float(self.vzNCC.toPlainText())
 
         cord = [Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz]
-        cordinates = ",".join(map(str, cord))
 
         # save values to System
-        values = (DB.patientsDB.myExam, "AV/MDCT/Coordinates", cordinates)
-        DB.patientsDB.add_value(values)
+        ValueStorage.valueStore.AddValue(DB.patientsDB.myExam, "AV/MDCT/Coordinates", cord)
 
         self.data = NAVICath.SCurve_XYZ(Lx, Ly, Lz, Rx, Ry, Rz, Nx, Ny, Nz)
         self.Scurve_XYZ = self.ax.plot(range(-90, 90), self.data, label="Coordinates", color="red")
@@ -1,17 +1,131 @@
+from collections import OrderedDict
+
+import numpy as np
+
 import DB
+import NAVICath
+
+# Typed value store
+#
+# Numeric value sets (planes, coordinates, enface, ...) are kept as little endian float64
+# blobs in tNumericValues instead of comma joined text in tValues, so reading them back is
+# a single np.frombuffer without split()/int() and without losing decimals.
+# The latest value of every type of the recently opened exams is kept in an LRU cache.
+
+DTYPE = np.dtype("<f8")
+
 
 class ValueStore (object):
 
- def __init__(self):
-     return
- def AddValue(self):
-     return
- def GetValue(self):
-     return
+ def __init__(self, db=None, cache_size=16):
+     self.db = db if db is not None else DB.patientsDB
+     self.connection = self.db.connection
+     self.cache_size = cache_size
+     self.cache = OrderedDict()  # examID -> {ValueType: array}
+     self.create_tables()
+     self.MigrateLegacyValues()
+
+ def create_tables(self):
+     cur = self.connection.cursor()
+     # legacyID is the tValues row a value was migrated from
+     cur.execute('''CREATE TABLE if not exists tNumericValues
+            (id integer PRIMARY KEY, examID integer, ValueType Text, Value Blob, Time Text, legacyID integer UNIQUE)''')
+     cur.execute('CREATE INDEX if not exists idx_tNumericValues_exam_type ON tNumericValues (examID, ValueType, id)')
+     cur.execute('CREATE INDEX if not exists idx_tNumericValues_type ON tNumericValues (ValueType, examID, id)')
+     return self.connection.commit()
+
+ @staticmethod
+ def encode(values):
+     return np.ascontiguousarray(values, dtype=DTYPE).tobytes()
+
+ @staticmethod
+ def decode(blob):
+     return np.frombuffer(blob, dtype=DTYPE)
+
+ def _key(self, examID):
+     return None if examID is None else int(examID)
+
+ # values: sequence of numbers
+ def AddValue(self, examID, ValueType, values):
+     values = np.asarray(values, dtype=DTYPE).ravel()
+     sql = "INSERT INTO tNumericValues (examID,ValueType,Value,Time) VALUES (?,?,?,datetime('now'))"
+     with self.connection:
+         cur = self.connection.execute(sql, (examID, ValueType, self.encode(values)))
+     key = self._key(examID)
+     if key in self.cache:
+         self.cache[key][ValueType] = values
+     return cur.lastrowid
+
+ # latest values of an exam as read only float64 array, None if never stored
+ def GetValue(self, examID, ValueType):
+     return self.GetExamValues(examID).get(ValueType)
+
+ # {ValueType: latest array} of an exam, loaded with one query and cached
+ def GetExamValues(self, examID):
+     key = self._key(examID)
+     if key is None:
+         return {}
+     if key in self.cache:
+         self.cache.move_to_end(key)
+         return self.cache[key]
+     rows = self.connection.execute(
+         'SELECT ValueType, Value FROM tNumericValues WHERE examID=? ORDER BY id', (key,)).fetchall()
+     values = {}
+     for ValueType, blob in rows:
+         values[ValueType] = self.decode(blob)
+     self.cache[key] = values
+     if len(self.cache) > self.cache_size:
+         self.cache.popitem(last=False)
+     return values
+
+ # latest value of one type for every exam: (examIDs (n,), values (n, k)) in one query
+ def GetAllValues(self, ValueType):
+     rows = self.connection.execute(
+         '''SELECT examID, Value FROM tNumericValues WHERE id IN
+            (SELECT max(id) FROM tNumericValues WHERE ValueType=? GROUP BY examID) ORDER BY examID''',
+         (ValueType,)).fetchall()
+     examIDs = np.array([r[0] for r in rows], dtype=np.int64)
+     arrays = [self.decode(r[1]) for r in rows]
+     if arrays and all(len(a) == len(arrays[0]) for a in arrays):
+         return examIDs, np.vstack(arrays)
+     return examIDs, arrays
+
+ # S curves of a structure ("AV", "BPV") for an exam from its stored planes, coordinates and enface
+ def GetSructureSCurve(self, examID, Structure):
+     curves = {}
+     values = self.GetExamValues(examID)
+     planes = values.get(Structure + "/MDCT/Planes")
+     if planes is not None:
+         curves["MDCT_Planes"] = NAVICath.get_s_curve_device(*planes)
+     cordinates = values.get(Structure + "/MDCT/Coordinates")
+     if cordinates is not None:
+         curves["MDCT_Cord"] = NAVICath.SCurve_XYZ(*cordinates)
+     enface = values.get(Structure + "/MDCT/Enface")
+     if enface is not None:
+         curves["MDCT_Enface"] = NAVICath.make_s_curve_array(*enface)
+     return curves
+
+ # copy comma joined numeric rows of tValues into tNumericValues, once per row
+ def MigrateLegacyValues(self):
+     last = self.connection.execute('SELECT max(legacyID) FROM tNumericValues').fetchone()[0] or 0
+     rows = self.connection.execute(
+         'SELECT id, examID, ValueType, Value, Time FROM tValues WHERE id>? ORDER BY id', (last,)).fetchall()
+     migrated = []
+     for id, examID, ValueType, Value, Time in rows:
+         try:
+             values = [float(v) for v in str(Value).split(",")]
+         except ValueError:
+             continue
+         migrated.append((examID, ValueType, self.encode(values), Time, id))
+     sql = 'INSERT OR IGNORE INTO tNumericValues (examID,ValueType,Value,Time,legacyID) VALUES (?,?,?,?,?)'
+     with self.connection:
+         self.connection.executemany(sql, migrated)
+     self.cache.clear()
+     return len(migrated)
 
- def GetSructureSCurve(self,Structure):
 
-     return
+# initial ValueStore so can be accessed from all files
+valueStore = ValueStore()
 
 
 
@@ -29,4 +143,4 @@ class ValueStore (object):
     #AVDEVICE Values
         #PLANAR- FLURO Values = AVDEVICE/FLURO/PLANR (X,Y,XX,YY)
     #Views
-        #XYZ-- TAVIViews AV/VIEWS/XYZ Format = (X,Y,Z  ,XX,YY,ZZ , XXX,YYY,ZZZ)
\ No newline at end of file
+        #XYZ-- TAVIViews AV/VIEWS/XYZ Format = (X,Y,Z  ,XX,YY,ZZ , XXX,YYY,ZZZ)
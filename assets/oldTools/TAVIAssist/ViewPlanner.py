@@ -0,0 +1,167 @@
+import numpy as np
+
+import EnfaceSolver
+from SCurveEngine import SCurveEngine, engine
+
+
+# -------------------------------------------------------
+# Vectorized fluoroscopic view planning along the S curve
+#
+# A view (LR, CC) is the direction (tan(LR), tan(CC), 1), same as NAVICath.ThreeD_angle_difference.
+# The deviation of every S curve sample from a reference view is computed in one array pass,
+# then all target crossings (60 deg frontal, 90 deg side) and near misses are located and
+# refined to sub-degree positions. Curves are given as samples lr (n,) and cc (..., n), so one
+# call serves a single plot or a whole batch of patients.
+
+
+# -------------------------------------------------------
+# Angle in degrees between views, all inputs broadcast. view arrays are (..., 2) = (LR, CC)
+def angular_deviation(view1, view2):
+    view1 = np.asarray(view1, dtype=float)
+    view2 = np.asarray(view2, dtype=float)
+    return deviation(view1[..., 0], view1[..., 1], view2[..., 0], view2[..., 1])
+
+
+def deviation(lr1, cc1, lr2, cc2):
+    x1 = np.tan(np.radians(lr1))
+    y1 = np.tan(np.radians(cc1))
+    x2 = np.tan(np.radians(lr2))
+    y2 = np.tan(np.radians(cc2))
+    dot = (x1 * x2 + y1 * y2 + 1.0) / np.sqrt((x1 * x1 + y1 * y1 + 1.0) * (x2 * x2 + y2 * y2 + 1.0))
+    return np.degrees(np.arccos(np.clip(dot, -1.0, 1.0)))
+
+
+# lr (n,), cc (..., n), reference (..., 2) -> deviation profile (..., n)
+def deviation_profile(lr, cc, reference):
+    reference = np.asarray(reference, dtype=float)
+    return deviation(lr, cc, reference[..., 0, np.newaxis], reference[..., 1, np.newaxis])
+
+
+# -------------------------------------------------------
+# All candidates of a target deviation on a batch of curves.
+# lr (n,), cc (B, n), reference (B, 2). max_lr (scalar or (B,)) keeps only views with LR < max_lr.
+# Returns row index, LR, CC and deviation of every candidate (flat arrays).
+def _candidates(lr, cc, reference, target, tolerance, max_lr):
+    lr = np.asarray(lr, dtype=float)
+    cc = np.asarray(cc, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    d = deviation_profile(lr, cc, reference) - target
+    n = lr.shape[0]
+
+    # sign changes between neighbouring samples -> linear interpolation of the crossing
+    d0 = d[:, :-1]
+    d1 = d[:, 1:]
+    rows, idx = np.nonzero((d0 == 0) | (d0 * d1 < 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(d0[rows, idx] == 0, 0.0, d0[rows, idx] / (d0[rows, idx] - d1[rows, idx]))
+    pos = [idx + frac]
+    pos_rows = [rows]
+
+    # local minima of |d| that stay within tolerance without crossing -> parabolic vertex
+    ad = np.abs(d)
+    if n >= 3:
+        left, mid, right = ad[:, :-2], ad[:, 1:-1], ad[:, 2:]
+        touch = (mid <= left) & (mid < right) & (mid <= tolerance) & (d[:, :-2] * d[:, 1:-1] > 0) & (d[:, 1:-1] * d[:, 2:] > 0)
+        rows, idx = np.nonzero(touch)
+        idx = idx + 1
+        fl, fm, fr = ad[rows, idx - 1], ad[rows, idx], ad[rows, idx + 1]
+        curvature = fl - 2.0 * fm + fr
+        with np.errstate(divide="ignore", invalid="ignore"):
+            offset = np.where(curvature > 0, 0.5 * (fl - fr) / curvature, 0.0)
+        pos.append(idx + np.clip(offset, -0.5, 0.5))
+        pos_rows.append(rows)
+
+    pos = np.concatenate(pos)
+    rows = np.concatenate(pos_rows)
+    samples = np.arange(n, dtype=float)
+    x = np.interp(pos, samples, lr)
+    lo = np.clip(np.floor(pos).astype(int), 0, n - 1)
+    hi = np.clip(lo + 1, 0, n - 1)
+    t = pos - lo
+    y = cc[rows, lo] + t * (cc[rows, hi] - cc[rows, lo])
+    dev = deviation(x, y, reference[rows, 0], reference[rows, 1])
+
+    keep = np.abs(dev - target) <= tolerance
+    if max_lr is not None:
+        max_lr = np.broadcast_to(np.asarray(max_lr, dtype=float), (cc.shape[0],))
+        keep &= max_lr[rows] > x
+    return rows[keep], x[keep], y[keep], dev[keep]
+
+
+# -------------------------------------------------------
+# Every candidate of one curve, as array (m, 3) of [LR, CC, deviation], best first
+def view_candidates(lr, cc, reference, target, tolerance=1.0, max_lr=None):
+    cc = np.asarray(cc, dtype=float)[np.newaxis]
+    reference = np.asarray(reference, dtype=float)[np.newaxis, :2]
+    rows, x, y, dev = _candidates(lr, cc, reference, target, tolerance, max_lr)
+    order = np.argsort(np.abs(dev - target), kind="stable")
+    return np.stack([x, y, dev], axis=-1)[order]
+
+
+# Best candidate per curve of a batch: (B, 3) of [LR, CC, deviation], nan where nothing is in tolerance
+def best_views(lr, cc, reference, target, tolerance=1.0, max_lr=None):
+    cc = np.atleast_2d(np.asarray(cc, dtype=float))
+    reference = np.atleast_2d(np.asarray(reference, dtype=float))[..., :2]
+    reference = np.broadcast_to(reference, (cc.shape[0], 2))
+    rows, x, y, dev = _candidates(lr, cc, reference, target, tolerance, max_lr)
+    out = np.full((cc.shape[0], 3), np.nan)
+    if rows.size:
+        order = np.lexsort((np.abs(dev - target), rows))
+        rows, x, y, dev = rows[order], x[order], y[order], dev[order]
+        first = np.ones(rows.shape, dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        out[rows[first]] = np.stack([x[first], y[first], dev[first]], axis=-1)
+    return out
+
+
+# -------------------------------------------------------
+# Cusp overlap views (same formulas as NAVICath.COPV_RCC_A / COPV_LCC_P / COPV_NCC_P)
+# L, R, N: (..., 3). Each view is (..., 3) = [LR, CC, valve angle]
+def copv_views(L, R, N):
+    L = np.asarray(L, dtype=float)
+    R = np.asarray(R, dtype=float)
+    N = np.asarray(N, dtype=float)
+
+    def overlap(d):
+        return np.degrees(np.arctan(d[..., 2] / np.hypot(d[..., 0], d[..., 1])))
+
+    dL = 2 * L - R - N
+    dR = 2 * R - L - N
+    dN = 2 * N - R - L
+
+    rcc_lr = np.degrees(np.arctan2(-dL[..., 1], -dL[..., 0])) + 90
+    rcc_cc = -overlap(dL)
+    lcc_lr = np.degrees(-np.arctan2(dR[..., 1], -dR[..., 0])) - 90
+    lcc_cc = overlap(dR)
+    ncc_lr = np.degrees(np.arctan2(-dN[..., 1], -dN[..., 0])) + 90
+    ncc_cc = -overlap(dN)
+
+    views = {}
+    for name, xLR, xCC in (("RCC_A", rcc_lr, rcc_cc), ("LCC_P", lcc_lr, lcc_cc), ("NCC_P", ncc_lr, ncc_cc)):
+        views[name] = np.stack([xLR, xCC, engine.valve_angle(L, R, N, xLR)], axis=-1)
+    return views
+
+
+# -------------------------------------------------------
+# Batch entry point: cusp coordinates of B patients (B, 3) each -> dict of (B, 3) views.
+# Follows the BT_Basilica_Assist chain: RCC anterior COPV, 60 deg frontal view before it on the
+# coordinate S curve, then 90 deg side views from the S curve through frontal and RCC views.
+def plan_views(L, R, N, step=1.0, tolerance=1.0):
+    L = np.atleast_2d(np.asarray(L, dtype=float))
+    R = np.atleast_2d(np.asarray(R, dtype=float))
+    N = np.atleast_2d(np.asarray(N, dtype=float))
+    grid = SCurveEngine(step=step)
+
+    views = copv_views(L, R, N)
+    rcc = views["RCC_A"]
+
+    curve = grid.from_coordinates(L, R, N)
+    front = best_views(grid.lr, curve, rcc, 60, tolerance, max_lr=rcc[:, 0])
+
+    y, z = EnfaceSolver.solve_enface_pairs(front[:, 1], front[:, 0], rcc[:, 1], rcc[:, 0])
+    side_curve = grid.from_enface(y, z)
+    views["front"] = front
+    views["side_right"] = best_views(grid.lr, side_curve, rcc, 90, tolerance)
+    views["side_left"] = best_views(grid.lr, side_curve, front, 90, tolerance)
+    views["curve"] = curve
+    return views